@@ -2,20 +2,24 @@ from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langgraph.prebuilt import ToolNode
-from typing import List, Dict, Any, TypedDict
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.tools import StructuredTool
+from pydantic import ValidationError
+from typing import List, Dict, Any, AsyncIterator, Iterator, TypedDict
+import asyncio
 import os
 import sys
-import json
-import re # Import regex for parsing tool calls
 # Assuming config, constants, logger, and tools modules exist and are correctly configured
 from config import AppConfig
 from constants import GROQ_API_KEY
 from logger import setup_logger
-from tools import book_appointment, get_next_available_appointment, cancel_appointment
-from database import get_all_trains, search_stations, get_train_route # Import new database tools
+from tools import book_appointment, book_appointment_async, get_next_available_appointment, cancel_appointment, find_journeys, find_nearby_stations
+from database import get_all_trains, search_stations, search_trains, get_train_route, preload_train_routes, check_data_versions, tool_results # Import new database tools
+import async_database
 from ticket_generator import generate_ticket_pdf # Import the PDF generation function
+import fast_path
+import context_window
+from datetime import datetime, date
 
 logger = setup_logger(__name__)
 
@@ -43,13 +47,41 @@ except Exception as e:
     print("Please make sure you have a valid GROQ API key and internet connection.")
     sys.exit(1)
 
+# Warm the route cache with one query so booking conversations don't wait on route lookups.
+# The data versions are recorded first, so a change made after this point is noticed.
+check_data_versions()
+preload_train_routes()
+
 class AgentState(TypedDict):
     messages: List[Any]
     current_time: str
+    booking: Dict[str, Any]
+
+# Set AGENT_FAST_PATH=0 to send every turn to the model.
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "1") != "0"
+
+ERROR_REPLY = "I'm sorry, I encountered an error processing your request."
+STREAM_MODES = ["messages", "updates", "values"]
+
+def _today(current_time: str) -> date:
+    try:
+        return datetime.strptime(current_time[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return date.today()
+
+def _fast_path_reply(message: str, booking: Dict[str, Any], current_time: str):
+    """The fast path's reply to `message`, or None when the model has to answer it."""
+    if not FAST_PATH_ENABLED:
+        return None
+    try:
+        return fast_path.handle(message, booking, available_functions, _today(current_time))
+    except Exception as e:
+        logger.exception(f"Fast path failed, asking the model instead: {e}")
+        return None
 
 # Removed global CONVERSATION, will manage via session in Flask app
 
-def receive_message_from_caller(message: str, conversation_history: List[Any], current_time: str) -> Dict[str, Any]:
+def receive_message_from_caller(message: str, conversation_history: List[Any], current_time: str, booking: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Process a message from the caller and return the updated conversation history.
     This function works with Streamlit's session state by accepting and returning the conversation history.
@@ -58,18 +90,25 @@ def receive_message_from_caller(message: str, conversation_history: List[Any], c
         message (str): The user's message
         conversation_history (List[Any]): The current conversation history from Streamlit's session state
         current_time (str): The current time string
+        booking (Dict[str, Any]): The booking slots filled so far (train_id, source, destination, journey_date)
     
     Returns:
-        Dict[str, Any]: A dictionary containing the updated conversation history
+        Dict[str, Any]: A dictionary containing the updated conversation history and booking slots
     """
     logger.info(f"Agent received message: {message}")
     logger.debug(f"Conversation history received: {conversation_history}")
     logger.debug(f"Current time received: {current_time}")
+    booking = {} if booking is None else booking
+    check_data_versions()
     # Use the conversation history passed in
     current_conversation = conversation_history + [HumanMessage(content=message)]
+    reply = _fast_path_reply(message, booking, current_time)
+    if reply is not None:
+        return {"messages": current_conversation + [AIMessage(content=reply)], "booking": booking}
     state: AgentState = {
         "messages": current_conversation,
-        "current_time": current_time
+        "current_time": current_time,
+        "booking": booking
     }
     logger.debug(f"State before invoke: {state}")
     try:
@@ -78,273 +117,352 @@ def receive_message_from_caller(message: str, conversation_history: List[Any], c
         logger.debug(f"New state after invoke: {new_state}")
         # Return the updated conversation
         return {
-            "messages": new_state["messages"]
+            "messages": new_state["messages"],
+            "booking": new_state.get("booking", booking)
         }
     except Exception as e:
         logger.exception(f"Error in receive_message_from_caller: {str(e)}")
         # Return error message and current conversation history
         return {
-            "messages": current_conversation + [AIMessage(content="I'm sorry, I encountered an error processing your request.")],
+            "messages": current_conversation + [AIMessage(content=ERROR_REPLY)],
+            "booking": booking
         }
 
+async def areceive_message_from_caller(message: str, conversation_history: List[Any], current_time: str, booking: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    receive_message_from_caller for asyncio callers such as the FastAPI app. The graph runs with
+    async nodes: the model is awaited and the data lookups and bookings go through async_database.
+    """
+    logger.info(f"Agent received message (async): {message}")
+    booking = {} if booking is None else booking
+    await asyncio.to_thread(check_data_versions)
+    current_conversation = conversation_history + [HumanMessage(content=message)]
+    reply = await asyncio.to_thread(_fast_path_reply, message, booking, current_time)
+    if reply is not None:
+        return {"messages": current_conversation + [AIMessage(content=reply)], "booking": booking}
+    state: AgentState = {
+        "messages": current_conversation,
+        "current_time": current_time,
+        "booking": booking
+    }
+    try:
+        new_state = await async_caller_app.ainvoke(state)
+        return {
+            "messages": new_state["messages"],
+            "booking": new_state.get("booking", booking)
+        }
+    except Exception as e:
+        logger.exception(f"Error in areceive_message_from_caller: {str(e)}")
+        return {
+            "messages": current_conversation + [AIMessage(content=ERROR_REPLY)],
+            "booking": booking
+        }
+
+def stream_message_from_caller(message: str, conversation_history: List[Any], current_time: str, booking: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Like receive_message_from_caller, but yields events while the answer is being produced.
+
+    Events:
+        {"type": "token", "text": ...}: the next piece of the model's reply, as it streams in
+        {"type": "tool", "status": "running" or "done", "name": ..., "ok": ...}: around every tool call
+        {"type": "message", "text": ...}: a whole reply written without the model (fast path, booking
+            confirmation, errors)
+        {"type": "done", "messages": ..., "booking": ...}: always last; what receive_message_from_caller returns
+    """
+    logger.info(f"Agent received message (streaming): {message}")
+    booking = {} if booking is None else booking
+    check_data_versions()
+    current_conversation = conversation_history + [HumanMessage(content=message)]
+    reply = _fast_path_reply(message, booking, current_time)
+    if reply is not None:
+        yield {"type": "message", "text": reply}
+        yield {"type": "done", "messages": current_conversation + [AIMessage(content=reply)], "booking": booking}
+        return
+    state: AgentState = {
+        "messages": current_conversation,
+        "current_time": current_time,
+        "booking": booking
+    }
+    progress = {"final": state, "streamed": False}
+    try:
+        for mode, payload in caller_app.stream(state, stream_mode=STREAM_MODES):
+            yield from _stream_events(mode, payload, progress)
+    except Exception as e:
+        logger.exception(f"Error in stream_message_from_caller: {str(e)}")
+        yield {"type": "message", "text": ERROR_REPLY}
+        yield {"type": "done", "messages": current_conversation + [AIMessage(content=ERROR_REPLY)], "booking": booking}
+        return
+    final = progress["final"]
+    yield {"type": "done", "messages": final["messages"], "booking": final.get("booking", booking)}
+
+async def astream_message_from_caller(message: str, conversation_history: List[Any], current_time: str, booking: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+    """stream_message_from_caller over the async graph; yields the same events."""
+    logger.info(f"Agent received message (async streaming): {message}")
+    booking = {} if booking is None else booking
+    await asyncio.to_thread(check_data_versions)
+    current_conversation = conversation_history + [HumanMessage(content=message)]
+    reply = await asyncio.to_thread(_fast_path_reply, message, booking, current_time)
+    if reply is not None:
+        yield {"type": "message", "text": reply}
+        yield {"type": "done", "messages": current_conversation + [AIMessage(content=reply)], "booking": booking}
+        return
+    state: AgentState = {
+        "messages": current_conversation,
+        "current_time": current_time,
+        "booking": booking
+    }
+    progress = {"final": state, "streamed": False}
+    try:
+        async for mode, payload in async_caller_app.astream(state, stream_mode=STREAM_MODES):
+            for event in _stream_events(mode, payload, progress):
+                yield event
+    except Exception as e:
+        logger.exception(f"Error in astream_message_from_caller: {str(e)}")
+        yield {"type": "message", "text": ERROR_REPLY}
+        yield {"type": "done", "messages": current_conversation + [AIMessage(content=ERROR_REPLY)], "booking": booking}
+        return
+    final = progress["final"]
+    yield {"type": "done", "messages": final["messages"], "booking": final.get("booking", booking)}
+
+def _stream_events(mode: str, payload: Any, progress: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Events for one item of the graph's stream. `progress` carries whether the model's reply
+    streamed token by token and the latest full state from one item to the next."""
+    if mode == "messages":
+        chunk, metadata = payload
+        # Only the model's own token chunks; whole messages come through the node updates.
+        if (isinstance(chunk, AIMessageChunk) and metadata.get("langgraph_node") == "agent"
+                and isinstance(chunk.content, str) and chunk.content):
+            progress["streamed"] = True
+            yield {"type": "token", "text": chunk.content}
+    elif mode == "updates":
+        for node, update in payload.items():
+            yield from _update_events(node, update["messages"], progress["streamed"])
+            progress["streamed"] = False
+    else:
+        progress["final"] = payload
+
+def _update_events(node: str, messages: List[Any], streamed: bool) -> Iterator[Dict[str, Any]]:
+    """Tool-status and whole-message events for what one graph node just added to the conversation."""
+    last = messages[-1]
+    if node == "agent":
+        for call in last.tool_calls if isinstance(last, AIMessage) else []:
+            yield {"type": "tool", "status": "running", "name": call["name"]}
+        if isinstance(last, AIMessage) and last.content and not streamed:
+            # e.g. the apology after a failed model call, which never streamed.
+            yield {"type": "message", "text": last.content}
+        return
+    reply = last if isinstance(last, AIMessage) else None
+    results = []
+    for message in reversed(messages[:-1] if reply is not None else messages):
+        if not isinstance(message, ToolMessage):
+            break
+        results.append(message)
+    for result in reversed(results):
+        yield {"type": "tool", "status": "done", "name": result.name, "ok": not result.content.startswith("Error")}
+    if reply is not None:
+        yield {"type": "message", "text": reply.content}
+
+# Tools the model may call, by name. Each is wrapped once at import in a StructuredTool whose
+# argument schema (a pydantic model built from the signature) validates every call.
+available_functions = {
+    "book_appointment": book_appointment,
+    "get_next_available_appointment": get_next_available_appointment,
+    "cancel_appointment": cancel_appointment,
+    "get_all_trains": get_all_trains,
+    "search_trains": search_trains,
+    "search_stations": search_stations,
+    "get_train_route": get_train_route,
+    "find_journeys": find_journeys,
+    "find_nearby_stations": find_nearby_stations
+}
+caller_tools = {name: StructuredTool.from_function(function, name=name) for name, function in available_functions.items()}
+# The JSON schemas are sent with every request, so they are converted once here as well.
+llm_with_tools = llm.bind_tools(list(caller_tools.values()))
+logger.info(f"Tools bound to the LLM: {list(caller_tools)}")
+
+# Read-only lookups repeat across turns and users, so they are answered from the shared
+# database.tool_results cache. The database.invalidate_* hooks drop them after writes made in
+# this process; writes made elsewhere are noticed by check_data_versions() at the next turn.
+CACHED_TOOLS = ("get_all_trains", "search_stations", "search_trains", "get_train_route")
+for name in CACHED_TOOLS:
+    available_functions[name] = tool_results.wrap(name, available_functions[name])
+
+# The async graph's versions of the tools, sharing the cache entries above. Tools missing here
+# have no async data path yet and run in a worker thread instead.
+async_functions = {
+    "book_appointment": book_appointment_async,
+    "get_all_trains": async_database.get_all_trains,
+    "search_stations": async_database.search_stations,
+    "search_trains": async_database.search_trains,
+    "get_train_route": async_database.get_train_route,
+}
+for name in CACHED_TOOLS:
+    async_functions[name] = tool_results.wrap_async(name, async_functions[name])
+
 def should_continue_caller(state: AgentState) -> str:
-    logger.debug(f"Entering should_continue_caller with state: {state}")
     messages = state["messages"]
     if not messages:
         logger.warning("No messages in state")
         return "end"
     last_message = messages[-1]
-    # Check if the last message is an AIMessage and has content (not just tool calls)
-    if isinstance(last_message, AIMessage) and last_message.content and "<tool_call>" not in last_message.content:
-        logger.info("Ending conversation")
-        return "end"
-    else:
-        logger.info("Continuing conversation")
+    # The model asks for tools through structured tool_calls; anything else is its reply to the user.
+    if isinstance(last_message, AIMessage) and last_message.tool_calls:
+        logger.info(f"Model requested tools: {[call['name'] for call in last_message.tool_calls]}")
         return "continue"
+    logger.info("Ending conversation")
+    return "end"
+
+def should_continue_after_tools(state: AgentState) -> str:
+    # A completed booking ends with its confirmation; the model has nothing left to add.
+    return "end" if isinstance(state["messages"][-1], AIMessage) else "continue"
+
+MODEL_ERROR_REPLY = "I'm sorry, I encountered an error while processing with the AI. Could you please try again?"
+
+def _caller_prompt(state: AgentState) -> List[Any]:
+    # The system message is always first and never stored in the history. Only the newest
+    # turns are sent; older ones are replaced by a summary of the booking slots.
+    return context_window.build_messages(config.CALLER_PA_PROMPT.format(current_time=state["current_time"]),
+                                         state["messages"], state.get("booking") or {})
 
 def call_caller_model(state: AgentState) -> AgentState:
-    logger.debug(f"Entering call_caller_model with state: {state}")
     messages = state["messages"]
     current_time = state["current_time"]
 
     try:
-        # Ensure the system message is always the first message in the formatted list
-        system_message_content = config.CALLER_PA_PROMPT.format(current_time=current_time)
-        formatted_messages = [
-            SystemMessage(content=system_message_content)
-        ]
-
-        # Append all messages from the state, excluding any existing SystemMessages from history
-        for m in messages:
-            if isinstance(m, (HumanMessage, AIMessage)):
-                 # Avoid adding duplicate system messages if they somehow ended up in history
-                if not (isinstance(m, SystemMessage) and m.content == system_message_content):
-                    formatted_messages.append(m)
-            else:
-                logger.warning(f"Unexpected message type in history: {type(m)}")
-
-        logger.debug(f"Formatted messages for LLM: {formatted_messages}")
-
-        llm_response = llm.invoke(formatted_messages)
+        # Under caller_app.stream() the graph's callbacks reach this call, so
+        # stream_message_from_caller receives the reply token by token.
+        llm_response = llm_with_tools.invoke(_caller_prompt(state))
         logger.info(f"LLM response: {llm_response}")
+        return {"messages": messages + [llm_response], "current_time": current_time}
 
-        # Append the LLM's response to the messages
-        new_messages = messages + [llm_response]
+    except Exception as e:
+        logger.exception(f"Error in call_caller_model: {str(e)}")
+        return {"messages": messages + [AIMessage(content=MODEL_ERROR_REPLY)],
+                "current_time": current_time}
 
-        new_state = {"messages": new_messages, "current_time": current_time}
-        logger.debug(f"New state after LLM response: {new_state}")
-        return new_state
+async def acall_caller_model(state: AgentState) -> AgentState:
+    messages = state["messages"]
+    current_time = state["current_time"]
+
+    try:
+        llm_response = await llm_with_tools.ainvoke(_caller_prompt(state))
+        logger.info(f"LLM response: {llm_response}")
+        return {"messages": messages + [llm_response], "current_time": current_time}
 
     except Exception as e:
-        logger.exception(f"Error in call_caller_model: {str(e)}")
-        # Append the error message to the messages
-        error_message = AIMessage(content="I'm sorry, I encountered an error while processing with the AI. Could you please try again?")
-        return {"messages": messages + [error_message],
+        logger.exception(f"Error in acall_caller_model: {str(e)}")
+        return {"messages": messages + [AIMessage(content=MODEL_ERROR_REPLY)],
                 "current_time": current_time}
 
-def preprocess_llm_output(state: AgentState) -> AgentState:
-    logger.debug(f"Entering preprocess_llm_output with state: {state}")
-    last_message = state["messages"][-1]
-    # Check if the last message is an AIMessage and contains a tool call marker
-    if isinstance(last_message, AIMessage) and last_message.content and "<tool_call>" in last_message.content:
-        content = last_message.content
-        logger.debug(f"Preprocessing message with tool call: {content}")
-        try:
-            # Extract the tool call string between the markers
-            tool_call_match = re.search(r"<tool_call>(.*?)</tool_call>", content)
-            if tool_call_match:
-                tool_call_str = tool_call_match.group(1).strip()
-                logger.info(f"Extracted tool call string: {tool_call_str}")
-                
-                # Parse function name and arguments safely
-                match = re.match(r"(\w+)\((.*)\)", tool_call_str)
-                if match:
-                    function_name = match.group(1)
-                    args_str = match.group(2)
-                    
-                    # Safely evaluate arguments (assuming simple key=value or just values)
-                    # A more robust approach might use a proper parser or Pydantic
-                    args = {}
-                    if args_str:
-                        try:
-                            # Attempt to parse arguments as a JSON object if it looks like one
-                            if args_str.startswith('{') and args_str.endswith('}'):
-                                args = json.loads(args_str.replace('\'', '"')) # Replace single quotes with double for JSON
-                            else:
-                                # Otherwise, parse simple key=value pairs or single value
-                                for arg in args_str.split(','):
-                                    key_value = arg.split('=', 1)
-                                    if len(key_value) == 2:
-                                        key = key_value[0].strip()
-                                        value = key_value[1].strip().strip('\'').strip('"') # Remove quotes
-                                        args[key] = value
-                                    else:
-                                        # Handle cases with a single un-named argument
-                                        args['query'] = arg.strip().strip('\'').strip('"')
-
-                        except json.JSONDecodeError:
-                             # Fallback if JSON parsing fails
-                            logger.warning(f"Could not parse arguments as JSON, attempting key=value parsing: {args_str}")
-                            args = {}
-                            for arg in args_str.split(','):
-                                key_value = arg.split('=', 1)
-                                if len(key_value) == 2:
-                                    key = key_value[0].strip()
-                                    value = key_value[1].strip().strip('\'').strip('"') # Remove quotes
-                                    args[key] = value
-                                else:
-                                     # Handle cases with a single un-named argument
-                                     args['query'] = arg.strip().strip('\'').strip('"')
-                        except Exception as arg_e:
-                            logger.error(f"Unexpected error parsing arguments '{args_str}': {arg_e}")
-                            args = {}
-
-                    logger.info(f"Parsed function name: {function_name}, arguments: {args}")
-                    
-                    # Map function name to the actual Python function
-                    available_functions = {
-                        "book_appointment": book_appointment,
-                        "get_next_available_appointment": get_next_available_appointment,
-                        "cancel_appointment": cancel_appointment,
-                        "get_all_trains": get_all_trains,
-                        "search_stations": search_stations, # Add new tool mapping
-                        "get_train_route": get_train_route  # Add new tool mapping
-                    }
-                    
-                    if function_name in available_functions:
-                        func_to_call = available_functions[function_name]
-                        logger.info(f"Calling function: {function_name} with args: {args}")
-                        # Call the function with parsed arguments
-                        try:
-                            result = func_to_call(**args)
-                            logger.info(f"Tool execution successful. Result: {result}")
-
-                            # Check if the successful tool call was book_appointment
-                            if function_name == "book_appointment":
-                                logger.info(f"book_appointment tool called. Result: {result}")
-                                if result.get("success"):
-                                    booking_details = result.get("booking_details")
-                                    if booking_details:
-                                        logger.info(f"Booking successful. Details received: {booking_details}")
-                                        # Define output directory and create if it doesn't exist
-                                        output_dir = "tickets"
-                                        os.makedirs(output_dir, exist_ok=True)
-                                        
-                                        # Define output path for the PDF
-                                        pnr = booking_details.get('pnr', 'ticket')
-                                        output_file = os.path.join(output_dir, f"ticket_{pnr}.pdf")
-                                        
-                                        logger.info(f"Attempting to generate PDF ticket at: {output_file}")
-                                        # Generate the PDF ticket
-                                        pdf_result = generate_ticket_pdf(booking_details, output_file)
-                                        logger.info(f"PDF generation result: {pdf_result}")
-                                        
-                                        if pdf_result.get("success"):
-                                            ticket_message = f"\nYour ticket has been generated (PNR: {pnr}). You can find it at: {output_file}" # Inform user about the ticket
-                                            logger.info(f"Ticket generated successfully: {output_file}")
-                                        else:
-                                            ticket_message = f"\nBooking successful (PNR: {pnr}), but failed to generate ticket: {pdf_result.get('error')}"
-                                            logger.error(f"Failed to generate ticket for PNR {pnr}: {pdf_result.get('error')}")
-                                        
-                                        # Update the AI's message to include booking confirmation and ticket info
-                                        confirmation_message = f"Successfully booked train {booking_details.get('train_name', 'N/A')} from {booking_details.get('source_station_name', 'N/A')} to {booking_details.get('destination_station_name', 'N/A')} on {booking_details.get('journey_date', 'N/A')}. PNR: {pnr}."
-                                        state["messages"][-1] = AIMessage(content=confirmation_message + ticket_message)
-                                    else:
-                                         logger.error("book_appointment returned success but no booking_details.")
-                                         state["messages"][-1] = AIMessage(content="Booking successful, but could not retrieve booking details.")
-                                else:
-                                    # Handle booking failure
-                                    error_message = result.get("error", "Unknown booking error.")
-                                    logger.error(f"book_appointment failed. Error: {error_message}")
-                                    state["messages"][-1] = AIMessage(content=f"Booking failed: {error_message}")
-                            elif function_name == "book_appointment" and result.get("success") is False:
-                                # Handle booking failure
-                                error_message = result.get("error", "Unknown booking error.")
-                                state["messages"][-1] = AIMessage(content=f"Booking failed: {error_message}")
-                            else:
-                                # For other tools, just return the result
-                                state["messages"][-1] = AIMessage(content=f"Tool Result: {result}")
-
-                        except TypeError as type_e:
-                            logger.error(f"TypeError when calling {function_name} with args {args}: {type_e}")
-                            state["messages"][-1] = AIMessage(content=f"Error calling tool {function_name}: Invalid arguments provided. {type_e}")
-                        except Exception as exec_e:
-                             logger.exception(f"Error during execution of tool {function_name} with args {args}: {exec_e}")
-                             state["messages"][-1] = AIMessage(content=f"Error executing tool {function_name}: {exec_e}")
-                    else:
-                        logger.warning(f"Tool function not found: {function_name}")
-                        state["messages"][-1] = AIMessage(content=f"Tool function not found: {function_name}")
-                else:
-                    logger.warning(f"Could not parse tool call string format: {tool_call_str}")
-                    state["messages"][-1] = AIMessage(content=f"Invalid tool call format: {tool_call_str}")
-            else:
-                logger.warning("Tool call marker found but content could not be extracted.")
-                state["messages"][-1] = AIMessage(content="Error processing tool call.")
-
-        except Exception as e:
-            logger.exception(f"Unexpected error in preprocess_llm_output: {str(e)}")
-            # If any other error occurs during preprocessing/execution
-            state["messages"][-1] = AIMessage(content=f"An unexpected error occurred during tool processing: {str(e)}")
-
-    # If the last message is not an AIMessage or doesn't contain a tool call marker,
-    # pass it through unchanged. This handles cases where the LLM directly responds.
+def _booking_confirmation(result: Dict[str, Any]) -> str:
+    """The reply for a successful book_appointment result, generating the PDF ticket on the way."""
+    booking_details = result.get("booking_details")
+    if not booking_details:
+        logger.error("book_appointment returned success but no booking_details.")
+        return "Booking successful, but could not retrieve booking details."
+    logger.info(f"Booking successful. Details received: {booking_details}")
+    output_dir = "tickets"
+    os.makedirs(output_dir, exist_ok=True)
+    pnr = booking_details.get('pnr', 'ticket')
+    output_file = os.path.join(output_dir, f"ticket_{pnr}.pdf")
+    pdf_result = generate_ticket_pdf(booking_details, output_file)
+    if pdf_result.get("success"):
+        ticket_message = f"\nYour ticket has been generated (PNR: {pnr}). You can find it at: {output_file}"
+        logger.info(f"Ticket generated successfully: {output_file}")
     else:
-         logger.debug("Last message does not contain a tool call marker, passing through.")
-         # No change needed to state
-         pass
-
-    logger.debug(f"State after preprocess: {state}")
-    return state
-
-# Define the tools accessible to the agent
-# Ensure these functions exist in your tools.py file
-caller_tools_list = [
-    book_appointment,
-    get_next_available_appointment,
-    cancel_appointment,
-    get_all_trains,       # Existing database tool
-    search_stations,      # New database tool
-    get_train_route       # New database tool
-]
-# Create a ToolNode from the list of tools
-tool_node = ToolNode(caller_tools_list)
-logger.info(f"Tools initialized for ToolNode: {caller_tools_list}")
-
-# Define the workflow using LangGraph
-caller_workflow = StateGraph(AgentState)
-
-# Add Nodes: agent (calls LLM), preprocess (handles tool calls), action (executes tools)
-caller_workflow.add_node("agent", call_caller_model)
-caller_workflow.add_node("preprocess", preprocess_llm_output)
-caller_workflow.add_node("action", tool_node)
-
-# Add Edges:
-# From 'agent', decide whether to preprocess (if likely a tool call) or end (if final response)
-# NOTE: The should_continue_caller logic needs to be refined to detect tool calls more reliably
-# A common pattern is for the LLM to format tool calls in a specific way that can be parsed.
-# The current preprocess_llm_output looks for '<tool_call>', so should_continue_caller should check for this.
-caller_workflow.add_conditional_edges(
-    "agent",
-    should_continue_caller, # This function determines the next step based on agent output
-    {
-        # If should_continue_caller returns "continue", go to preprocess (assuming it means processing required)
-        # You might adjust the logic here based on how your LLM indicates tool use vs final answer
-        "continue": "preprocess", 
-        "end": END, # If should_continue_caller returns "end", the workflow finishes
-    },
-)
-
-# After preprocessing, always go to action (execute the tool)
-caller_workflow.add_edge("preprocess", "action")
-
-# After action (tool execution), always go back to the agent to interpret the tool result and continue the conversation
-caller_workflow.add_edge("action", "agent")
-
-# Set the entry point for the workflow
-caller_workflow.set_entry_point("agent")
-
-# Compile the graph
+        ticket_message = f"\nBooking successful (PNR: {pnr}), but failed to generate ticket: {pdf_result.get('error')}"
+        logger.error(f"Failed to generate ticket for PNR {pnr}: {pdf_result.get('error')}")
+    confirmation_message = f"Successfully booked train {booking_details.get('train_name', 'N/A')} from {booking_details.get('source_station_name', 'N/A')} to {booking_details.get('destination_station_name', 'N/A')} on {booking_details.get('journey_date', 'N/A')}. PNR: {pnr}."
+    return confirmation_message + ticket_message
+
+def _tool_arguments(call: Dict[str, Any]) -> tuple:
+    """Validates one structured tool call against its schema. Returns (arguments, None) or (None, error)."""
+    tool = caller_tools.get(call["name"])
+    if tool is None:
+        logger.warning(f"Tool function not found: {call['name']}")
+        return None, f"Error: unknown tool {call['name']}. Available tools: {', '.join(caller_tools)}"
+    try:
+        return dict(tool.args_schema.model_validate(call.get("args") or {})), None
+    except ValidationError as e:
+        # Returned to the model, which can correct the call in its next turn.
+        logger.warning(f"Invalid arguments for {call['name']}: {call.get('args')}: {e}")
+        problems = "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+        return None, f"Error: invalid arguments for {call['name']}: {problems}"
+
+def run_tool_call(call: Dict[str, Any]) -> tuple:
+    """Validates one structured tool call against its schema and runs it. Returns (content, result)."""
+    arguments, error = _tool_arguments(call)
+    if error is not None:
+        return error, None
+    try:
+        result = available_functions[call["name"]](**arguments)
+    except Exception as e:
+        logger.exception(f"Error during execution of tool {call['name']} with args {arguments}: {e}")
+        return f"Error executing tool {call['name']}: {e}", None
+    logger.info(f"Tool {call['name']} returned: {result}")
+    return str(result), result
+
+async def arun_tool_call(call: Dict[str, Any]) -> tuple:
+    """run_tool_call for the async graph: awaits the async_functions version of the tool if there is one."""
+    arguments, error = _tool_arguments(call)
+    if error is not None:
+        return error, None
+    try:
+        if call["name"] in async_functions:
+            result = await async_functions[call["name"]](**arguments)
+        else:
+            result = await asyncio.to_thread(available_functions[call["name"]], **arguments)
+    except Exception as e:
+        logger.exception(f"Error during execution of tool {call['name']} with args {arguments}: {e}")
+        return f"Error executing tool {call['name']}: {e}", None
+    logger.info(f"Tool {call['name']} returned: {result}")
+    return str(result), result
+
+def execute_tools(state: AgentState) -> AgentState:
+    """Runs every tool call of the last AIMessage, answering each with a ToolMessage.
+
+    A successful booking also gets its confirmation and ticket appended as the final reply.
+    """
+    return _tool_results(state, [(call, run_tool_call(call)) for call in state["messages"][-1].tool_calls])
+
+async def aexecute_tools(state: AgentState) -> AgentState:
+    """execute_tools for the async graph. The calls still run one after another, in the model's order."""
+    outcomes = [(call, await arun_tool_call(call)) for call in state["messages"][-1].tool_calls]
+    # The booking confirmation writes the PDF ticket, so it is kept off the event loop too.
+    return await asyncio.to_thread(_tool_results, state, outcomes)
+
+def _tool_results(state: AgentState, outcomes: List[tuple]) -> AgentState:
+    """The state after the tool calls: one ToolMessage per (call, (content, result)) in `outcomes`."""
+    messages = list(state["messages"])
+    booking = state.get("booking") or {}
+    reply = None
+    for call, (content, result) in outcomes:
+        messages.append(ToolMessage(content=content, name=call["name"], tool_call_id=call["id"]))
+        if result is not None:
+            # Kept for the summary that stands in for turns dropped from the prompt.
+            context_window.remember_slots(booking, call)
+        if call["name"] == "book_appointment" and isinstance(result, dict) and result.get("success"):
+            reply = AIMessage(content=_booking_confirmation(result))
+    if reply is not None:
+        messages.append(reply)
+        # The next train ID, code or date starts a new booking.
+        booking.clear()
+    return {"messages": messages, "current_time": state["current_time"], "booking": booking}
+
+def _caller_workflow(model_node, tools_node) -> StateGraph:
+    # The model and the tools alternate until the model answers without calling a tool.
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", model_node)
+    workflow.add_node("tools", tools_node)
+    workflow.add_conditional_edges("agent", should_continue_caller, {"continue": "tools", "end": END})
+    workflow.add_conditional_edges("tools", should_continue_after_tools, {"continue": "agent", "end": END})
+    workflow.set_entry_point("agent")
+    return workflow
+
+caller_workflow = _caller_workflow(call_caller_model, execute_tools)
 caller_app = caller_workflow.compile()
+# The same graph with async nodes, for areceive_message_from_caller and astream_message_from_caller.
+async_caller_app = _caller_workflow(acall_caller_model, aexecute_tools).compile()
 logger.info("Caller workflow compiled successfully")
 
 # --- Helper function to clear conversation history (useful for testing) ---
@@ -8,7 +8,8 @@ import os
 from dotenv import load_dotenv
 
 from . import models
-from .routers import trains
+from .routers import trains, stations
+import async_database
 
 # Load environment variables
 load_dotenv()
@@ -35,6 +36,12 @@ app.add_middleware(
 
 # Include routers
 app.include_router(trains.router)
+app.include_router(stations.router)
+
+# Release pooled MySQL connections used by the async data layer
+@app.on_event("shutdown")
+async def shutdown():
+    await async_database.close_async_pool()
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
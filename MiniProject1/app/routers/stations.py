@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+import async_database
+
+router = APIRouter(
+    prefix="/stations",
+    tags=["stations"]
+)
+
+@router.get("/")
+async def search_stations(q: str = "", limit: int = 20):
+    """Search stations by code or name."""
+    stations = await async_database.search_stations(q)
+    return [{"station_code": code, "station_name": name} for code, name in stations[:limit]]
\ No newline at end of file
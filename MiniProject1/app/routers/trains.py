@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
+import async_database
 from .. import models, schemas
 from ..database import get_db
 
@@ -14,4 +15,12 @@ router = APIRouter(
 def read_trains(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Retrieve a list of trains."""
     trains = db.query(models.Train).offset(skip).limit(limit).all()
-    return trains 
\ No newline at end of file
+    return trains 
+
+@router.get("/{train_id}/route")
+async def read_train_route(train_id: str):
+    """Retrieve the ordered stops of a train's route."""
+    stops = await async_database.get_train_route(train_id)
+    if not stops:
+        raise HTTPException(status_code=404, detail=f"No route found for train {train_id}")
+    return [{"station_code": code, "station_name": name, "sequence_number": seq} for code, name, seq in stops]
\ No newline at end of file
@@ -30,6 +30,8 @@ mail = Mail(app)
 from models import *
 from routes import *
 
+app.register_blueprint(api, url_prefix='/api')
+
 @app.route('/')
 def index():
     return 'Welcome to the Railway Reservation System API!'
@@ -0,0 +1,207 @@
+from array import array
+from datetime import datetime, timedelta
+try:
+    from timetable_store import WEEKDAYS, MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY
+except ImportError:
+    from .timetable_store import WEEKDAYS, MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY
+
+MONTHS = 12
+ANY_MONTH = None
+# DelayPattern rows for DayOfWeek.SPECIAL apply to special runs.
+SPECIAL_DAY = 7
+
+
+class DelayTable:
+    """DelayPattern rows compiled into one dense int16 table per scheduled run.
+
+    A run leaves on one day of the week (or on special dates), so its table only covers that
+    day: `table[(month - 1) * stops + k]` is the average delay in minutes at its k-th stop,
+    and the delays of every stop for one month are a contiguous slice. Each month is resolved
+    once here: the (day, month) pattern if there is one, else the day's all-month pattern,
+    else 0. Where several years exist, the latest wins. Trains without patterns get no table.
+    """
+
+    def __init__(self, store, rows):
+        """store: a TimetableStore; rows: (train_id, station_code, average_delay, day name, month, year)."""
+        patterns = {}  # (train_id, station_code, day) -> {month or ANY_MONTH: (year, delay)}
+        for train_id, station_code, average_delay, day_name, month, year in rows:
+            day = SPECIAL_DAY if day_name == 'Special' else WEEKDAYS.get(day_name)
+            if day is None or average_delay is None:
+                continue
+            month = month if month else ANY_MONTH
+            by_month = patterns.get((train_id, station_code, day))
+            if by_month is None:
+                by_month = patterns[train_id, station_code, day] = {}
+            if month not in by_month or (year or 0) >= by_month[month][0]:
+                by_month[month] = (year or 0, int(average_delay))
+        trains_with_patterns = {train_id for train_id, _, _ in patterns}
+        self.tables = {}
+        self.train_runs = {}
+        codes = store.station_codes
+        for n in range(len(store)):
+            train_id = store.train_ids[store.run_train[n]]
+            self.train_runs.setdefault(train_id, []).append(n)
+            if train_id not in trains_with_patterns:
+                continue
+            day = store.run_weekday[n]
+            day = SPECIAL_DAY if day == NO_WEEKDAY else day
+            start, end = store.route_stops(store.run_route[n])
+            stops = end - start
+            table = array('h', bytes(2 * MONTHS * stops))
+            for k, s in enumerate(store.stop_stations[start:end]):
+                by_month = patterns.get((train_id, codes[s], day))
+                if not by_month:
+                    continue
+                monthly = array('h', [by_month.get(ANY_MONTH, (0, 0))[1]]) * MONTHS
+                for month, (_, delay) in by_month.items():
+                    if month is not ANY_MONTH:
+                        monthly[month - 1] = delay
+                # One strided write puts the stop's twelve monthly delays in place.
+                table[k::stops] = monthly
+            self.tables[n] = table
+
+    def __len__(self):
+        return len(self.tables)
+
+    def delays(self, run, day, stops):
+        """The pattern delay at each of the run's `stops` stops in `day`'s month (a memoryview slice), or None."""
+        table = self.tables.get(run)
+        if table is None:
+            return None
+        month = day.month - 1
+        return memoryview(table)[month * stops:(month + 1) * stops]
+
+
+class EtaSnapshot:
+    """Expected arrivals of every running train, computed in one pass.
+
+    `live` holds (train_id, journey_date, current_station, delay_minutes) for each train with
+    an operational status. Downstream of its current station a train keeps its live delay
+    plus whatever its delay pattern adds between there and each later stop (never below
+    zero), so a train running 20 minutes late towards a stop where it usually loses another
+    10 is expected 30 late. Trains without a live status are projected from patterns alone
+    when asked for.
+    """
+
+    def __init__(self, timetable, delay_table, live, computed_at):
+        self.timetable = timetable
+        self.delay_table = delay_table
+        self.computed_at = computed_at
+        self.trains = {}
+        for train_id, journey_date, current_station, delay_minutes in live:
+            projection = self._project(train_id, journey_date, current_station, delay_minutes or 0)
+            if projection is not None:
+                self.trains[(train_id, journey_date)] = projection
+
+    def __len__(self):
+        return len(self.trains)
+
+    def _run_for(self, train_id, journey_date):
+        """The run of `train_id` leaving its origin on `journey_date`: that weekday's, else a special run."""
+        runs = self.delay_table.train_runs.get(train_id, ())
+        store = self.timetable.store
+        weekday = journey_date.weekday()
+        for wanted in (weekday, NO_WEEKDAY):
+            for n in runs:
+                if store.run_weekday[n] == wanted:
+                    return n
+        return None
+
+    def origin_date(self, train_id, boarding_date, station_code):
+        """The day `train_id` left its origin for a journey boarding at `station_code` on `boarding_date`
+        (reservations store the boarding date), or None if no run of the train leaves there that day."""
+        store = self.timetable.store
+        for n in self.delay_table.train_runs.get(train_id, ()):
+            stops = self.timetable.route_stations[store.route_ids[store.run_route[n]]]
+            if station_code not in stops:
+                continue
+            t = store.run_offsets[n] + stops.index(station_code)
+            departure = store.time_departures[t] if store.time_departures[t] != NO_TIME else store.time_arrivals[t]
+            offset = departure // MINUTES_PER_DAY if departure != NO_TIME else 0
+            origin = boarding_date - timedelta(days=offset)
+            if self._run_for(train_id, origin) == n:
+                return origin
+        return None
+
+    def _project(self, train_id, journey_date, current_station, delay):
+        run = self._run_for(train_id, journey_date)
+        if run is None:
+            return None
+        store = self.timetable.store
+        start, end = store.route_stops(store.run_route[run])
+        stops = self.timetable.route_stations[store.route_ids[store.run_route[run]]]
+        t0, t1 = store.run_times(run)
+        arrivals = store.time_arrivals[t0:t1]
+        departures = store.time_departures[t0:t1]
+        position = stops.index(current_station) if current_station in stops else -1
+        pattern = self.delay_table.delays(run, journey_date, end - start)
+        if pattern is None:
+            expected = [delay] * len(stops)
+        else:
+            base = pattern[position] if position >= 0 else 0
+            shift = delay - base
+            expected = [d + shift if d + shift > 0 else 0 for d in pattern]
+        return {
+            'run': run,
+            'stops': stops,
+            'position': position,
+            'arrivals': arrivals,
+            'departures': departures,
+            'expected_delays': expected,
+            'live_delay': delay,
+        }
+
+    def _projection(self, train_id, journey_date):
+        """(projection, live) for a train, projecting from patterns alone if it has no live status."""
+        projection = self.trains.get((train_id, journey_date))
+        if projection is not None:
+            return projection, True
+        return self._project(train_id, journey_date, None, 0), False
+
+    def _stop(self, projection, live, journey_date, k):
+        scheduled = projection['arrivals'][k]
+        if scheduled == NO_TIME:
+            scheduled = projection['departures'][k]
+        if scheduled == NO_TIME:
+            return None
+        origin = datetime.combine(journey_date, datetime.min.time())
+        delay = projection['expected_delays'][k]
+        return {
+            'station_code': projection['stops'][k],
+            'scheduled_arrival': (origin + timedelta(minutes=scheduled)).strftime('%Y-%m-%d %H:%M'),
+            'expected_arrival': (origin + timedelta(minutes=scheduled + delay)).strftime('%Y-%m-%d %H:%M'),
+            'expected_delay_minutes': delay,
+            'passed': live and k <= projection['position'],
+        }
+
+    def eta(self, train_id, journey_date, station_code):
+        """Scheduled and expected arrival of `train_id` (journey leaving its origin on `journey_date`)
+        at `station_code`, or None if the station is not on the run."""
+        projection, live = self._projection(train_id, journey_date)
+        if projection is None or station_code not in projection['stops']:
+            return None
+        stop = self._stop(projection, live, journey_date, projection['stops'].index(station_code))
+        if stop is None:
+            return None
+        stop.update({
+            'train_id': train_id,
+            'journey_date': journey_date.strftime('%Y-%m-%d'),
+            'source': 'live' if live else 'pattern',
+            'computed_at': self.computed_at.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        return stop
+
+    def timeline(self, train_id, journey_date):
+        """Every stop of the run with its scheduled and expected arrival, or None if the train does not run."""
+        projection, live = self._projection(train_id, journey_date)
+        if projection is None:
+            return None
+        stops = [self._stop(projection, live, journey_date, k) for k in range(len(projection['stops']))]
+        return {
+            'train_id': train_id,
+            'journey_date': journey_date.strftime('%Y-%m-%d'),
+            'source': 'live' if live else 'pattern',
+            'live_delay_minutes': projection['live_delay'],
+            'computed_at': self.computed_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'stops': [stop for stop in stops if stop is not None],
+        }
@@ -0,0 +1,170 @@
+import math
+from array import array
+
+# Rupees per km in each telescopic band: the first 300 km at the full rate, then cheaper.
+BAND_LIMITS_KM = (300, 1000, 2500)
+BAND_FACTORS = (1.0, 0.85, 0.7, 0.6)
+RATE_PER_KM = {
+    'general': 0.25,
+    'sleeper': 0.55,
+    'chair': 1.10,
+    'ac3': 1.45,
+    'ac2': 2.05,
+    'executive': 2.80,
+    'ac1': 3.40,
+}
+RESERVATION_CHARGE = {
+    'general': 0,
+    'sleeper': 20,
+    'chair': 40,
+    'ac3': 40,
+    'ac2': 50,
+    'executive': 60,
+    'ac1': 60,
+}
+MINIMUM_CHARGEABLE_KM = 50
+# Share of the base fare each age category pays; the reservation charge is never discounted.
+AGE_CONCESSIONS = {'Adult': 1.0, 'Child': 0.5, 'Senior': 0.6, 'Unknown': 1.0}
+# Classes summarised as the AC / non-AC fare in train search results.
+SEARCH_CLASSES = {'ac': 'ac3', 'nonac': 'sleeper'}
+
+
+def categorize_age(age):
+    """Same bands as the agent's database.categorize_age."""
+    if age is None:
+        return 'Unknown'
+    if age < 12:
+        return 'Child'
+    if age >= 60:
+        return 'Senior'
+    return 'Adult'
+
+
+class FareTable:
+    """Precomputed fares for every (route, segment, coach type, age category).
+
+    Each route keeps its cumulative distances in an array, so a segment's distance is one
+    subtraction. Fares are tabulated per whole kilometre for every coach type and age
+    category once, so the fare for a distance is a single array index. Routes can be replaced
+    one at a time with `update_route`; the per-km tables only grow when a route is longer
+    than any seen before.
+    """
+
+    def __init__(self):
+        self.route_distances = {}
+        self.route_positions = {}
+        self.train_routes = {}
+        self.max_km = 0
+        self._tables = {}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.route_distances)
+
+    def _ensure_km(self, km):
+        """Extends the per-km fare tables to cover `km` kilometres."""
+        if km <= self.max_km and self._tables:
+            return
+        self.max_km = max(km, self.max_km, MINIMUM_CHARGEABLE_KM)
+        for coach_type, rate in RATE_PER_KM.items():
+            base = array('d', [0.0])
+            total = 0.0
+            for k in range(1, self.max_km + 1):
+                band = sum(1 for limit in BAND_LIMITS_KM if k > limit)
+                total += rate * BAND_FACTORS[band]
+                base.append(total)
+            for category, share in AGE_CONCESSIONS.items():
+                charge = RESERVATION_CHARGE[coach_type]
+                self._tables[(coach_type, category)] = array('i', (
+                    round(base[max(k, MINIMUM_CHARGEABLE_KM)] * share) + charge for k in range(self.max_km + 1)))
+
+    def load(self, route_stations, train_routes):
+        """Builds every route from (route_id, station_code, sequence_number, distance_from_source) rows
+        and maps trains to routes from (train_id, route_id) pairs."""
+        routes = {}
+        for route_id, station_code, sequence_number, distance in route_stations:
+            routes.setdefault(route_id, []).append((station_code, sequence_number, distance))
+        self.route_distances, self.route_positions = {}, {}
+        for route_id, stops in routes.items():
+            self._set_route(route_id, stops)
+        self.train_routes = dict(train_routes)
+        self._ensure_km(self._longest_route_km())
+        self.loaded = True
+
+    def _set_route(self, route_id, stops):
+        stops = sorted(stops, key=lambda stop: stop[1])
+        self.route_distances[route_id] = array('d', (float(distance or 0) for _, _, distance in stops))
+        self.route_positions[route_id] = {code.upper(): i for i, (code, _, _) in enumerate(stops)}
+
+    def _longest_route_km(self):
+        return max((math.ceil(d[-1] - d[0]) for d in self.route_distances.values() if d), default=0)
+
+    def update_route(self, route_id, stops):
+        """Replaces one route's stops, given as (station_code, sequence_number, distance_from_source)."""
+        stops = list(stops)
+        if not stops:
+            self.remove_route(route_id)
+            return
+        self._set_route(route_id, stops)
+        distances = self.route_distances[route_id]
+        self._ensure_km(math.ceil(max(distances) - min(distances)))
+
+    def remove_route(self, route_id):
+        self.route_distances.pop(route_id, None)
+        self.route_positions.pop(route_id, None)
+
+    def set_train_route(self, train_id, route_id):
+        self.train_routes[train_id] = route_id
+
+    def distance(self, route_id, from_code, to_code):
+        """Kilometres from one stop of a route to a later one, or None if that is not a segment of it."""
+        positions = self.route_positions.get(route_id)
+        if positions is None:
+            return None
+        src, dst = positions.get(from_code), positions.get(to_code)
+        if src is None or dst is None or src >= dst:
+            return None
+        distances = self.route_distances[route_id]
+        return distances[dst] - distances[src]
+
+    def fare_for_distance(self, km, coach_type, category='Adult'):
+        table = self._tables.get((coach_type.lower(), category))
+        if table is None:
+            return None
+        km = math.ceil(km)
+        if km >= len(table):
+            self._ensure_km(km)
+            table = self._tables[(coach_type.lower(), category)]
+        return table[km]
+
+    def quote(self, train_id, from_code, to_code, coach_type, category='Adult'):
+        """Fare in whole rupees for one passenger, or None if the train, segment or class is unknown."""
+        route_id = self.train_routes.get(train_id)
+        km = self.distance(route_id, from_code, to_code) if route_id is not None else None
+        if km is None:
+            return None
+        return self.fare_for_distance(km, coach_type, category)
+
+    def quote_many(self, segments, coach_type, category='Adult'):
+        """Fares for a list of (route_id, from_code, to_code) segments, None where unknown.
+
+        The chargeable kilometres for the whole list are worked out first and then looked up
+        in one pass over the same fare table.
+        """
+        table = self._tables.get((coach_type.lower(), category))
+        if table is None:
+            return [None] * len(segments)
+        kms = [self.distance(route_id, from_code, to_code) for route_id, from_code, to_code in segments]
+        longest = max((km for km in kms if km is not None), default=0)
+        if math.ceil(longest) >= len(table):
+            self._ensure_km(math.ceil(longest))
+            table = self._tables[(coach_type.lower(), category)]
+        return [None if km is None else table[math.ceil(km)] for km in kms]
+
+    def fill_search_fares(self, results, category='Adult'):
+        """Sets the AC / non-AC `fare` of Timetable.search results in place."""
+        segments = [(result['route_id'], result['from'], result['to']) for result in results]
+        columns = {key: self.quote_many(segments, coach_type, category) for key, coach_type in SEARCH_CLASSES.items()}
+        for i, result in enumerate(results):
+            result['fare'] = {key: fares[i] for key, fares in columns.items()}
+        return results
@@ -0,0 +1,141 @@
+import heapq
+import math
+from array import array
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 8
+
+
+def _unit_vector(lat, lon):
+    """Point on the unit sphere for a latitude/longitude in radians."""
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def _chord_squared(km):
+    """Squared straight-line distance through the unit sphere for a great-circle distance in km."""
+    return (2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+
+class StationGeoIndex:
+    """KD-tree over station coordinates for radius and k-nearest queries.
+
+    Stations are placed on the unit sphere, where straight-line (chord) distance grows with
+    great-circle distance, so the tree needs no special cases at the poles or the date line.
+    The tree is implicit: `order` holds station ids and each range [lo, hi) splits at its
+    middle element on the axis recorded in `axes`. Reported distances are haversine km,
+    computed for a whole result list at once from precomputed radians and cosines.
+    """
+
+    def __init__(self, rows):
+        """rows: (station_code, station_name, latitude, longitude); stations without coordinates are skipped."""
+        rows = [(code, name, float(lat), float(lon)) for code, name, lat, lon in rows
+                if lat is not None and lon is not None]
+        self.codes = [code for code, _, _, _ in rows]
+        self.names = [name for _, name, _, _ in rows]
+        self.by_code = {code.upper(): i for i, code in enumerate(self.codes)}
+        self.lat = array('d', (math.radians(lat) for _, _, lat, _ in rows))
+        self.lon = array('d', (math.radians(lon) for _, _, _, lon in rows))
+        self.cos_lat = array('d', (math.cos(lat) for lat in self.lat))
+        vectors = [_unit_vector(lat, lon) for lat, lon in zip(self.lat, self.lon)]
+        self.coords = tuple(array('d', (v[axis] for v in vectors)) for axis in range(3))
+        self.order = array('i', range(len(rows)))
+        self.axes = array('b', [0] * len(rows))
+        self._build(0, len(rows))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _build(self, lo, hi):
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            ids = self.order[lo:hi]
+            spreads = [max(c[i] for i in ids) - min(c[i] for i in ids) for c in self.coords]
+            axis = spreads.index(max(spreads))
+            column = self.coords[axis]
+            self.order[lo:hi] = array('i', sorted(ids, key=column.__getitem__))
+            mid = (lo + hi) // 2
+            self.axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def haversine_km(self, lat, lon, ids):
+        """Great-circle km from (lat, lon) in degrees to every station in `ids`, in one pass."""
+        lat, lon = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat)
+        lats, lons, cos_lats = self.lat, self.lon, self.cos_lat
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        return [2 * EARTH_RADIUS_KM * asin(sqrt(min(1.0, sin((lats[i] - lat) / 2) ** 2 +
+                                                   cos_lat * cos_lats[i] * sin((lons[i] - lon) / 2) ** 2)))
+                for i in ids]
+
+    def _search(self, query, limit_squared, k=None):
+        """Returns [(chord squared, id)] within `limit_squared`, or the k nearest of those when k is set."""
+        qx, qy, qz = query
+        xs, ys, zs = self.coords
+        order, axes = self.order, self.axes
+        found = []  # max-heap of (-chord squared, id) when k is set, else a plain list
+        stack = [(0, len(order), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            worst = -found[0][0] if k and len(found) == k else limit_squared
+            if bound > worst:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                candidates = order[lo:hi]
+            else:
+                mid = (lo + hi) // 2
+                candidates = (order[mid],)
+                axis = axes[mid]
+                diff = query[axis] - self.coords[axis][order[mid]]
+                near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+                stack.append((far[0], far[1], diff * diff))
+                stack.append((near[0], near[1], bound))
+            for i in candidates:
+                d = (xs[i] - qx) ** 2 + (ys[i] - qy) ** 2 + (zs[i] - qz) ** 2
+                if d > limit_squared:
+                    continue
+                if not k:
+                    found.append((d, i))
+                elif len(found) < k:
+                    heapq.heappush(found, (-d, i))
+                elif d < -found[0][0]:
+                    heapq.heapreplace(found, (-d, i))
+        if k:
+            found = [(-d, i) for d, i in found]
+        found.sort()
+        return found
+
+    def _results(self, lat, lon, found):
+        ids = [i for _, i in found]
+        return [{
+            'station_code': self.codes[i],
+            'station_name': self.names[i],
+            'latitude': round(math.degrees(self.lat[i]), 6),
+            'longitude': round(math.degrees(self.lon[i]), 6),
+            'distance_km': round(km, 2),
+        } for i, km in zip(ids, self.haversine_km(lat, lon, ids))]
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """Stations within `radius_km` of (lat, lon) in degrees, nearest first."""
+        query = _unit_vector(math.radians(lat), math.radians(lon))
+        found = self._search(query, _chord_squared(radius_km))
+        return self._results(lat, lon, found[:limit] if limit else found)
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """The `k` stations nearest to (lat, lon) in degrees, optionally no further than `max_km`."""
+        if k < 1:
+            return []
+        query = _unit_vector(math.radians(lat), math.radians(lon))
+        limit = _chord_squared(max_km) if max_km is not None else 4.0
+        return self._results(lat, lon, self._search(query, limit, k))
+
+    def location(self, station_code):
+        """(latitude, longitude) in degrees of an indexed station, or None."""
+        i = self.by_code.get(str(station_code).strip().upper())
+        if i is None:
+            return None
+        return math.degrees(self.lat[i]), math.degrees(self.lon[i])
@@ -0,0 +1,208 @@
+from bisect import bisect_left
+from datetime import timedelta
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+NO_TIME = -1
+NO_WEEKDAY = -1
+INFINITY = float('inf')
+
+# Longest search window; connections departing this early in the week are repeated one week
+# later so a search starting late on Sunday can run into Monday's trains. Hops of a Sunday run
+# that leave after midnight are repeated one week earlier, so Monday searches see them too.
+MAX_HORIZON_MINUTES = 2 * MINUTES_PER_DAY
+DEFAULT_HORIZON_MINUTES = 30 * 60
+DEFAULT_TRANSFER_MINUTES = 10
+MAX_CHANGES = 2
+
+
+def _clock(minutes):
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
+class JourneyPlanner:
+    """Connection Scan over a train_search.Timetable.
+
+    Every scheduled hop between consecutive stops becomes a connection, placed on a weekly cycle
+    (Monday 00:00 = minute 0) by the run's day of operation and sorted by departure. A query
+    scans forward from the requested departure once, keeping the earliest arrival at each
+    station for every number of trains used, so results with 0, 1 and 2 changes come out of
+    the same pass. Changing trains needs `transfer_minutes[station]` (or the default);
+    staying on the same train does not.
+    """
+
+    def __init__(self, timetable, transfer_minutes=None, default_transfer_minutes=DEFAULT_TRANSFER_MINUTES):
+        self.timetable = timetable
+        store = timetable.store
+        # Station ints are the store's, so stops need no translation.
+        self.stations = store.station_codes
+        self.station_index = store.station_index
+        transfer_minutes = transfer_minutes or {}
+        self.transfer = [transfer_minutes.get(code, default_transfer_minutes) for code in self.stations]
+
+        connections = []
+        run_count = len(store)
+        stop_stations, arrivals, departures = store.stop_stations, store.time_arrivals, store.time_departures
+        for run in range(run_count):
+            weekday = store.run_weekday[run]
+            if weekday == NO_WEEKDAY:
+                continue
+            first_stop, last_stop = store.route_stops(store.run_route[run])
+            first_time = store.run_offsets[run]
+            base = weekday * MINUTES_PER_DAY
+            for i in range(last_stop - first_stop - 1):
+                departure = departures[first_time + i]
+                arrival = arrivals[first_time + i + 1]
+                if arrival == NO_TIME:
+                    arrival = departures[first_time + i + 1]
+                if departure == NO_TIME or arrival == NO_TIME:
+                    continue
+                from_stop, to_stop = stop_stations[first_stop + i], stop_stations[first_stop + i + 1]
+                connections.append((base + departure, base + arrival, from_stop, to_stop, run, i))
+                if base + departure < MAX_HORIZON_MINUTES:
+                    # A second run id for next week's copy keeps the two runs apart.
+                    connections.append((base + departure + MINUTES_PER_WEEK, base + arrival + MINUTES_PER_WEEK,
+                                        from_stop, to_stop, run + run_count, i))
+                if base + departure >= MINUTES_PER_WEEK:
+                    # Last week's run of the same train, still travelling early on Monday.
+                    connections.append((base + departure - MINUTES_PER_WEEK, base + arrival - MINUTES_PER_WEEK,
+                                        from_stop, to_stop, run + 2 * run_count, i))
+        connections.sort()
+        # Column lists index faster than tuples of tuples in the scan loop.
+        self.departures = [c[0] for c in connections]
+        self.arrivals = [c[1] for c in connections]
+        self.from_stops = [c[2] for c in connections]
+        self.to_stops = [c[3] for c in connections]
+        self.runs = [c[4] for c in connections]
+        self.positions = [c[5] for c in connections]
+        self.run_count = 3 * run_count
+
+    def __len__(self):
+        return len(self.departures)
+
+    def _scan(self, origin, target, start, end, max_legs):
+        departures, arrivals = self.departures, self.arrivals
+        from_stops, to_stops, runs, transfer = self.from_stops, self.to_stops, self.runs, self.transfer
+        # best[k][s]: earliest arrival at s using at most k trains; best[0] only holds the origin.
+        best = [[INFINITY] * len(self.stations) for _ in range(max_legs + 1)]
+        reached_by = [{} for _ in range(max_legs + 1)]  # k -> {station: (connection, legs actually used)}
+        for k in range(max_legs + 1):
+            best[k][origin] = start
+        fastest = best[max_legs]
+        on_run = [0] * self.run_count  # fewest trains used to be aboard each run; 0 = not aboard
+        boarded_at = {}  # (run, legs) -> connection where the run was boarded with that many trains
+
+        for c in range(bisect_left(departures, start), bisect_left(departures, end + 1)):
+            departure = departures[c]
+            if departure >= fastest[target]:
+                break
+            run = runs[c]
+            stop = from_stops[c]
+            legs = on_run[run]
+            if not legs and fastest[stop] > departure:
+                continue
+            # Board (or re-board with fewer trains) if we can be at `stop` in time for this departure.
+            for k in range(0, legs - 1 if legs else max_legs):
+                if best[k][stop] + (transfer[stop] if k else 0) <= departure:
+                    legs = k + 1
+                    on_run[run] = legs
+                    boarded_at[(run, legs)] = c
+                    break
+            if legs:
+                arrival = arrivals[c]
+                next_stop = to_stops[c]
+                for k in range(legs, max_legs + 1):
+                    if arrival < best[k][next_stop]:
+                        best[k][next_stop] = arrival
+                        reached_by[k][next_stop] = (c, legs)
+        return best, reached_by, boarded_at
+
+    def _legs(self, target, k, reached_by, boarded_at):
+        legs = []
+        stop = target
+        while k > 0 and stop in reached_by[k]:
+            alight, used = reached_by[k][stop]
+            board = boarded_at[(self.runs[alight], used)]
+            legs.append((board, alight))
+            stop = self.from_stops[board]
+            k = used - 1
+        legs.reverse()
+        return legs
+
+    def _describe(self, legs, journey_date, week_start):
+        trips = self.timetable.trips
+        route_stations = self.timetable.route_stations
+
+        def when(minutes):
+            offset = minutes - week_start
+            return (journey_date + timedelta(days=offset // MINUTES_PER_DAY)).strftime('%Y-%m-%d'), _clock(offset % MINUTES_PER_DAY)
+
+        described = []
+        for board, alight in legs:
+            trip = trips[self.runs[board] % len(trips)]
+            stations = route_stations[trip.route_id]
+            departure_date, departure = when(self.departures[board])
+            arrival_date, arrival = when(self.arrivals[alight])
+            described.append({
+                'train_id': trip.train_id,
+                'train_name': trip.train_name,
+                'schedule_id': trip.schedule_id,
+                'from': stations[self.positions[board]],
+                'to': stations[self.positions[alight] + 1],
+                'departure_date': departure_date,
+                'departure': departure,
+                'arrival_date': arrival_date,
+                'arrival': arrival,
+            })
+        total = self.arrivals[legs[-1][1]] - self.departures[legs[0][0]]
+        return {
+            'departure_date': described[0]['departure_date'],
+            'departure': described[0]['departure'],
+            'arrival_date': described[-1]['arrival_date'],
+            'arrival': described[-1]['arrival'],
+            'duration': f"{total // 60}h {total % 60}m",
+            'duration_minutes': total,
+            'changes': len(described) - 1,
+            'legs': described,
+        }
+
+    def plan(self, from_code, to_code, journey_date, earliest='00:00', max_changes=MAX_CHANGES,
+             horizon_minutes=DEFAULT_HORIZON_MINUTES, limit=3):
+        """Returns up to `limit` itineraries from `from_code` to `to_code` leaving on or after
+        `earliest` (HH:MM) on `journey_date`, ordered by arrival.
+
+        For each departure slot the fastest itinerary and any with fewer changes that arrive
+        later are returned, then the search moves past that departure for the next options.
+        """
+        origin = self.station_index.get(from_code)
+        target = self.station_index.get(to_code)
+        if origin is None or target is None or origin == target:
+            return []
+        hours, minutes = (int(part) for part in earliest.split(':'))
+        week_start = journey_date.weekday() * MINUTES_PER_DAY
+        start = week_start + hours * 60 + minutes
+        end = start + min(horizon_minutes, MAX_HORIZON_MINUTES)
+        max_legs = max(0, min(max_changes, MAX_CHANGES)) + 1
+
+        itineraries, seen = [], set()
+        while len(itineraries) < limit and start <= end:
+            best, reached_by, boarded_at = self._scan(origin, target, start, end, max_legs)
+            found = []
+            previous = INFINITY
+            for k in range(1, max_legs + 1):
+                # Only keep k trains if that beats every option with fewer changes.
+                if best[k][target] < previous:
+                    previous = best[k][target]
+                    legs = self._legs(target, k, reached_by, boarded_at)
+                    if legs:
+                        found.append(legs)
+            if not found:
+                break
+            for legs in found:
+                key = tuple(legs)
+                if key not in seen:
+                    seen.add(key)
+                    itineraries.append(self._describe(legs, journey_date, week_start))
+            start = min(self.departures[legs[0][0]] for legs in found) + 1
+        itineraries.sort(key=lambda itinerary: (itinerary['arrival_date'], itinerary['arrival'], itinerary['changes']))
+        return itineraries[:limit]
@@ -0,0 +1,92 @@
+import json
+import threading
+
+HEARTBEAT_SECONDS = 15.0
+
+
+class _Channel:
+    """The latest status of one (train_id, journey_date) and the condition its watchers wait on."""
+
+    __slots__ = ('condition', 'version', 'status', 'event', 'watchers')
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.status = None
+        self.event = None
+        self.watchers = 0
+
+
+class LiveStatusHub:
+    """Latest OperationalStatus per (train_id, journey_date) in memory, pushed to watchers.
+
+    `publish()` stores the new status, renders its Server-Sent Event once and wakes every
+    watcher of that journey with one notify_all, so a thousand clients on a train cost one
+    broadcast instead of a thousand database polls. Watchers only ever see the newest state:
+    one that falls behind skips straight to it rather than queueing stale updates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def __len__(self):
+        return len(self._channels)
+
+    def _channel(self, key):
+        channel = self._channels.get(key)
+        if channel is None:
+            with self._lock:
+                channel = self._channels.setdefault(key, _Channel())
+        return channel
+
+    def publish(self, status):
+        """Stores `status` (a dict with 'train_id' and 'journey_date' as YYYY-MM-DD) and notifies its watchers."""
+        channel = self._channel((status['train_id'], status['journey_date']))
+        event = f"event: status\ndata: {json.dumps(status)}\n\n"
+        with channel.condition:
+            channel.status = status
+            channel.event = event
+            channel.version += 1
+            channel.condition.notify_all()
+
+    def latest(self, train_id, journey_date):
+        """The last published status of a journey, or None."""
+        channel = self._channels.get((train_id, journey_date))
+        return channel.status if channel else None
+
+    def statuses(self, since=None):
+        """Every journey's latest status, optionally only journeys on or after `since` (YYYY-MM-DD)."""
+        return [channel.status for (_, journey_date), channel in list(self._channels.items())
+                if channel.status is not None and (since is None or journey_date >= since)]
+
+    def watchers(self):
+        return sum(channel.watchers for channel in list(self._channels.values()))
+
+    def prune(self, before):
+        """Forgets journeys dated before `before` (YYYY-MM-DD) that nobody is watching."""
+        with self._lock:
+            for key in [key for key, channel in self._channels.items() if key[1] < before and not channel.watchers]:
+                del self._channels[key]
+
+    def stream(self, train_id, journey_date, heartbeat=HEARTBEAT_SECONDS):
+        """Yields Server-Sent Events for a journey: its current status if known, then every update.
+
+        A comment line goes out after `heartbeat` idle seconds so proxies keep the connection
+        open and a disconnected client is noticed on the next write.
+        """
+        channel = self._channel((train_id, journey_date))
+        seen = 0
+        with channel.condition:
+            channel.watchers += 1
+        try:
+            while True:
+                with channel.condition:
+                    if channel.version == seen:
+                        channel.condition.wait(heartbeat)
+                    event = channel.event if channel.version != seen else None
+                    seen = channel.version
+                yield event or ": keep-alive\n\n"
+        finally:
+            with channel.condition:
+                channel.watchers -= 1
@@ -33,6 +33,10 @@ class DayOfWeek(Enum):
     SUNDAY = 'Sunday'
     SPECIAL = 'Special'
 
+class RunExceptionType(Enum):
+    SPECIAL = 'special'
+    CANCELLED = 'cancelled'
+
 class Gender(Enum):
     MALE = 'Male'
     FEMALE = 'Female'
@@ -174,6 +178,16 @@ class TrainSchedule(db.Model):
     route_id = db.Column(db.Integer, db.ForeignKey('routes.route_id', ondelete='CASCADE'), nullable=False)
     day_of_operation = db.Column(db.Enum(DayOfWeek), nullable=False)
 
+class TrainRunException(db.Model):
+    __tablename__ = 'train_run_exceptions'
+    
+    exception_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    train_id = db.Column(db.String(20), db.ForeignKey('trains.train_id', ondelete='CASCADE'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    exception_type = db.Column(db.Enum(RunExceptionType), nullable=False)
+    reason = db.Column(db.String(255))
+
 class StationSchedule(db.Model):
     __tablename__ = 'station_schedules'
     
@@ -0,0 +1,461 @@
+import json
+import random
+from datetime import timedelta
+try:
+    from timetable_store import MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY
+    from train_search import _origin_runs
+except ImportError:
+    from .timetable_store import MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY
+    from .train_search import _origin_runs
+
+DEFAULT_HALT_MINUTES = 5
+
+
+def parse_capabilities(text):
+    """Platform.capabilities as a set of lower-case names; stored as a JSON list or comma-separated."""
+    if not text:
+        return frozenset()
+    text = text.strip()
+    if text.startswith('['):
+        try:
+            return frozenset(str(name).strip().lower() for name in json.loads(text) if str(name).strip())
+        except ValueError:
+            pass
+    return frozenset(name.strip().lower() for name in text.strip('[]').split(',') if name.strip())
+
+
+def occupancy_window(arrival, departure, halt):
+    """(start, end) minutes a train holds its platform: arrival to departure, padded by the halt at the
+    origin and terminus where one of them is unknown. None if neither time is known."""
+    halt = halt if halt is not None else DEFAULT_HALT_MINUTES
+    if arrival == NO_TIME and departure == NO_TIME:
+        return None
+    start = arrival if arrival != NO_TIME else departure - halt
+    end = departure if departure != NO_TIME else arrival + halt
+    # A through train with equal arrival and departure still blocks the platform for a minute.
+    return start, max(end, start + 1)
+
+
+class _Node:
+    __slots__ = ('start', 'serial', 'end', 'item', 'priority', 'max_end', 'left', 'right')
+
+    def __init__(self, start, serial, end, item, priority):
+        self.start = start
+        self.serial = serial
+        self.end = end
+        self.item = item
+        self.priority = priority
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+
+def _refresh(node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+
+def _before(a, b):
+    return a.start < b.start or (a.start == b.start and a.serial < b.serial)
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if _before(new, node):
+        node.left = _insert(node.left, new)
+        if node.left.priority > node.priority:
+            child = node.left
+            node.left = child.right
+            child.right = node
+            _refresh(node)
+            _refresh(child)
+            return child
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.priority > node.priority:
+            child = node.right
+            node.right = child.left
+            child.left = node
+            _refresh(node)
+            _refresh(child)
+            return child
+    _refresh(node)
+    return node
+
+
+def _merge(left, right):
+    """Joins two treaps where every key of `left` precedes every key of `right`."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _refresh(left)
+        return left
+    right.left = _merge(left, right.left)
+    _refresh(right)
+    return right
+
+
+def _remove(node, start, serial):
+    if node is None:
+        return None, False
+    if node.start == start and node.serial == serial:
+        return _merge(node.left, node.right), True
+    if start < node.start or (start == node.start and serial < node.serial):
+        node.left, removed = _remove(node.left, start, serial)
+    else:
+        node.right, removed = _remove(node.right, start, serial)
+    if removed:
+        _refresh(node)
+    return node, removed
+
+
+class IntervalTree:
+    """Half-open [start, end) intervals in a treap ordered by start, each node also holding the
+    largest end in its subtree.
+
+    Inserts and removals take O(log n) expected time, and `overlapping()` returns the k intervals
+    that meet a query in O(log n + k): a subtree whose largest end is not past the query start,
+    or whose keys all begin at or after the query end, is never entered.
+    """
+
+    def __init__(self, entries=(), rng=random):
+        """entries: (start, end, item) sorted by start; built in O(n) as a Cartesian tree."""
+        self._rng = rng
+        self._serial = 0
+        self._len = 0
+        self.root = None
+        spine = []
+        for start, end, item in entries:
+            node = self._node(start, end, item)
+            last = None
+            while spine and spine[-1].priority < node.priority:
+                last = spine.pop()
+                _refresh(last)
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        for node in reversed(spine):
+            _refresh(node)
+        if spine:
+            self.root = spine[0]
+
+    def __len__(self):
+        return self._len
+
+    def _node(self, start, end, item):
+        self._serial += 1
+        self._len += 1
+        return _Node(start, self._serial, end, item, self._rng.random())
+
+    def insert(self, start, end, item):
+        """Adds [start, end) and returns a handle for `remove()`."""
+        node = self._node(start, end, item)
+        self.root = _insert(self.root, node)
+        return start, node.serial
+
+    def remove(self, handle):
+        """Removes the interval `insert()` returned `handle` for; False if it is not in the tree."""
+        self.root, removed = _remove(self.root, *handle)
+        if removed:
+            self._len -= 1
+        return removed
+
+    def _overlapping_nodes(self, start, end):
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.max_end <= start:
+                continue
+            if node.start < end:
+                if node.end > start:
+                    found.append(node)
+                if node.right is not None:
+                    stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+        return found
+
+    def overlapping(self, start, end):
+        """Every (start, end, item) with start < `end` and end > `start`."""
+        return [(node.start, node.end, node.item) for node in self._overlapping_nodes(start, end)]
+
+    def discard(self, start, end, item):
+        """Removes one [start, end) interval carrying `item`; False if there is none."""
+        for node in self._overlapping_nodes(start, end):
+            if node.start == start and node.end == end and node.item == item:
+                return self.remove((node.start, node.serial))
+        return False
+
+    def __iter__(self):
+        """(start, end, item) in start order."""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.end, node.item
+            node = node.right
+
+
+def _sweep(entries):
+    """Overlapping pairs among (start, end, item) entries of one platform, sorted by start.
+
+    Keeps every interval that is still open, so a long halt is checked against each train it
+    overlaps and not just the one before.
+    """
+    conflicts = []
+    open_entries = []
+    for entry in entries:
+        start = entry[0]
+        open_entries = [other for other in open_entries if other[1] > start]
+        conflicts.extend((other, entry) for other in open_entries)
+        open_entries.append(entry)
+    return conflicts
+
+
+class PlatformOccupancy:
+    """Which train holds which platform, per station and calendar day.
+
+    Times are minutes after midnight of the day; a halt that runs past midnight is entered on
+    both days (on the second with negative start), so every query is local to one day. Each
+    (station, day) gets an IntervalTree the first time it is queried; until then its entries
+    wait in a list that `validate()` can sweep without building trees.
+
+    An item is (platform_id, train_id, origin_date) where origin_date is the day the train left
+    its origin, which is how journeys are named everywhere else.
+    """
+
+    def __init__(self, platforms, rng=None):
+        """platforms: (platform_id, station_code, platform_number, platform_type, capabilities) rows."""
+        self.rng = rng or random.Random()
+        self.platforms = {}
+        self.station_platforms = {}
+        for platform_id, station_code, number, platform_type, capabilities in sorted(platforms, key=lambda row: (row[1], row[2])):
+            self.platforms[platform_id] = (station_code, number, platform_type, parse_capabilities(capabilities))
+            self.station_platforms.setdefault(station_code, []).append(platform_id)
+        self.trees = {}
+        self.pending = {}
+        self.placements = {}  # (train_id, origin_date, station_code) -> (start, end, platform_id)
+        self.first = None
+        self.last = None
+
+    def __len__(self):
+        return len(self.placements)
+
+    @classmethod
+    def from_timetable(cls, store, assignments, platforms, first, days, calendar=None, changes=(), rng=None):
+        """Occupancy of the days first .. first + days - 1.
+
+        assignments: (schedule_id, station_code, platform_id, halt_duration) StationSchedule rows;
+        changes: (train_id, station_code, journey_date, new_platform_id) PlatformChange rows,
+        applied in order. Runs that left their origin up to a few days before `first` are
+        included when they are still at a station inside the window.
+        """
+        index = cls(platforms, rng)
+        index.first = first
+        index.last = first + timedelta(days=days - 1)
+        station_index = {code: s for s, code in enumerate(store.station_codes)}
+        positions = {}  # route index -> {station index: position on the route}
+        stops = {}  # run -> [(station_code, platform_id, start, end)]
+        for schedule_id, station_code, platform_id, halt in assignments:
+            n = store.run_of(schedule_id)
+            if n is None or platform_id is None:
+                continue
+            r = store.run_route[n]
+            route = positions.get(r)
+            if route is None:
+                start, end = store.route_stops(r)
+                route = positions[r] = {s: k for k, s in enumerate(store.stop_stations[start:end])}
+            position = route.get(station_index.get(station_code))
+            if position is None:
+                continue
+            t = store.run_offsets[n] + position
+            window = occupancy_window(store.time_arrivals[t], store.time_departures[t], halt)
+            if window is not None:
+                stops.setdefault(n, []).append((station_code, platform_id) + window)
+        if not stops:
+            return index
+        span = max(end for runs in stops.values() for _, _, _, end in runs) // MINUTES_PER_DAY
+        origin = first - timedelta(days=span)
+        while origin <= index.last:
+            for n, runs in stops.items():
+                weekday = store.run_weekday[n]
+                train_id = store.train_ids[store.run_train[n]]
+                if not _origin_runs(calendar, train_id, None if weekday == NO_WEEKDAY else weekday, origin):
+                    continue
+                for station_code, platform_id, start, end in runs:
+                    index._place(station_code, train_id, origin, start, end, platform_id)
+            origin += timedelta(days=1)
+        for day_entries in index.pending.values():
+            day_entries.sort(key=lambda entry: entry[0])
+        for train_id, station_code, journey_date, platform_id in changes:
+            index.reassign(train_id, journey_date, station_code, platform_id)
+        return index
+
+    def stop_placements(self, store, schedule_id, station_code, arrival, departure, halt, calendar=None):
+        """(train_id, origin_date, start, end) for each journey of a TrainSchedule run whose stop at
+        `station_code` would fall inside the window, for a stop not yet in the timetable.
+
+        `arrival` and `departure` are clock minutes (NO_TIME if unknown); the day they fall on is
+        taken from the run's latest known time at an earlier stop. Empty if the run is unknown.
+        """
+        n = store.run_of(schedule_id)
+        if n is None or station_code not in store.station_codes:
+            return []
+        start, end = store.route_stops(store.run_route[n])
+        route = [store.station_codes[s] for s in store.stop_stations[start:end]]
+        if station_code not in route:
+            return []
+        t0, _ = store.run_times(n)
+        last = max([time for k in range(route.index(station_code))
+                    for time in (store.time_arrivals[t0 + k], store.time_departures[t0 + k]) if time != NO_TIME],
+                   default=0)
+        day = last // MINUTES_PER_DAY
+        clock = arrival if arrival != NO_TIME else departure
+        if clock != NO_TIME and clock < last % MINUTES_PER_DAY:
+            day += 1
+        shift = day * MINUTES_PER_DAY
+        arrival = arrival + shift if arrival != NO_TIME else NO_TIME
+        departure = departure + shift if departure != NO_TIME else NO_TIME
+        if departure != NO_TIME and arrival != NO_TIME and departure < arrival:
+            departure += MINUTES_PER_DAY
+        window = occupancy_window(arrival, departure, halt)
+        if window is None or self.first is None:
+            return []
+        weekday = store.run_weekday[n]
+        train_id = store.train_ids[store.run_train[n]]
+        placements = []
+        origin = self.first - timedelta(days=window[1] // MINUTES_PER_DAY)
+        while origin <= self.last:
+            if _origin_runs(calendar, train_id, None if weekday == NO_WEEKDAY else weekday, origin):
+                placements.append((train_id, origin) + window)
+            origin += timedelta(days=1)
+        return placements
+
+    def check(self, station_code, placements, platform_id, needs=()):
+        """Conflicts of putting each (train_id, origin_date, start, end) journey on `platform_id`, as
+        (origin_date, start, end, item) with times relative to that origin, and the platforms free
+        for all of them that offer `needs`."""
+        conflicts = []
+        free = None
+        for train_id, origin_date, start, end in placements:
+            conflicts.extend((origin_date,) + entry for entry in
+                             self.conflicts(station_code, origin_date, start, end, platform_id, train_id))
+            available = self.free_platforms(station_code, origin_date, start, end, needs, train_id)
+            free = available if free is None else [platform_id for platform_id in free if platform_id in available]
+        return conflicts, free or []
+
+    def _days(self, origin_date, start, end):
+        """(day, offset) for each calendar day [start, end) minutes after `origin_date` touches."""
+        for d in range(start // MINUTES_PER_DAY, (end - 1) // MINUTES_PER_DAY + 1):
+            yield origin_date + timedelta(days=d), d * MINUTES_PER_DAY
+
+    def _place(self, station_code, train_id, origin_date, start, end, platform_id):
+        item = (platform_id, train_id, origin_date)
+        for day, offset in self._days(origin_date, start, end):
+            key = (station_code, day)
+            tree = self.trees.get(key)
+            if tree is None:
+                self.pending.setdefault(key, []).append((start - offset, end - offset, item))
+            else:
+                tree.insert(start - offset, end - offset, item)
+        self.placements[(train_id, origin_date, station_code)] = (start, end, platform_id)
+
+    def tree(self, station_code, day):
+        """The IntervalTree of a station's day, built from its pending entries on first use."""
+        key = (station_code, day)
+        tree = self.trees.get(key)
+        if tree is None:
+            tree = self.trees[key] = IntervalTree(self.pending.pop(key, []), self.rng)
+        return tree
+
+    def occupants(self, station_code, origin_date, start, end):
+        """(start, end, item) of every train at the station during [start, end) minutes after
+        midnight of `origin_date`, with times relative to that same midnight."""
+        found = {}
+        for day, offset in self._days(origin_date, start, end):
+            for s, e, item in self.tree(station_code, day).overlapping(start - offset, end - offset):
+                found.setdefault(item, (s + offset, e + offset, item))
+        return list(found.values())
+
+    def conflicts(self, station_code, origin_date, start, end, platform_id, train_id=None):
+        """Occupants of `platform_id` during the window, other than `train_id`'s journey from `origin_date`."""
+        return [entry for entry in self.occupants(station_code, origin_date, start, end)
+                if entry[2][0] == platform_id and (entry[2][1], entry[2][2]) != (train_id, origin_date)]
+
+    def free_platforms(self, station_code, origin_date, start, end, needs=(), train_id=None):
+        """Platforms of the station with every capability in `needs` and no other train during the window,
+        lowest platform number first."""
+        needs = frozenset(name.lower() for name in needs)
+        busy = {item[0] for _, _, item in self.occupants(station_code, origin_date, start, end)
+                if (item[1], item[2]) != (train_id, origin_date)}
+        return [platform_id for platform_id in self.station_platforms.get(station_code, ())
+                if platform_id not in busy and needs <= self.platforms[platform_id][3]]
+
+    def add(self, station_code, train_id, origin_date, start, end, platform_id):
+        """Records a train's occupancy, replacing its previous one at the station, and returns the
+        conflicts it creates (it is recorded either way)."""
+        conflicts = self.conflicts(station_code, origin_date, start, end, platform_id, train_id)
+        self.remove(train_id, origin_date, station_code)
+        self._place(station_code, train_id, origin_date, start, end, platform_id)
+        return conflicts
+
+    def remove(self, train_id, origin_date, station_code):
+        placement = self.placements.pop((train_id, origin_date, station_code), None)
+        if placement is None:
+            return False
+        start, end, platform_id = placement
+        item = (platform_id, train_id, origin_date)
+        for day, offset in self._days(origin_date, start, end):
+            self.tree(station_code, day).discard(start - offset, end - offset, item)
+        return True
+
+    def placement(self, train_id, origin_date, station_code):
+        """(start, end, platform_id) of a journey at a station, or None."""
+        return self.placements.get((train_id, origin_date, station_code))
+
+    def reassign(self, train_id, origin_date, station_code, platform_id):
+        """Moves a journey to another platform; returns the conflicts there, or None if it has no placement."""
+        placement = self.placement(train_id, origin_date, station_code)
+        if placement is None:
+            return None
+        start, end, _ = placement
+        return self.add(station_code, train_id, origin_date, start, end, platform_id)
+
+    def validate(self):
+        """Every pair of journeys holding the same platform at the same time inside the window, as
+        (station_code, day, platform_id, first, second) with first and second as (start, end, item).
+
+        One sort and sweep per platform and day instead of comparing schedules pairwise.
+        """
+        conflicts = []
+        seen = set()
+        keys = sorted(set(self.pending) | set(self.trees))
+        for station_code, day in keys:
+            if self.first is not None and not self.first <= day <= self.last:
+                continue
+            tree = self.trees.get((station_code, day))
+            entries = list(tree) if tree is not None else self.pending[(station_code, day)]
+            by_platform = {}
+            for entry in entries:
+                by_platform.setdefault(entry[2][0], []).append(entry)
+            for platform_id, platform_entries in by_platform.items():
+                for a, b in _sweep(platform_entries):
+                    # A pair that overlaps across midnight shows up on both days; report it once.
+                    pair = (station_code, platform_id, a[2], b[2])
+                    if pair not in seen:
+                        seen.add(pair)
+                        conflicts.append((station_code, day, platform_id, a, b))
+        return conflicts
@@ -1,11 +1,282 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from app import db
 from models import *
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+import importlib
+import json
+import os
+import sys
+import threading
+import time
 import uuid
+from train_search import Timetable, TrainSearchIndex
+from journey_planner import JourneyPlanner
+from fares import FareTable, categorize_age, RATE_PER_KM
+from geo_index import StationGeoIndex
+from running_calendar import RunningCalendar
+from eta import DelayTable, EtaSnapshot
+from live_status import LiveStatusHub
+from platform_occupancy import PlatformOccupancy, parse_capabilities
+from timetable_store import MINUTES_PER_DAY, NO_TIME
 
 api = Blueprint('api', __name__)
 
+# The chat agent's modules (seat_allocation, agent, ...) live one directory up. They are
+# imported on first use, so the rest of the API runs without the agent's dependencies.
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _agent_module(name):
+    if AGENT_DIR not in sys.path:
+        sys.path.append(AGENT_DIR)
+    return importlib.import_module(name)
+
+def _agent_data_changed(*groups):
+    """Drops the chat agent's cached "stations", "trains" or "routes" after a write here.
+
+    database.data_changed clears this process's copies and bumps DataVersions, which the agent
+    in any other process checks at the start of each turn. The write itself has already been
+    committed, so a failure here only leaves the agent's caches to expire on their TTL.
+    """
+    try:
+        database = _agent_module('database')
+        for group in groups:
+            database.data_changed(group)
+    except (Exception, SystemExit) as e:
+        current_app.logger.warning(f"Could not invalidate the chat agent's cached {', '.join(groups)}: {e}")
+
+def _load_timetable():
+    # Four flat reads instead of a join per search; the index is built in memory.
+    trains = dict(db.session.query(Train.train_id, Train.train_name))
+    schedules = [(schedule_id, train_id, route_id, day.value if day else None) for schedule_id, train_id, route_id, day in
+                 db.session.query(TrainSchedule.schedule_id, TrainSchedule.train_id, TrainSchedule.route_id, TrainSchedule.day_of_operation)]
+    route_stations = db.session.query(RouteStation.route_id, RouteStation.station_code,
+                                      RouteStation.sequence_number, RouteStation.distance_from_source).all()
+    station_times = db.session.query(StationSchedule.schedule_id, StationSchedule.station_code,
+                                     StationSchedule.arrival_time, StationSchedule.departure_time).all()
+    return Timetable(trains, schedules, route_stations, station_times)
+
+train_search_index = TrainSearchIndex(_load_timetable, ttl=float(os.getenv('TRAIN_SEARCH_INDEX_TTL', '600')),
+                                      snapshot_path=os.getenv('TIMETABLE_SNAPSHOT'))
+_journey_planner = (None, None)  # (timetable it was built from, planner)
+
+def get_journey_planner():
+    """Returns a JourneyPlanner over the current search timetable, rebuilding it when that reloads."""
+    global _journey_planner
+    timetable = train_search_index.timetable()
+    if _journey_planner[0] is not timetable:
+        _journey_planner = (timetable, JourneyPlanner(timetable, default_transfer_minutes=int(os.getenv('JOURNEY_TRANSFER_MINUTES', '10'))))
+    return _journey_planner[1]
+
+fare_table = FareTable()
+
+def get_fare_table():
+    """Returns the fare table, building it from RouteStation and TrainSchedule rows on first use."""
+    if not fare_table.loaded:
+        route_stations = db.session.query(RouteStation.route_id, RouteStation.station_code,
+                                          RouteStation.sequence_number, RouteStation.distance_from_source).all()
+        train_routes = db.session.query(TrainSchedule.train_id, TrainSchedule.route_id).distinct().all()
+        fare_table.load(route_stations, train_routes)
+    return fare_table
+
+def refresh_route_fares(route_id):
+    """Rebuilds the fare arrays of one route after its stations changed."""
+    if fare_table.loaded:
+        fare_table.update_route(route_id, db.session.query(RouteStation.station_code, RouteStation.sequence_number,
+                                                           RouteStation.distance_from_source).filter_by(route_id=route_id).all())
+
+def _age_on(date_of_birth, journey_date):
+    if not date_of_birth:
+        return None
+    return journey_date.year - date_of_birth.year - ((journey_date.month, journey_date.day) < (date_of_birth.month, date_of_birth.day))
+
+def passenger_fares(train_id, source, destination, journey_date, coach_type, passengers):
+    """Server-side fare for each passenger from the fare table and their age category.
+
+    Falls back to a client-supplied `fare` only when the train's route is not in the table.
+    Raises ValueError for an unknown coach type, a segment that is not on the train's route,
+    or a train with neither.
+    """
+    table = get_fare_table()
+    coach_type = str(coach_type or '').lower()
+    if coach_type not in RATE_PER_KM:
+        raise ValueError(f"unknown coach type {coach_type!r}; expected one of {', '.join(RATE_PER_KM)}")
+    source = str(source or '').strip().upper()
+    destination = str(destination or '').strip().upper()
+    priced = train_id in table.train_routes
+    fares = []
+    for passenger_data in passengers:
+        if not priced:
+            fare = passenger_data.get('fare')
+            if fare is None:
+                raise ValueError(f'no fare for train {train_id}, whose route is not in the fare table')
+            fares.append(float(fare))
+            continue
+        date_of_birth = datetime.strptime(passenger_data['date_of_birth'], '%Y-%m-%d').date() if passenger_data.get('date_of_birth') else None
+        fare = table.quote(train_id, source, destination, coach_type, categorize_age(_age_on(date_of_birth, journey_date)))
+        if fare is None:
+            raise ValueError(f'{source} to {destination} is not a segment of train {train_id}')
+        fares.append(float(fare))
+    return fares
+
+_station_geo_index = None
+
+def get_station_geo_index():
+    """Returns the KD-tree over station coordinates, building it on first use."""
+    global _station_geo_index
+    if _station_geo_index is None:
+        _station_geo_index = StationGeoIndex(db.session.query(Station.station_code, Station.station_name,
+                                                              Station.latitude, Station.longitude).all())
+    return _station_geo_index
+
+_running_calendar = (None, None)  # (day it was built, calendar)
+
+def get_running_calendar():
+    """Returns the running-day bitmasks of every train, rebuilt daily so its window moves with today."""
+    global _running_calendar
+    if _running_calendar[0] != date.today():
+        schedules = [(train_id, day.value) for train_id, day in
+                     db.session.query(TrainSchedule.train_id, TrainSchedule.day_of_operation)]
+        exceptions = [(train_id, start, end, kind.value) for train_id, start, end, kind in
+                      db.session.query(TrainRunException.train_id, TrainRunException.start_date,
+                                       TrainRunException.end_date, TrainRunException.exception_type)]
+        _running_calendar = (date.today(), RunningCalendar(schedules, exceptions))
+    return _running_calendar[1]
+
+def invalidate_running_calendar():
+    global _running_calendar
+    _running_calendar = (None, None)
+
+ETA_REFRESH_SECONDS = float(os.getenv('ETA_REFRESH_SECONDS', '60'))
+# Journeys that left their origin this many days ago may still be running.
+ETA_LIVE_DAYS = 3
+_delay_table = (None, None)  # (timetable it was compiled against, DelayTable)
+_eta_snapshot = (0.0, None)  # (monotonic time computed, EtaSnapshot)
+
+def get_delay_table(timetable):
+    """Returns DelayPattern compiled for `timetable`, recompiling when the timetable reloads."""
+    global _delay_table
+    if _delay_table[0] is not timetable:
+        rows = [(train_id, station_code, average_delay, day.value if day else None, month, year)
+                for train_id, station_code, average_delay, day, month, year in
+                db.session.query(DelayPattern.train_id, DelayPattern.station_code, DelayPattern.average_delay,
+                                 DelayPattern.day_of_week, DelayPattern.month, DelayPattern.year)]
+        _delay_table = (timetable, DelayTable(timetable.store, rows))
+    return _delay_table[1]
+
+PLATFORM_OCCUPANCY_DAYS = int(os.getenv('PLATFORM_OCCUPANCY_DAYS', '7'))
+_platform_occupancy = (None, None, None)  # (timetable it was built from, first day, PlatformOccupancy)
+
+def get_platform_occupancy():
+    """Platform occupancy of the next PLATFORM_OCCUPANCY_DAYS days, rebuilt when the timetable reloads
+    or the day changes and updated in place by platform changes."""
+    global _platform_occupancy
+    timetable = train_search_index.timetable()
+    today = date.today()
+    if _platform_occupancy[0] is not timetable or _platform_occupancy[1] != today:
+        assignments = db.session.query(StationSchedule.schedule_id, StationSchedule.station_code, StationSchedule.platform_id,
+                                       StationSchedule.halt_duration).filter(StationSchedule.platform_id.isnot(None)).all()
+        platforms = db.session.query(Platform.platform_id, Platform.station_code, Platform.platform_number,
+                                     Platform.platform_type, Platform.capabilities).all()
+        changes = db.session.query(PlatformChange.train_id, PlatformChange.station_code, PlatformChange.journey_date,
+                                   PlatformChange.new_platform_id) \
+            .filter(PlatformChange.journey_date >= today - timedelta(days=ETA_LIVE_DAYS)) \
+            .order_by(PlatformChange.change_time).all()
+        index = PlatformOccupancy.from_timetable(timetable.store, assignments, platforms, today, PLATFORM_OCCUPANCY_DAYS,
+                                                 get_running_calendar(), changes)
+        _platform_occupancy = (timetable, today, index)
+    return _platform_occupancy[2]
+
+def invalidate_platform_occupancy():
+    global _platform_occupancy
+    _platform_occupancy = (None, None, None)
+
+def _keep_platform_occupancy(timetable):
+    """After the timetable reloads for a change already applied to the occupancy in place, moves the
+    occupancy built from `timetable` over to the new timetable instead of rebuilding it."""
+    global _platform_occupancy
+    if _platform_occupancy[0] is timetable:
+        _platform_occupancy = (train_search_index.timetable(),) + _platform_occupancy[1:]
+
+def _occupant_dict(origin_date, entry):
+    """An occupancy (start, end, (platform_id, train_id, journey_date)) with minutes after midnight of `origin_date`."""
+    start, end, (platform_id, train_id, journey_date) = entry
+    midnight = datetime.combine(origin_date, datetime.min.time())
+    return {
+        'platform_id': platform_id,
+        'train_id': train_id,
+        'journey_date': journey_date.strftime('%Y-%m-%d'),
+        'from': (midnight + timedelta(minutes=start)).strftime('%Y-%m-%d %H:%M'),
+        'to': (midnight + timedelta(minutes=end)).strftime('%Y-%m-%d %H:%M')
+    }
+
+def _clock_minutes(value):
+    return value.hour * 60 + value.minute if value else NO_TIME
+
+def _platform_needs(index, platform_id, needs):
+    """Capabilities a replacement platform must offer: `needs` (a list or comma-separated) if given,
+    else those of the platform that was asked for."""
+    if needs:
+        return parse_capabilities(needs if isinstance(needs, str) else ','.join(needs))
+    platform = index.platforms.get(platform_id)
+    return platform[3] if platform else frozenset()
+
+def _platform_conflict(index, conflicts, free):
+    return jsonify({
+        'error': 'Platform is occupied at that time',
+        'conflicts': [_occupant_dict(origin_date, (start, end, item)) for origin_date, start, end, item in conflicts],
+        'suggested_platforms': [{'platform_id': platform_id, 'platform_number': index.platforms[platform_id][1]}
+                                for platform_id in free]
+    }), 409
+
+live_status_hub = LiveStatusHub()
+_live_status_loaded_on = None  # day the hub was last seeded and pruned
+
+def _status_dict(status):
+    return {
+        'train_id': status.train_id,
+        'journey_date': status.journey_date.strftime('%Y-%m-%d'),
+        'current_station': status.current_station,
+        'next_station': status.next_station,
+        'current_status': status.current_status,
+        'delay_minutes': status.delay_minutes or 0,
+        'expected_arrival': status.expected_arrival.strftime('%Y-%m-%d %H:%M') if status.expected_arrival else None,
+        'last_updated': status.last_updated.strftime('%Y-%m-%d %H:%M:%S') if status.last_updated else None
+    }
+
+def get_live_status_hub():
+    """Returns the in-memory latest statuses, seeded from the journeys of the last ETA_LIVE_DAYS days
+    on first use and pruned of older journeys once a day."""
+    global _live_status_loaded_on
+    today = date.today()
+    if _live_status_loaded_on != today:
+        oldest = today - timedelta(days=ETA_LIVE_DAYS)
+        if _live_status_loaded_on is None:
+            for status in OperationalStatus.query.filter(OperationalStatus.journey_date >= oldest) \
+                    .order_by(OperationalStatus.last_updated):
+                live_status_hub.publish(_status_dict(status))
+        live_status_hub.prune(oldest.strftime('%Y-%m-%d'))
+        _live_status_loaded_on = today
+    return live_status_hub
+
+def get_eta_snapshot():
+    """Expected arrivals of every running train, recomputed in one pass at most every ETA_REFRESH_SECONDS."""
+    global _eta_snapshot
+    computed_at, snapshot = _eta_snapshot
+    timetable = train_search_index.timetable()
+    if snapshot is None or snapshot.timetable is not timetable or time.monotonic() - computed_at >= ETA_REFRESH_SECONDS:
+        since = (date.today() - timedelta(days=ETA_LIVE_DAYS)).strftime('%Y-%m-%d')
+        live = [(status['train_id'], datetime.strptime(status['journey_date'], '%Y-%m-%d').date(),
+                 status['current_station'], status['delay_minutes'])
+                for status in get_live_status_hub().statuses(since)]
+        snapshot = EtaSnapshot(timetable, get_delay_table(timetable), live, datetime.now())
+        _eta_snapshot = (time.monotonic(), snapshot)
+    return snapshot
+
+# How far ahead seat inventory is opened by default (the advance reservation period).
+ADVANCE_RESERVATION_DAYS = int(os.getenv('ADVANCE_RESERVATION_DAYS', '120'))
+
 # Train Management Routes
 @api.route('/trains', methods=['GET'])
 def get_trains():
@@ -32,8 +303,65 @@ def create_train():
     )
     db.session.add(train)
     db.session.commit()
+    train_search_index.invalidate()
+    _agent_data_changed('trains')
     return jsonify({'message': 'Train created successfully'}), 201
 
+@api.route('/trains/search', methods=['GET'])
+def search_trains():
+    from_code = (request.args.get('from') or '').strip().upper()
+    to_code = (request.args.get('to') or '').strip().upper()
+    if not from_code or not to_code:
+        return jsonify({'error': 'Both from and to station codes are required'}), 400
+    try:
+        journey_date = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    results = train_search_index.search(from_code, to_code, journey_date, get_running_calendar())
+    return jsonify(get_fare_table().fill_search_fares(results))
+
+@api.route('/fares', methods=['GET'])
+def get_fare():
+    train_id = request.args.get('train_id', '')
+    from_code = (request.args.get('from') or '').strip().upper()
+    to_code = (request.args.get('to') or '').strip().upper()
+    coach_type = request.args.get('coach_type', 'sleeper').lower()
+    try:
+        age = int(request.args['age']) if request.args.get('age') else None
+    except ValueError:
+        return jsonify({'error': 'age must be an integer'}), 400
+    table = get_fare_table()
+    category = categorize_age(age)
+    fare = table.quote(train_id, from_code, to_code, coach_type, category)
+    if fare is None:
+        return jsonify({'error': f'No fare for {from_code} to {to_code} on train {train_id} in {coach_type}'}), 404
+    return jsonify({
+        'train_id': train_id,
+        'from': from_code,
+        'to': to_code,
+        'coach_type': coach_type,
+        'category': category,
+        'distance_km': round(table.distance(table.train_routes[train_id], from_code, to_code), 1),
+        'fare': fare
+    })
+
+@api.route('/journeys', methods=['GET'])
+def plan_journeys():
+    from_code = (request.args.get('from') or '').strip().upper()
+    to_code = (request.args.get('to') or '').strip().upper()
+    if not from_code or not to_code:
+        return jsonify({'error': 'Both from and to station codes are required'}), 400
+    try:
+        journey_date = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+        earliest = request.args.get('after', '00:00')
+        datetime.strptime(earliest, '%H:%M')
+        max_changes = min(int(request.args.get('max_changes', 2)), 2)
+        limit = min(int(request.args.get('limit', 3)), 10)
+    except ValueError:
+        return jsonify({'error': 'Use YYYY-MM-DD for date, HH:MM for after and integers for max_changes and limit'}), 400
+    return jsonify(get_journey_planner().plan(from_code, to_code, journey_date, earliest=earliest,
+                                              max_changes=max_changes, limit=limit))
+
 # Station Management Routes
 @api.route('/stations', methods=['GET'])
 def get_stations():
@@ -60,8 +388,30 @@ def create_station():
     )
     db.session.add(station)
     db.session.commit()
+    global _station_geo_index
+    _station_geo_index = None
+    _agent_data_changed('stations')
     return jsonify({'message': 'Station created successfully'}), 201
 
+@api.route('/stations/nearby', methods=['GET'])
+def get_nearby_stations():
+    """Stations within radius_km of lat/lon (or of a station), or the k nearest when no radius is given."""
+    index = get_station_geo_index()
+    try:
+        if request.args.get('station'):
+            point = index.location(request.args['station'])
+            if point is None:
+                return jsonify({'error': f"No coordinates for station {request.args['station']}"}), 404
+        else:
+            point = (float(request.args['lat']), float(request.args['lon']))
+        k = min(int(request.args.get('k', 5)), 100)
+        radius_km = float(request.args['radius_km']) if request.args.get('radius_km') else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Give lat and lon (or station), with optional numeric radius_km and k'}), 400
+    if radius_km is not None:
+        return jsonify(index.within(point[0], point[1], radius_km, limit=k))
+    return jsonify(index.nearest(point[0], point[1], k=k))
+
 # Route Management Routes
 @api.route('/routes', methods=['GET'])
 def get_routes():
@@ -83,61 +433,204 @@ def create_route():
     )
     db.session.add(route)
     db.session.commit()
+    train_search_index.invalidate()
+    _agent_data_changed('routes')
     return jsonify({'message': 'Route created successfully'}), 201
 
+@api.route('/routes/<int:route_id>/stations', methods=['PUT'])
+def set_route_stations(route_id):
+    """Replaces a route's stops with {"stations": [{station_code, sequence_number, distance_from_source}]}."""
+    route = Route.query.get_or_404(route_id)
+    data = request.get_json()
+    RouteStation.query.filter_by(route_id=route_id).delete()
+    for stop in data['stations']:
+        db.session.add(RouteStation(
+            route_id=route_id,
+            station_code=stop['station_code'],
+            sequence_number=stop['sequence_number'],
+            distance_from_source=stop['distance_from_source']
+        ))
+    route.total_distance = max((stop['distance_from_source'] for stop in data['stations']), default=0)
+    db.session.commit()
+    refresh_route_fares(route_id)
+    train_search_index.invalidate()
+    _agent_data_changed('routes')
+    return jsonify({'message': 'Route stations updated successfully'})
+
 # Reservation Management Routes
 @api.route('/reservations', methods=['POST'])
 def create_reservation():
-    data = request.get_json()
-    
-    # Generate PNR
-    pnr = str(uuid.uuid4())[:8].upper()
-    
-    # Create reservation
-    reservation = Reservation(
-        pnr=pnr,
-        train_id=data['train_id'],
-        journey_date=datetime.strptime(data['journey_date'], '%Y-%m-%d').date(),
-        source_station=data['source_station'],
-        destination_station=data['destination_station'],
-        booking_status=BookingStatus.CONFIRMED,
-        total_fare=data['total_fare'],
-        quota_id=data.get('quota_id'),
-        booking_flexibility=FlexibilityPreference[data.get('booking_flexibility', 'RIGID').upper()],
-        alternative_contact=data.get('alternative_contact'),
-        special_instructions=data.get('special_instructions')
-    )
-    
-    db.session.add(reservation)
-    
-    # Create passenger records
-    for passenger_data in data['passengers']:
-        passenger = Passenger(
-            first_name=passenger_data['first_name'],
-            last_name=passenger_data['last_name'],
-            email=passenger_data.get('email'),
-            phone=passenger_data['phone'],
-            date_of_birth=datetime.strptime(passenger_data['date_of_birth'], '%Y-%m-%d').date() if passenger_data.get('date_of_birth') else None,
-            gender=Gender[passenger_data.get('gender', 'OTHER').upper()],
-            address=passenger_data.get('address'),
-            special_requirements=passenger_data.get('special_requirements')
-        )
-        db.session.add(passenger)
-        db.session.flush()  # Get the passenger_id
-        
-        # Create reservation passenger record
-        reservation_passenger = ReservationPassenger(
-            pnr=pnr,
-            passenger_id=passenger.passenger_id,
-            seat_number=passenger_data.get('seat_number'),
-            coach_id=passenger_data.get('coach_id'),
-            ticket_status=BookingStatus.CONFIRMED,
-            fare=passenger_data['fare']
-        )
-        db.session.add(reservation_passenger)
-    
-    db.session.commit()
-    return jsonify({'pnr': pnr, 'message': 'Reservation created successfully'}), 201
+    """Books one reservation with the same validation and seat allocation as POST /reservations/batch."""
+    try:
+        train_id, journey_date, coach_type, reservation, passengers, fares = _batch_item(request.get_json())
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid reservation: {e}'}), 400
+    (_, result), = _book_parties(train_id, journey_date, coach_type, [(0, reservation, passengers, fares)])
+    if not result['success']:
+        return jsonify({'error': result['error']}), 409
+    return jsonify({
+        'pnr': result['pnr'],
+        'total_fare': reservation['total_fare'],
+        'booking_status': result['booking_status'],
+        'coach_id': result['coach_id'],
+        'coach_type': result['coach_type'],
+        'waitlist_position': result['waitlist_position'],
+        'message': 'Reservation created successfully'
+    }), 201
+
+def allocate_party(inventory, seats):
+    """Places one party on locked SeatInventory rows with the chat agent's seat policy
+    (seat_allocation.plan_party): confirmed, then RAC, then waitlist.
+
+    Returns (status, inventory row, first waitlist position or None), or None if the party
+    cannot be placed. The rows are updated in place and flushed with the booking.
+    """
+    seat_allocation = _agent_module('seat_allocation')
+    status, picked = seat_allocation.plan_party([(i, row.coach_id, row.available_seats, row.rac_count, row.waitlist_count)
+                                                 for i, row in enumerate(inventory)], seats)
+    if status is None:
+        return None
+    row = inventory[picked[0]]
+    if status == seat_allocation.CONFIRMED:
+        row.available_seats -= seats
+        return BookingStatus.CONFIRMED, row, None
+    if status == seat_allocation.RAC:
+        row.rac_count = (row.rac_count or 0) + seats
+        return BookingStatus.RAC, row, None
+    position = (row.waitlist_count or 0) + 1
+    row.waitlist_count = position - 1 + seats
+    return BookingStatus.WAITLISTED, row, position
+
+def _batch_item(item):
+    """Validates one batch item and builds its rows: (train_id, journey_date, coach_type, reservation, passengers, fares).
+
+    Raises KeyError, TypeError or ValueError with the item's own problem.
+    """
+    if not isinstance(item, dict):
+        raise ValueError('each reservation must be an object')
+    journey_date = datetime.strptime(item['journey_date'], '%Y-%m-%d').date()
+    if not item['passengers'] or not isinstance(item['passengers'], list):
+        raise ValueError('at least one passenger is required')
+    if not all(isinstance(passenger_data, dict) for passenger_data in item['passengers']):
+        raise ValueError('each passenger must be an object')
+    coach_type = str(item.get('coach_type') or 'sleeper').lower()
+    fares = passenger_fares(item.get('train_id'), item.get('source_station'), item.get('destination_station'),
+                            journey_date, coach_type, item['passengers'])
+    reservation = {
+        'train_id': item['train_id'],
+        'journey_date': journey_date,
+        'source_station': item['source_station'],
+        'destination_station': item['destination_station'],
+        'total_fare': sum(fares),
+        'quota_id': item.get('quota_id'),
+        'booking_agent': item.get('booking_agent'),
+        'booking_flexibility': FlexibilityPreference[item.get('booking_flexibility', 'RIGID').upper()],
+        'alternative_contact': item.get('alternative_contact'),
+        'special_instructions': item.get('special_instructions')
+    }
+    passengers = [{
+        'first_name': passenger_data['first_name'],
+        'last_name': passenger_data['last_name'],
+        'email': passenger_data.get('email'),
+        'phone': passenger_data['phone'],
+        'date_of_birth': datetime.strptime(passenger_data['date_of_birth'], '%Y-%m-%d').date() if passenger_data.get('date_of_birth') else None,
+        'gender': Gender[passenger_data.get('gender', 'OTHER').upper()],
+        'address': passenger_data.get('address'),
+        'special_requirements': passenger_data.get('special_requirements')
+    } for passenger_data in item['passengers']]
+    return item['train_id'], journey_date, coach_type, reservation, passengers, fares
+
+def _book_parties(train_id, journey_date, coach_type, members):
+    """Books (index, reservation, passengers, fares) parties in `coach_type` coaches of one train and
+    date in one transaction.
+
+    Locks those coaches' SeatInventory rows once, allocates every party in memory and writes them
+    with bulk INSERTs. Returns (index, result) for each party.
+    """
+    try:
+        inventory = SeatInventory.query.join(Coach, Coach.coach_id == SeatInventory.coach_id) \
+            .filter(SeatInventory.train_id == train_id, SeatInventory.journey_date == journey_date,
+                    Coach.coach_type == CoachType(coach_type)) \
+            .order_by(SeatInventory.inventory_id).with_for_update(of=SeatInventory).all()
+        results, reservations, passengers, links, booked = [], [], [], [], []
+        for index, reservation, party, fares in members:
+            placed = allocate_party(inventory, len(party)) if inventory else None
+            if placed is None:
+                error = (f'No {coach_type} seats, RAC or waitlist places left' if inventory
+                         else f'Booking is not open for {coach_type} coaches of this train and date')
+                results.append((index, {'success': False, 'error': error}))
+                continue
+            status, row, position = placed
+            pnr = str(uuid.uuid4())[:8].upper()
+            reservations.append(dict(reservation, pnr=pnr, booking_status=status))
+            passengers.extend(party)
+            for offset, fare in enumerate(fares):
+                links.append({
+                    'pnr': pnr,
+                    'coach_id': row.coach_id,
+                    'ticket_status': status,
+                    'waitlist_position': position + offset if position else None,
+                    'fare': fare
+                })
+            booked.append((index, {'success': True, 'pnr': pnr, 'booking_status': status.value, 'coach_id': row.coach_id,
+                                   'coach_type': coach_type, 'waitlist_position': position}))
+
+        db.session.bulk_insert_mappings(Reservation, reservations)
+        # return_defaults fills in the generated passenger_id of each mapping
+        db.session.bulk_insert_mappings(Passenger, passengers, return_defaults=True)
+        for passenger, link in zip(passengers, links):
+            link['passenger_id'] = passenger['passenger_id']
+        db.session.bulk_insert_mappings(ReservationPassenger, links)
+        db.session.commit()
+        return results + booked
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return [(index, {'success': False, 'error': f'Could not book train {train_id} on {journey_date}: {e}'})
+                for index, *_ in members]
+
+@api.route('/reservations/batch', methods=['POST'])
+def create_reservations_batch():
+    """Books many reservations in one request.
+
+    Accepts {"reservations": [...]} where each item has the POST /reservations fields and
+    returns one result per item, in order. Every item is validated on its own first; valid
+    items are grouped by train, journey date and coach type, and each group is booked in its
+    own transaction.
+    """
+    data = request.get_json() or {}
+    items = data.get('reservations', []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'reservations must be a list'}), 400
+    results = [None] * len(items)
+
+    prepared = {}
+    for index, item in enumerate(items):
+        try:
+            prepared[index] = _batch_item(item)
+        except (KeyError, TypeError, ValueError) as e:
+            results[index] = {'success': False, 'error': f'Invalid reservation: {e}'}
+
+    train_ids = {row[0] for row in prepared.values()}
+    station_codes = {row[3][key] for row in prepared.values() for key in ('source_station', 'destination_station')}
+    known_trains = {train_id for (train_id,) in db.session.query(Train.train_id).filter(Train.train_id.in_(train_ids))}
+    known_stations = {code for (code,) in db.session.query(Station.station_code).filter(Station.station_code.in_(station_codes))}
+    db.session.rollback()  # end the read transaction; every group below gets its own
+
+    groups = {}
+    for index, (train_id, journey_date, coach_type, reservation, passengers, fares) in prepared.items():
+        if train_id not in known_trains:
+            results[index] = {'success': False, 'error': f"Invalid train_id: {train_id}"}
+        elif reservation['source_station'] not in known_stations or reservation['destination_station'] not in known_stations:
+            results[index] = {'success': False, 'error': 'Invalid source or destination station'}
+        else:
+            groups.setdefault((train_id, journey_date, coach_type), []).append((index, reservation, passengers, fares))
+
+    for (train_id, journey_date, coach_type), members in groups.items():
+        for index, result in _book_parties(train_id, journey_date, coach_type, members):
+            results[index] = result
+
+    status_code = 201 if any(result['success'] for result in results) else 400
+    return jsonify({'results': results}), status_code
 
 @api.route('/reservations/<pnr>', methods=['GET'])
 def get_reservation(pnr):
@@ -161,6 +654,34 @@ def get_reservation(pnr):
         } for p in passengers]
     })
 
+@api.route('/reservations/<pnr>/eta', methods=['GET'])
+def get_reservation_eta(pnr):
+    """Expected departure from the boarding station and arrival at the destination for a PNR."""
+    reservation = Reservation.query.get_or_404(pnr)
+    snapshot = get_eta_snapshot()
+    # journey_date is the day the passenger boards; ETAs are keyed by the day the train left its origin.
+    origin_date = snapshot.origin_date(reservation.train_id, reservation.journey_date, reservation.source_station)
+    arrival = snapshot.eta(reservation.train_id, origin_date, reservation.destination_station) if origin_date else None
+    if arrival is None:
+        return jsonify({'error': f'No schedule for train {reservation.train_id} on {reservation.journey_date}'}), 404
+    return jsonify({
+        'pnr': pnr,
+        'boarding': snapshot.eta(reservation.train_id, origin_date, reservation.source_station),
+        'arrival': arrival
+    })
+
+@api.route('/trains/<train_id>/eta', methods=['GET'])
+def get_train_eta(train_id):
+    """Scheduled and expected arrival at every stop of a train's journey leaving its origin on `date`."""
+    try:
+        journey_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else date.today()
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    timeline = get_eta_snapshot().timeline(train_id, journey_date)
+    if timeline is None:
+        return jsonify({'error': f'No schedule for train {train_id} on {journey_date}'}), 404
+    return jsonify(timeline)
+
 @api.route('/reservations', methods=['GET'])
 def get_reservations():
     reservations = Reservation.query.all()
@@ -260,9 +781,89 @@ def create_train_schedule():
     
     db.session.add(schedule)
     db.session.commit()
+    train_search_index.invalidate()
+    fare_table.set_train_route(schedule.train_id, schedule.route_id)
+    invalidate_running_calendar()
+    _agent_data_changed('routes')
     
     return jsonify({'message': 'Train schedule created successfully'}), 201
 
+@api.route('/trains/<train_id>/run-exceptions', methods=['POST'])
+def create_run_exception(train_id):
+    """Adds special running dates or cancels runs for a date range (both dates inclusive)."""
+    data = request.get_json()
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data.get('end_date', data['start_date']), '%Y-%m-%d').date()
+        exception_type = RunExceptionType[data['exception_type'].upper()]
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Give start_date (and optional end_date) as YYYY-MM-DD and exception_type special or cancelled'}), 400
+    if end_date < start_date:
+        return jsonify({'error': 'end_date is before start_date'}), 400
+    
+    exception = TrainRunException(
+        train_id=train_id,
+        start_date=start_date,
+        end_date=end_date,
+        exception_type=exception_type,
+        reason=data.get('reason')
+    )
+    
+    db.session.add(exception)
+    db.session.commit()
+    invalidate_running_calendar()
+    _agent_data_changed('routes')
+    
+    return jsonify({'message': 'Run exception created successfully'}), 201
+
+@api.route('/trains/<train_id>/running-dates', methods=['GET'])
+def get_running_dates(train_id):
+    """The next `count` dates (default 10) from `from` (default today) on which the train leaves its origin."""
+    try:
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else date.today()
+        count = min(int(request.args.get('count', 10)), 100)
+    except ValueError:
+        return jsonify({'error': 'Use YYYY-MM-DD for from and an integer for count'}), 400
+    dates = get_running_calendar().next_running_dates(train_id, start, count)
+    return jsonify({'train_id': train_id, 'dates': [day.strftime('%Y-%m-%d') for day in dates]})
+
+@api.route('/seat-inventory/open', methods=['POST'])
+def open_seat_inventory():
+    """Creates SeatInventory rows for every coach of a train on each date it runs in the window.
+
+    Dates the train does not run on, or that already have inventory, are skipped.
+    """
+    data = request.get_json()
+    train_id = data['train_id']
+    try:
+        start = datetime.strptime(data['from'], '%Y-%m-%d').date() if data.get('from') else date.today()
+        days = min(int(data.get('days', ADVANCE_RESERVATION_DAYS)), 366)
+    except ValueError:
+        return jsonify({'error': 'Use YYYY-MM-DD for from and an integer for days'}), 400
+    coaches = Coach.query.filter_by(train_id=train_id).all()
+    if not coaches:
+        return jsonify({'error': f'Train {train_id} has no coaches'}), 404
+    
+    dates = get_running_calendar().running_dates(train_id, start, start + timedelta(days=days - 1))
+    existing = set(db.session.query(SeatInventory.coach_id, SeatInventory.journey_date)
+                   .filter(SeatInventory.train_id == train_id, SeatInventory.journey_date.between(start, start + timedelta(days=days - 1))))
+    created = 0
+    for journey_date in dates:
+        for coach in coaches:
+            if (coach.coach_id, journey_date) in existing:
+                continue
+            db.session.add(SeatInventory(
+                train_id=train_id,
+                coach_id=coach.coach_id,
+                journey_date=journey_date,
+                total_seats=coach.capacity,
+                available_seats=coach.capacity
+            ))
+            created += 1
+    db.session.commit()
+    
+    return jsonify({'train_id': train_id, 'running_dates': len(dates), 'rows_created': created}), 201
+
 # Station Schedule Routes
 @api.route('/station-schedules', methods=['POST'])
 def create_station_schedule():
@@ -277,11 +878,128 @@ def create_station_schedule():
         halt_duration=data.get('halt_duration', 5)
     )
     
+    timetable = train_search_index.timetable()
+    placements = []
+    if schedule.platform_id is not None:
+        # Refuse a platform another train holds at that time (unless allow_conflicts) and suggest free ones.
+        index = get_platform_occupancy()
+        platform = index.platforms.get(schedule.platform_id)
+        if platform is None or platform[0] != schedule.station_code:
+            return jsonify({'error': f'Platform {schedule.platform_id} is not at station {schedule.station_code}'}), 400
+        placements = index.stop_placements(timetable.store, schedule.schedule_id, schedule.station_code,
+                                           _clock_minutes(schedule.arrival_time), _clock_minutes(schedule.departure_time),
+                                           schedule.halt_duration, get_running_calendar())
+        conflicts, free = index.check(schedule.station_code, placements, schedule.platform_id,
+                                      _platform_needs(index, schedule.platform_id, data.get('needs')))
+        if conflicts and not data.get('allow_conflicts'):
+            return _platform_conflict(index, conflicts, free)
+    
     db.session.add(schedule)
     db.session.commit()
+    for train_id, origin_date, start, end in placements:
+        index.add(schedule.station_code, train_id, origin_date, start, end, schedule.platform_id)
+    # The new stop changes the timetable, but the occupancy already holds it.
+    train_search_index.invalidate()
+    _keep_platform_occupancy(timetable)
+    _agent_data_changed('routes')
     
     return jsonify({'message': 'Station schedule created successfully'}), 201
 
+# Platform Routes
+@api.route('/platforms', methods=['POST'])
+def create_platform():
+    data = request.get_json()
+    
+    platform = Platform(
+        station_code=data['station_code'],
+        platform_number=data['platform_number'],
+        platform_type=data.get('platform_type'),
+        capabilities=','.join(data['capabilities']) if isinstance(data.get('capabilities'), list) else data.get('capabilities')
+    )
+    
+    db.session.add(platform)
+    db.session.commit()
+    invalidate_platform_occupancy()
+    
+    return jsonify({'message': 'Platform created successfully', 'platform_id': platform.platform_id}), 201
+
+@api.route('/stations/<station_code>/platforms/free', methods=['GET'])
+def get_free_platforms(station_code):
+    """Platforms of a station with no train from `from` to `to` (HH:MM) on `date`, offering every capability in `needs`."""
+    try:
+        day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else date.today()
+        start = datetime.strptime(request.args['from'], '%H:%M')
+        end = datetime.strptime(request.args['to'], '%H:%M')
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Give from and to as HH:MM and an optional date as YYYY-MM-DD'}), 400
+    start = start.hour * 60 + start.minute
+    end = end.hour * 60 + end.minute
+    if end <= start:
+        end += MINUTES_PER_DAY
+    index = get_platform_occupancy()
+    needs = parse_capabilities(request.args.get('needs'))
+    return jsonify([{
+        'platform_id': platform_id,
+        'platform_number': index.platforms[platform_id][1],
+        'platform_type': index.platforms[platform_id][2],
+        'capabilities': sorted(index.platforms[platform_id][3])
+    } for platform_id in index.free_platforms(station_code.upper(), day, start, end, needs)])
+
+@api.route('/platform-changes', methods=['POST'])
+def create_platform_change():
+    """Moves a journey to another platform at a station, refused with suggestions if that platform is taken."""
+    data = request.get_json()
+    try:
+        journey_date = datetime.strptime(data['journey_date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'journey_date must be in YYYY-MM-DD format'}), 400
+    index = get_platform_occupancy()
+    placement = index.placement(data['train_id'], journey_date, data['station_code'])
+    if placement is None:
+        return jsonify({'error': f"Train {data['train_id']} has no platform at {data['station_code']} on {journey_date}"}), 404
+    start, end, original_platform_id = placement
+    new_platform_id = data['new_platform_id']
+    platform = index.platforms.get(new_platform_id)
+    if platform is None or platform[0] != data['station_code']:
+        return jsonify({'error': f"Platform {new_platform_id} is not at station {data['station_code']}"}), 400
+    conflicts, free = index.check(data['station_code'], [(data['train_id'], journey_date, start, end)], new_platform_id,
+                                  _platform_needs(index, original_platform_id, data.get('needs')))
+    if conflicts and not data.get('allow_conflicts'):
+        return _platform_conflict(index, conflicts, free)
+    
+    change = PlatformChange(
+        train_id=data['train_id'],
+        station_code=data['station_code'],
+        journey_date=journey_date,
+        original_platform_id=original_platform_id,
+        new_platform_id=new_platform_id,
+        reason=data.get('reason')
+    )
+    
+    db.session.add(change)
+    db.session.commit()
+    index.reassign(data['train_id'], journey_date, data['station_code'], new_platform_id)
+    
+    return jsonify({'message': 'Platform change recorded successfully'}), 201
+
+@api.route('/platforms/conflicts', methods=['GET'])
+def get_platform_conflicts():
+    """Every pair of trains holding one platform at the same time in the occupancy window, optionally for one station."""
+    index = get_platform_occupancy()
+    station_code = (request.args.get('station') or '').strip().upper()
+    conflicts = index.validate()
+    return jsonify({
+        'from': index.first.strftime('%Y-%m-%d'),
+        'to': index.last.strftime('%Y-%m-%d'),
+        'conflicts': [{
+            'station_code': code,
+            'date': day.strftime('%Y-%m-%d'),
+            'platform_id': platform_id,
+            'first': _occupant_dict(day, first),
+            'second': _occupant_dict(day, second)
+        } for code, day, platform_id, first, second in conflicts if not station_code or code == station_code]
+    })
+
 # Dynamic Pricing Routes
 @api.route('/dynamic-pricing', methods=['POST'])
 def create_dynamic_pricing():
@@ -305,22 +1023,57 @@ def create_dynamic_pricing():
 @api.route('/operational-status', methods=['POST'])
 def update_operational_status():
     data = request.get_json()
+    journey_date = datetime.strptime(data['journey_date'], '%Y-%m-%d').date()
     
-    status = OperationalStatus(
-        train_id=data['train_id'],
-        journey_date=datetime.strptime(data['journey_date'], '%Y-%m-%d').date(),
-        current_station=data.get('current_station'),
-        next_station=data.get('next_station'),
-        current_status=data['current_status'],
-        delay_minutes=data.get('delay_minutes', 0),
-        expected_arrival=datetime.strptime(data['expected_arrival'], '%Y-%m-%d %H:%M') if data.get('expected_arrival') else None
-    )
+    # One row per journey (unique_operational_status): update it in place after the first report.
+    status = OperationalStatus.query.filter_by(train_id=data['train_id'], journey_date=journey_date).first()
+    if status is None:
+        status = OperationalStatus(train_id=data['train_id'], journey_date=journey_date)
+        db.session.add(status)
+    status.current_station = data.get('current_station')
+    status.next_station = data.get('next_station')
+    status.current_status = data['current_status']
+    status.delay_minutes = data.get('delay_minutes', 0)
+    status.expected_arrival = datetime.strptime(data['expected_arrival'], '%Y-%m-%d %H:%M') if data.get('expected_arrival') else None
+    status.last_updated = datetime.utcnow()
     
-    db.session.add(status)
     db.session.commit()
+    get_live_status_hub().publish(_status_dict(status))
     
     return jsonify({'message': 'Operational status updated successfully'}), 201
 
+def _status_journey_date():
+    return datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else date.today()
+
+@api.route('/operational-status/<train_id>', methods=['GET'])
+def get_operational_status(train_id):
+    """Latest status of a train's journey leaving its origin on `date` (default today), from memory."""
+    try:
+        journey_date = _status_journey_date()
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    hub = get_live_status_hub()
+    status = hub.latest(train_id, journey_date.strftime('%Y-%m-%d'))
+    if status is None:
+        # Journeys older than the hub's window are still answered, once, from the table.
+        row = OperationalStatus.query.filter_by(train_id=train_id, journey_date=journey_date).first()
+        if row is None:
+            return jsonify({'error': f'No status for train {train_id} on {journey_date}'}), 404
+        status = _status_dict(row)
+        hub.publish(status)
+    return jsonify(status)
+
+@api.route('/operational-status/<train_id>/stream', methods=['GET'])
+def stream_operational_status(train_id):
+    """Server-Sent Events with the journey's current status, then every update as it is posted."""
+    try:
+        journey_date = _status_journey_date()
+    except ValueError:
+        return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+    events = get_live_status_hub().stream(train_id, journey_date.strftime('%Y-%m-%d'))
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # Ticket Collector Routes
 @api.route('/ticket-collectors', methods=['POST'])
 def create_ticket_collector():
@@ -356,4 +1109,54 @@ def create_tc_schedule(tc_id):
     db.session.add(schedule)
     db.session.commit()
     
-    return jsonify({'message': 'Ticket collector schedule created successfully'}), 201 
\ No newline at end of file
+    return jsonify({'message': 'Ticket collector schedule created successfully'}), 201 
+
+# Chat Assistant Routes
+# The booking agent (in AGENT_DIR) needs GROQ_API_KEY; it is loaded on the first
+# chat so the rest of the API runs without it. Conversations are kept in memory per id.
+CHAT_CONVERSATIONS = int(os.getenv('CHAT_CONVERSATIONS', '1000'))
+_chat_agent = None
+_chat_conversations = OrderedDict()  # conversation_id -> (messages, booking)
+_chat_lock = threading.Lock()
+
+def get_chat_agent():
+    global _chat_agent
+    if _chat_agent is None:
+        _chat_agent = _agent_module('agent')
+    return _chat_agent
+
+def _chat_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api.route('/chat/stream', methods=['POST'])
+def stream_chat():
+    """Server-Sent Events with the assistant's reply as it is generated: token, tool and message events, then done."""
+    data = request.get_json() or {}
+    message = str(data.get('message') or '').strip()
+    if not message:
+        return jsonify({'error': 'message is required'}), 400
+    try:
+        agent = get_chat_agent()
+    except (Exception, SystemExit) as e:
+        # constants.py and agent.py exit when the .env file or GROQ_API_KEY is missing.
+        return jsonify({'error': f'Chat assistant unavailable: {e}'}), 503
+    conversation_id = data.get('conversation_id') or uuid.uuid4().hex
+    with _chat_lock:
+        messages, booking = _chat_conversations.get(conversation_id, ([], {}))
+
+    def events():
+        yield _chat_event('conversation', {'conversation_id': conversation_id})
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for event in agent.stream_message_from_caller(message, messages, current_time, dict(booking)):
+            if event['type'] != 'done':
+                yield _chat_event(event['type'], {key: value for key, value in event.items() if key != 'type'})
+                continue
+            with _chat_lock:
+                _chat_conversations[conversation_id] = (event['messages'], event['booking'])
+                _chat_conversations.move_to_end(conversation_id)
+                while len(_chat_conversations) > CHAT_CONVERSATIONS:
+                    _chat_conversations.popitem(last=False)
+            yield _chat_event('done', {})
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
\ No newline at end of file
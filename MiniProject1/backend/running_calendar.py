@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+try:
+    from timetable_store import WEEKDAYS
+except ImportError:
+    from .timetable_store import WEEKDAYS
+
+# Exceptions are compiled for this window around the day the calendar is built; outside it a
+# train runs on its weekdays only.
+LOOKBACK_DAYS = 30
+HORIZON_DAYS = 400
+ALL_WEEKDAYS = 0b1111111
+
+SPECIAL = 'special'
+CANCELLED = 'cancelled'
+
+
+def _weekly_bits(mask, first_weekday, days):
+    """`mask` (bit 0 = Monday) repeated over `days` days starting on `first_weekday`, one bit per day."""
+    rotated = ((mask >> first_weekday) | (mask << (7 - first_weekday))) & ALL_WEEKDAYS
+    weeks = -(-days // 7)
+    # One 7-bit block per week; the blocks never overlap, so the product has no carries.
+    repeat = int('0000001' * weeks, 2)
+    return (rotated * repeat) & ((1 << days) - 1)
+
+
+def _bit_positions(bits):
+    """Yields the set bit positions of `bits`, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class RunningCalendar:
+    """The dates each train leaves its origin, as bitmasks.
+
+    A train's TrainSchedule rows give a 7-bit weekday mask (bit 0 = Monday; Special rows add
+    nothing). TrainRunException date ranges are compiled into one bitset per train and kind
+    over [start, start + days), one bit per date, and folded with the weekly pattern into
+    `running` = (weekly | special) & ~cancelled. "Does train T run on D" is one shift and
+    mask, and the next N running dates are the lowest N set bits after D.
+    """
+
+    def __init__(self, schedules, exceptions=(), start=None, days=HORIZON_DAYS):
+        """schedules: (train_id, day name) rows; exceptions: (train_id, start_date, end_date, kind)
+        with kind 'special' or 'cancelled' and both dates inclusive."""
+        self.start = start or date.today() - timedelta(days=LOOKBACK_DAYS)
+        self.days = days
+        self.weekdays = {}
+        for train_id, day_name in schedules:
+            weekday = WEEKDAYS.get(day_name)
+            self.weekdays[train_id] = self.weekdays.get(train_id, 0) | (1 << weekday if weekday is not None else 0)
+        self.special = {}
+        self.cancelled = {}
+        for train_id, first, last, kind in exceptions:
+            bits = self._range_bits(first, last)
+            target = self.special if kind == SPECIAL else self.cancelled if kind == CANCELLED else None
+            if bits and target is not None:
+                target[train_id] = target.get(train_id, 0) | bits
+        self.running = {}
+        self.extra = {}
+        first_weekday = self.start.weekday()
+        for train_id in self.weekdays.keys() | self.special.keys():
+            weekly = _weekly_bits(self.weekdays.get(train_id, 0), first_weekday, days)
+            keep = ~self.cancelled.get(train_id, 0)
+            special = self.special.get(train_id, 0)
+            self.running[train_id] = (weekly | special) & keep
+            # Special dates on which no weekly run leaves; these are served by Special schedules.
+            self.extra[train_id] = special & ~weekly & keep
+
+    def __len__(self):
+        return len(self.running)
+
+    def _offset(self, day):
+        offset = (day - self.start).days
+        return offset if 0 <= offset < self.days else None
+
+    def _range_bits(self, first, last):
+        """Bits for the dates first..last (inclusive) that fall inside the window."""
+        lo = max((first - self.start).days, 0)
+        hi = min((last - self.start).days, self.days - 1)
+        if hi < lo:
+            return 0
+        return ((1 << (hi - lo + 1)) - 1) << lo
+
+    def runs_on(self, train_id, day):
+        """True if `train_id` leaves its origin on `day`."""
+        offset = self._offset(day)
+        if offset is None:
+            return bool(self.weekdays.get(train_id, 0) >> day.weekday() & 1)
+        return bool(self.running.get(train_id, 0) >> offset & 1)
+
+    def special_on(self, train_id, day):
+        """True if `day` is a special (not weekly) run of `train_id` that was not cancelled."""
+        offset = self._offset(day)
+        return offset is not None and bool(self.extra.get(train_id, 0) >> offset & 1)
+
+    def is_cancelled(self, train_id, day):
+        offset = self._offset(day)
+        return offset is not None and bool(self.cancelled.get(train_id, 0) >> offset & 1)
+
+    def running_dates(self, train_id, first, last):
+        """Every date in first..last (inclusive) on which `train_id` leaves its origin."""
+        return self.next_running_dates(train_id, first, (last - first).days + 1, until=last)
+
+    def _weekday_dates(self, train_id, first, stop, count, dates):
+        """Appends the dates in [first, stop) on the train's weekdays to `dates`, up to `count` in all."""
+        mask = self.weekdays.get(train_id, 0)
+        day = first
+        while mask and len(dates) < count and (stop is None or day < stop):
+            if mask >> day.weekday() & 1:
+                dates.append(day)
+            day += timedelta(days=1)
+
+    def next_running_dates(self, train_id, after, count, until=None):
+        """The first `count` dates on or after `after` (and not past `until`) that `train_id` runs."""
+        dates = []
+        stop = until + timedelta(days=1) if until is not None else None
+        end = self.start + timedelta(days=self.days)
+        # Outside the window only the weekday mask applies.
+        if after < self.start:
+            self._weekday_dates(train_id, after, min(self.start, stop or self.start), count, dates)
+        offset = max((after - self.start).days, 0)
+        if offset < self.days:
+            for position in _bit_positions(self.running.get(train_id, 0) >> offset):
+                day = self.start + timedelta(days=offset + position)
+                if len(dates) >= count or (stop is not None and day >= stop):
+                    return dates
+                dates.append(day)
+        self._weekday_dates(train_id, max(after, end), stop, count, dates)
+        return dates
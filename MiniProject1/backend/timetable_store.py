@@ -0,0 +1,227 @@
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from datetime import timedelta
+
+WEEKDAYS = {'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3, 'Friday': 4, 'Saturday': 5, 'Sunday': 6}
+MINUTES_PER_DAY = 24 * 60
+NO_TIME = -1
+NO_WEEKDAY = -1
+
+SNAPSHOT_MAGIC = b'RTTS'
+SNAPSHOT_VERSION = 1
+# (column, array typecode); every column is a flat array so a snapshot is the raw bytes back to back.
+COLUMNS = (
+    ('route_offsets', 'i'),   # route r's stops are stop_* [route_offsets[r]:route_offsets[r + 1]]
+    ('stop_stations', 'i'),   # index into station_codes
+    ('stop_distances', 'd'),  # distance_from_source in km
+    ('run_schedule', 'q'),    # TrainSchedules.schedule_id
+    ('run_train', 'i'),       # index into train_ids / train_names
+    ('run_route', 'i'),       # index into route_ids
+    ('run_weekday', 'b'),     # Monday = 0, NO_WEEKDAY for special runs
+    ('run_offsets', 'i'),     # run n's times are times_* [run_offsets[n]:run_offsets[n + 1]]
+    ('time_arrivals', 'i'),   # minutes after midnight of the run's origin day, NO_TIME if unknown
+    ('time_departures', 'i'),
+)
+
+
+def _minutes(value):
+    """Minutes after midnight for a time, a timedelta (MySQL TIME columns) or an 'HH:MM[:SS]' string."""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, str):
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def _append_times(arrivals, departures, stations, times, clocks):
+    """Appends one run's (arrival, departure) clock times as minutes since the origin day's midnight.
+
+    `clocks` memoizes _minutes across runs; a timetable only has 1440 distinct clock times.
+    """
+    day = 0
+    last = None
+    for station_code in stations:
+        arrival, departure = times.get(station_code, (None, None))
+        for column, raw in ((arrivals, arrival), (departures, departure)):
+            clock = clocks.get(raw, NO_TIME)
+            if clock == NO_TIME:
+                clock = clocks[raw] = _minutes(raw)
+            if clock is None:
+                column.append(NO_TIME)
+                continue
+            value = clock + day * MINUTES_PER_DAY
+            if last is not None and value < last:
+                # Clock went backwards: the train ran past midnight.
+                day += 1
+                value += MINUTES_PER_DAY
+            column.append(value)
+            last = value
+
+
+class TimetableStore:
+    """Column store of routes and scheduled runs: ints and floats in flat arrays, no row objects.
+
+    Stations, trains and routes are interned to ints; the stops of route r and the times of
+    run n are slices of shared columns found through per-route and per-run offset arrays.
+    Columns are memoryviews, either over in-memory arrays (`from_rows`) or directly over a
+    memory-mapped snapshot file (`load`), so opening a snapshot copies nothing.
+    """
+
+    def __init__(self, station_codes, route_ids, train_ids, train_names, columns, source='rows', load_ms=0.0):
+        self.station_codes = station_codes
+        self.station_index = {code: i for i, code in enumerate(station_codes)}
+        self.route_ids = route_ids
+        self.route_index = {route_id: r for r, route_id in enumerate(route_ids)}
+        self.train_ids = train_ids
+        self.train_names = train_names
+        for name, _ in COLUMNS:
+            setattr(self, name, columns[name])
+        self.source = source
+        self.load_ms = load_ms
+        self._mmap = None
+        self._schedule_runs = None
+
+    def __len__(self):
+        return len(self.run_schedule)
+
+    @classmethod
+    def from_rows(cls, trains, schedules, route_stations, station_times):
+        """trains: {train_id: train_name}; schedules: (schedule_id, train_id, route_id, day name);
+        route_stations: (route_id, station_code, sequence_number, distance_from_source) in any order;
+        station_times: (schedule_id, station_code, arrival_time, departure_time)."""
+        start = time.perf_counter()
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        routes = {}
+        for route_id, station_code, sequence_number, distance in route_stations:
+            routes.setdefault(route_id, []).append((sequence_number, station_code, float(distance or 0)))
+        station_codes, station_index, route_ids, route_codes = [], {}, [], {}
+        columns['route_offsets'].append(0)
+        for route_id, stops in routes.items():
+            stops.sort()
+            route_codes[route_id] = (len(route_ids), [code for _, code, _ in stops])
+            route_ids.append(route_id)
+            for _, code, distance in stops:
+                if code not in station_index:
+                    station_index[code] = len(station_codes)
+                    station_codes.append(code)
+                columns['stop_stations'].append(station_index[code])
+                columns['stop_distances'].append(distance)
+            columns['route_offsets'].append(len(columns['stop_stations']))
+
+        times = {}
+        for schedule_id, station_code, arrival, departure in station_times:
+            times.setdefault(schedule_id, {})[station_code] = (arrival, departure)
+        train_ids, train_index, clocks = [], {}, {}
+        columns['run_offsets'].append(0)
+        for schedule_id, train_id, route_id, day_name in schedules:
+            if route_id not in route_codes:
+                continue
+            r, stations = route_codes[route_id]
+            if train_id not in train_index:
+                train_index[train_id] = len(train_ids)
+                train_ids.append(train_id)
+            columns['run_schedule'].append(schedule_id)
+            columns['run_train'].append(train_index[train_id])
+            columns['run_route'].append(r)
+            columns['run_weekday'].append(WEEKDAYS.get(day_name, NO_WEEKDAY))
+            _append_times(columns['time_arrivals'], columns['time_departures'], stations, times.get(schedule_id, {}), clocks)
+            columns['run_offsets'].append(len(columns['time_arrivals']))
+        train_names = [str(trains.get(train_id, train_id)) for train_id in train_ids]
+        views = {name: memoryview(column) for name, column in columns.items()}
+        return cls(station_codes, route_ids, train_ids, train_names, views, 'rows', (time.perf_counter() - start) * 1000)
+
+    def route_stops(self, r):
+        """(start, end) of route index r in the stop_* columns."""
+        return self.route_offsets[r], self.route_offsets[r + 1]
+
+    def run_times(self, n):
+        """(start, end) of run n in the time_* columns; position i on its route is start + i."""
+        return self.run_offsets[n], self.run_offsets[n + 1]
+
+    def run_of(self, schedule_id):
+        """Run index of a TrainSchedules.schedule_id, or None; the lookup dict is built on first use."""
+        if self._schedule_runs is None:
+            self._schedule_runs = {sid: n for n, sid in enumerate(self.run_schedule)}
+        return self._schedule_runs.get(schedule_id)
+
+    def column_bytes(self):
+        return sum(getattr(self, name).nbytes for name, _ in COLUMNS)
+
+    def stats(self):
+        """Sizes, footprint and load time, for logs and the benchmark report."""
+        return {
+            'stations': len(self.station_codes),
+            'routes': len(self.route_ids),
+            'runs': len(self),
+            'stop_times': len(self.time_arrivals),
+            'column_bytes': self.column_bytes(),
+            'source': self.source,
+            'load_ms': round(self.load_ms, 2),
+        }
+
+    def save(self, path):
+        """Writes a snapshot: magic, version, header length, a JSON header with the interned
+        names and column layout, then each column's raw bytes 8-byte aligned."""
+        layout, offset = {}, 0
+        for name, typecode in COLUMNS:
+            column = getattr(self, name)
+            layout[name] = [typecode, offset, len(column)]
+            offset += -(-column.nbytes // 8) * 8
+        header = json.dumps({
+            'station_codes': self.station_codes,
+            'route_ids': self.route_ids,
+            'train_ids': self.train_ids,
+            'train_names': self.train_names,
+            'columns': layout,
+        }).encode('utf-8')
+        prefix = SNAPSHOT_MAGIC + struct.pack('<II', SNAPSHOT_VERSION, len(header)) + header
+        prefix += b'\0' * (-len(prefix) % 8)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(prefix)
+            for name, _ in COLUMNS:
+                column = getattr(self, name)
+                f.write(column.tobytes())
+                f.write(b'\0' * (-column.nbytes % 8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Opens a snapshot written by `save`; columns are read-only views of the mapped file."""
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = mapped[:4]
+        version, header_length = struct.unpack('<II', mapped[4:12])
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} timetable snapshot")
+        header = json.loads(mapped[12:12 + header_length].decode('utf-8'))
+        base = 12 + header_length
+        base += -base % 8
+        buffer = memoryview(mapped)
+        columns = {}
+        for name, (typecode, offset, length) in header['columns'].items():
+            size = array(typecode).itemsize
+            columns[name] = buffer[base + offset:base + offset + length * size].cast(typecode)
+        store = cls(header['station_codes'], header['route_ids'], header['train_ids'], header['train_names'],
+                    columns, 'snapshot', (time.perf_counter() - start) * 1000)
+        store._mmap = mapped
+        return store
+
+
+def load_snapshot(path):
+    """Returns the TimetableStore in `path`, or None if there is no usable snapshot there."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return TimetableStore.load(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,214 @@
+import threading
+import time
+from datetime import timedelta
+try:
+    from timetable_store import TimetableStore, MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY, load_snapshot
+except ImportError:
+    # Imported as backend.train_search by the agent (journeys.py) rather than from the backend directory.
+    from .timetable_store import TimetableStore, MINUTES_PER_DAY, NO_TIME, NO_WEEKDAY, load_snapshot
+
+
+def _format_minutes(minutes):
+    if minutes is None or minutes == NO_TIME:
+        return None
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
+def _format_duration(minutes):
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def _origin_runs(calendar, train_id, weekday, origin_date):
+    """True if a run scheduled on `weekday` (None for special runs) leaves its origin on `origin_date`."""
+    if weekday is None:
+        return calendar is not None and calendar.special_on(train_id, origin_date)
+    if origin_date.weekday() != weekday:
+        return False
+    return calendar is None or calendar.runs_on(train_id, origin_date)
+
+
+class Trip:
+    """One TrainSchedule run: its stops in route order with times in minutes after midnight of the
+    day the train leaves its origin (so 1510 is 01:10 the next day). Unknown times are NO_TIME.
+
+    `arrivals` and `departures` are views into the TimetableStore columns, not copies.
+    """
+
+    __slots__ = ('schedule_id', 'train_id', 'train_name', 'route_id', 'weekday', 'arrivals', 'departures')
+
+    def __init__(self, schedule_id, train_id, train_name, route_id, weekday, arrivals, departures):
+        self.schedule_id = schedule_id
+        self.train_id = train_id
+        self.train_name = train_name
+        self.route_id = route_id
+        self.weekday = weekday
+        self.arrivals = arrivals
+        self.departures = departures
+
+    def runs_on(self, journey_date, stop, calendar=None):
+        """True if a passenger boarding at route position `stop` on `journey_date` can take this run.
+
+        Without a RunningCalendar only the weekday counts and special runs never match.
+        """
+        departure = self.departures[stop]
+        offset = departure // MINUTES_PER_DAY if departure != NO_TIME else 0
+        return _origin_runs(calendar, self.train_id, self.weekday, journey_date - timedelta(days=offset))
+
+
+class _Trips:
+    """Sequence of Trip views over a TimetableStore, created on access."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, n):
+        store = self.store
+        start, end = store.run_times(n)
+        weekday = store.run_weekday[n]
+        train = store.run_train[n]
+        return Trip(store.run_schedule[n], store.train_ids[train], store.train_names[train],
+                    store.route_ids[store.run_route[n]], None if weekday == NO_WEEKDAY else weekday,
+                    store.time_arrivals[start:end], store.time_departures[start:end])
+
+    def __iter__(self):
+        return (self[n] for n in range(len(self.store)))
+
+
+class Timetable:
+    """Immutable snapshot of routes and scheduled runs with the origin-destination index.
+
+    The data lives in a TimetableStore; this adds the lookups searches need.
+    `station_routes[code]` maps every route through `code` to the station's position on it, so
+    the routes serving A then B are the intersection of two dicts plus a position comparison.
+    """
+
+    def __init__(self, trains, schedules, route_stations, station_times):
+        """trains: {train_id: train_name}; schedules: (schedule_id, train_id, route_id, day name);
+        route_stations: (route_id, station_code, sequence_number, distance_from_source) in any order;
+        station_times: (schedule_id, station_code, arrival_time, departure_time)."""
+        self._index(TimetableStore.from_rows(trains, schedules, route_stations, station_times))
+
+    @classmethod
+    def from_store(cls, store):
+        timetable = cls.__new__(cls)
+        timetable._index(store)
+        return timetable
+
+    def _index(self, store):
+        self.store = store
+        codes = store.station_codes
+        self.route_stations = {}
+        self.route_distances = {}
+        self.station_routes = {}
+        for r, route_id in enumerate(store.route_ids):
+            start, end = store.route_stops(r)
+            stations = tuple(codes[s] for s in store.stop_stations[start:end])
+            self.route_stations[route_id] = stations
+            self.route_distances[route_id] = store.stop_distances[start:end]
+            for position, code in enumerate(stations):
+                self.station_routes.setdefault(code, {})[route_id] = position
+        self.route_trips = {}
+        route_ids = store.route_ids
+        for n, r in enumerate(store.run_route):
+            self.route_trips.setdefault(route_ids[r], []).append(n)
+        self.trips = _Trips(store)
+
+    def _runs_on(self, n, journey_date, stop, calendar=None):
+        """Trip.runs_on straight from the columns, so runs that don't match never become objects."""
+        store = self.store
+        weekday = store.run_weekday[n]
+        if weekday == NO_WEEKDAY and calendar is None:
+            return False
+        departure = store.time_departures[store.run_offsets[n] + stop]
+        offset = departure // MINUTES_PER_DAY if departure != NO_TIME else 0
+        return _origin_runs(calendar, store.train_ids[store.run_train[n]], None if weekday == NO_WEEKDAY else weekday,
+                            journey_date - timedelta(days=offset))
+
+    def direct_trips(self, from_code, to_code, journey_date, calendar=None):
+        """Yields (trip, from_position, to_position) for runs leaving `from_code` on `journey_date` towards `to_code`.
+
+        With a RunningCalendar, cancelled dates are skipped and special runs are included.
+        """
+        origin_routes = self.station_routes.get(from_code)
+        destination_routes = self.station_routes.get(to_code)
+        if not origin_routes or not destination_routes:
+            return
+        for route_id in origin_routes.keys() & destination_routes.keys():
+            src, dst = origin_routes[route_id], destination_routes[route_id]
+            if src >= dst:
+                continue
+            for trip_index in self.route_trips.get(route_id, ()):
+                if self._runs_on(trip_index, journey_date, src, calendar):
+                    yield self.trips[trip_index], src, dst
+
+    def search(self, from_code, to_code, journey_date, calendar=None):
+        """Returns the direct trains from `from_code` to `to_code` on `journey_date`, earliest departure first."""
+        results = []
+        for trip, src, dst in self.direct_trips(from_code, to_code, journey_date, calendar):
+            departure, arrival = trip.departures[src], trip.arrivals[dst]
+            known = departure != NO_TIME and arrival != NO_TIME
+            distances = self.route_distances[trip.route_id]
+            result = {
+                'id': trip.train_id,
+                'number': trip.train_id,
+                'name': trip.train_name,
+                'schedule_id': trip.schedule_id,
+                'route_id': trip.route_id,
+                'from': from_code,
+                'to': to_code,
+                'date': journey_date.strftime('%Y-%m-%d'),
+                'departure': _format_minutes(departure),
+                'arrival': _format_minutes(arrival),
+                'arrival_day_offset': (arrival // MINUTES_PER_DAY - departure // MINUTES_PER_DAY) if known else None,
+                'duration': _format_duration(arrival - departure) if known else None,
+                'distance_km': round(distances[dst] - distances[src], 1),
+                'fare': {'ac': None, 'nonac': None},
+            }
+            clock = departure % MINUTES_PER_DAY if departure != NO_TIME else MINUTES_PER_DAY
+            results.append((clock, trip.train_id, result))
+        results.sort(key=lambda item: item[:2])
+        return [result for _, _, result in results]
+
+
+class TrainSearchIndex:
+    """Process-local Timetable that reloads through `loader` after `ttl` seconds or `invalidate()`.
+
+    With `snapshot_path`, the first load maps the snapshot file instead of querying the database
+    (a fast start; it is as fresh as the last reload), and every reload rewrites the snapshot.
+    """
+
+    def __init__(self, loader, ttl=600.0, snapshot_path=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self._timetable = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Forces a rebuild on the next search, e.g. after a route or schedule changed."""
+        self._loaded_at = 0.0
+
+    def timetable(self):
+        if self._timetable is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._timetable
+        with self._lock:
+            if self._timetable is None or time.monotonic() - self._loaded_at >= self.ttl:
+                store = load_snapshot(self.snapshot_path) if self._timetable is None else None
+                if store is not None:
+                    self._timetable = Timetable.from_store(store)
+                else:
+                    self._timetable = self._loader()
+                    if self.snapshot_path:
+                        try:
+                            self._timetable.store.save(self.snapshot_path)
+                        except OSError:
+                            pass  # without a snapshot the next start just reads the database
+                self._loaded_at = time.monotonic()
+            return self._timetable
+
+    def search(self, from_code, to_code, journey_date, calendar=None):
+        return self.timetable().search(from_code, to_code, journey_date, calendar)
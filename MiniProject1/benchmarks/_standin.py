@@ -0,0 +1,92 @@
+"""SQLite stand-in for the MySQL schema used by database.py, shared by the benchmark scripts.
+
+The schema and MySQL-dialect translation come from sqlite_backend. The wrappers count
+every statement, executemany and commit as one round trip and optionally sleep for a
+simulated network round trip.
+"""
+import sqlite3
+import time
+
+from sqlite_backend import SCHEMA, translate
+
+
+class RoundTripCursor:
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, sql, params=()):
+        self._connection.round_trip()
+        self._cursor.execute(translate(sql), params)
+
+    def executemany(self, sql, seq):
+        self._connection.round_trip()
+        self._cursor.executemany(translate(sql), seq)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class RoundTripConnection:
+    """Counts round trips against a SQLite connection and sleeps `rtt` seconds for each."""
+
+    def __init__(self, raw, rtt=0.0):
+        self.raw = raw
+        self.rtt = rtt
+        self.round_trips = 0
+
+    def round_trip(self, n=1):
+        self.round_trips += n
+        if self.rtt:
+            time.sleep(self.rtt * n)
+
+    def cursor(self):
+        return RoundTripCursor(self, self.raw.cursor())
+
+    def commit(self):
+        self.round_trip()
+        self.raw.commit()
+
+    def rollback(self):
+        self.round_trip()
+        self.raw.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def connect(path=":memory:"):
+    raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, timeout=60)
+    if path != ":memory:":
+        raw.execute("PRAGMA journal_mode=WAL")
+    return raw
+
+
+def seed(raw, stations=50, coaches=4, seats_per_coach=1000, journey_date="2026-12-01"):
+    """Creates the schema with one train (TRN101) running through `stations` stops."""
+    raw.executescript(SCHEMA)
+    raw.executemany("INSERT INTO Stations (station_code, station_name) VALUES (?, ?)", [(f"S{i:03d}", f"Station {i}") for i in range(stations)])
+    raw.execute("INSERT INTO Trains VALUES ('TRN101', 'Bench Express')")
+    raw.execute("INSERT INTO TrainSchedules (train_id, route_id) VALUES ('TRN101', 1)")
+    raw.executemany("INSERT INTO RouteStations VALUES (1, ?, ?, ?)", [(f"S{i:03d}", i + 1, i * 12.5) for i in range(stations)])
+    raw.executemany("INSERT INTO Coaches VALUES (?, 'TRN101', 'sleeper', ?)", [(f"TRN101-S{c + 1}", seats_per_coach) for c in range(coaches)])
+    raw.executemany("INSERT INTO SeatInventory (train_id, coach_id, journey_date, total_seats, available_seats) VALUES ('TRN101', ?, ?, ?, ?)",
+                    [(f"TRN101-S{c + 1}", journey_date, seats_per_coach, seats_per_coach) for c in range(coaches)])
+    raw.commit()
@@ -0,0 +1,188 @@
+"""LLM calls and wall time per completed booking: text tool calls, native tool calling, fast path.
+
+Drives a scripted customer through a booking on a synthetic network (see synthetic.py) over
+SQLite, talking to the configured Groq model, so it needs GROQ_API_KEY and network access.
+The customer sends a bare train ID (as the Streamlit train buttons do), station codes and a
+YYYY-MM-DD date, then one passenger, and keeps asking the assistant to go ahead until
+book_appointment succeeds or --max-turns is reached.
+
+  legacy   the original loop: the model writes <tool_call>name(args)</tool_call> in its text,
+           the call is parsed with regexes and comma splits, and every tool result costs
+           another model call
+  native   agent.caller_app: tools bound to the model, structured tool_calls validated
+           against the compiled schemas, and a booking ends without another model call
+  fast     native plus fast_path.py, which answers the ID, code and date turns without the model
+
+    python benchmarks/agent_booking.py --runs 5
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic  # noqa: E402
+
+LEGACY_INSTRUCTION = """If you need to use a tool, format your response like this:
+        <tool_call>tool_name(arg1=value1, arg2=value2, ...)</tool_call>"""
+
+
+class CountingModel:
+    """Stands in for a chat model and counts its invoke() calls."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def invoke(self, messages, *args, **kwargs):
+        self.calls += 1
+        return self.model.invoke(messages, *args, **kwargs)
+
+
+def booking_case(path, rng):
+    """(train_id, source code, destination code, journey date) of a segment with open inventory."""
+    with sqlite3.connect(path) as raw:
+        train_id, journey_date = rng.choice(raw.execute(
+            "SELECT DISTINCT train_id, journey_date FROM SeatInventory WHERE available_seats > 0").fetchall())
+        stops = [code for code, in raw.execute(
+            "SELECT station_code FROM RouteStations rs JOIN TrainSchedules ts ON ts.route_id = rs.route_id "
+            "WHERE ts.train_id = ? GROUP BY station_code ORDER BY MIN(sequence_number)", (train_id,))]
+    source = rng.randrange(len(stops) - 1)
+    return train_id, stops[source], stops[rng.randrange(source + 1, len(stops))], str(journey_date)
+
+
+def customer_turns(case):
+    train_id, source, destination, journey_date = case
+    return [
+        "I want to book a train ticket.",
+        train_id,
+        source,
+        destination,
+        journey_date,
+        "One passenger, Asha Rao.",
+        "She is 34.",
+    ]
+
+
+def _parse_legacy_args(args_str):
+    """The original argument parser: JSON if it looks like an object, else comma-separated key=value."""
+    if args_str.startswith('{') and args_str.endswith('}'):
+        try:
+            return json.loads(args_str.replace('\'', '"'))
+        except json.JSONDecodeError:
+            pass
+    args = {}
+    for arg in args_str.split(','):
+        key_value = arg.split('=', 1)
+        if len(key_value) == 2:
+            args[key_value[0].strip()] = key_value[1].strip().strip('\'').strip('"')
+        else:
+            args['query'] = arg.strip().strip('\'').strip('"')
+    return args
+
+
+def legacy_turn(agent, model, messages, current_time):
+    """One customer turn through the original graph: agent -> preprocess -> action -> agent ..."""
+    prompt = re.sub(r"Use the tools through the tool-calling interface.*", lambda _: LEGACY_INSTRUCTION,
+                    agent.config.CALLER_PA_PROMPT).format(current_time=current_time)
+    for _ in range(10):
+        reply = model.invoke([agent.SystemMessage(content=prompt)] + messages)
+        messages.append(reply)
+        match = re.search(r"<tool_call>(.*?)</tool_call>", reply.content or "", re.DOTALL)
+        if not match:
+            return messages
+        call = re.match(r"(\w+)\((.*)\)", match.group(1).strip(), re.DOTALL)
+        if not call or call.group(1) not in agent.available_functions:
+            messages[-1] = agent.AIMessage(content=f"Invalid tool call format: {match.group(1)}")
+            continue
+        try:
+            result = agent.available_functions[call.group(1)](**_parse_legacy_args(call.group(2)))
+            messages[-1] = agent.AIMessage(content=f"Tool Result: {result}")
+        except Exception as e:
+            messages[-1] = agent.AIMessage(content=f"Error calling tool {call.group(1)}: {e}")
+    return messages
+
+
+def run_conversation(agent, mode, case, max_turns):
+    """(booked, model calls, customer turns, seconds, [seconds per turn]) for one scripted conversation."""
+    booked = []
+    book = agent.available_functions["book_appointment"]
+
+    def counting_book(*args, **kwargs):
+        result = book(*args, **kwargs)
+        if isinstance(result, dict) and result.get("success"):
+            booked.append(result)
+        return result
+
+    agent.available_functions["book_appointment"] = counting_book
+    model = CountingModel(agent.llm if mode == "legacy" else agent.llm_with_tools)
+    if mode != "legacy":
+        agent.llm_with_tools = model
+    agent.FAST_PATH_ENABLED = mode == "fast"
+    turns = customer_turns(case)
+    messages = []
+    booking = {}
+    turn_seconds = []
+    start = time.perf_counter()
+    try:
+        for turn in range(max_turns):
+            text = turns[turn] if turn < len(turns) else "Yes, please go ahead and book it now."
+            current_time = agent.config.get_current_time()
+            turn_start = time.perf_counter()
+            if mode == "legacy":
+                messages = legacy_turn(agent, model, messages + [agent.HumanMessage(content=text)], current_time)
+            else:
+                response = agent.receive_message_from_caller(text, messages, current_time, booking)
+                messages, booking = response["messages"], response["booking"]
+            turn_seconds.append(time.perf_counter() - turn_start)
+            if booked:
+                return True, model.calls, turn + 1, time.perf_counter() - start, turn_seconds
+        return False, model.calls, max_turns, time.perf_counter() - start, turn_seconds
+    finally:
+        agent.available_functions["book_appointment"] = book
+        if mode != "legacy":
+            agent.llm_with_tools = model.model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("legacy", "native", "fast", "all"), default="all")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-turns", type=int, default=12)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    size = synthetic.SCALES["smoke"]
+    path = synthetic.ensure_network(args.data_dir, size["stations"], size["trains"], size["reservations"])
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = path
+    # synthetic.py already imported sqlite_backend, which read SQLITE_PATH on import.
+    synthetic.sqlite_backend.SQLITE_PATH = path
+    logging.disable(logging.CRITICAL)
+    import agent  # imported after the environment points it at the synthetic database
+
+    modes = ("legacy", "native", "fast") if args.mode == "all" else (args.mode,)
+    rng = random.Random(args.seed)
+    cases = [booking_case(path, rng) for _ in range(args.runs)]
+    for mode in modes:
+        results = [run_conversation(agent, mode, case, args.max_turns) for case in cases]
+        completed = [result for result in results if result[0]]
+        print(f"{mode:7s} {len(completed)}/{len(results)} bookings completed")
+        if completed:
+            print(f"        LLM calls per booking  {statistics.mean(r[1] for r in completed):6.1f}")
+            print(f"        turns per booking      {statistics.mean(r[2] for r in completed):6.1f}")
+            print(f"        seconds per booking    {statistics.mean(r[3] for r in completed):6.1f}")
+        print(f"        median turn seconds    {statistics.median(s for r in results for s in r[4]):6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Round trips and latency of create_reservation, before and after the batched rewrite.
+
+Runs both booking paths against the in-memory SQLite stand-in in benchmarks/_standin.py.
+Every statement, executemany and commit counts as one round trip and sleeps for --rtt
+milliseconds to simulate the network; the legacy path also pays --connect-rtts round
+trips per booking for the TCP + auth handshake it did on every call. The new path also
+allocates seats, which the legacy path never did.
+
+    python benchmarks/bench_create_reservation.py --bookings 200 --rtt 1.0
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from database import categorize_age  # noqa: E402
+from benchmarks._standin import RoundTripConnection, connect, seed  # noqa: E402
+
+
+def legacy_create_reservation(open_connection, train_id, journey_date, source_station_code, destination_station_code, passengers):
+    """The original seven-statement booking path, kept here as the benchmark baseline."""
+    connection = open_connection()
+    cursor = connection.cursor()
+    try:
+        pnr = str(uuid.uuid4())[:8].upper()
+        cursor.execute("SELECT train_id FROM Trains WHERE train_id = %s", (train_id,))
+        if not cursor.fetchone():
+            return {"success": False, "error": f"Invalid Train ID: {train_id}"}
+        cursor.execute("SELECT station_code FROM Stations WHERE station_code = %s", (source_station_code,))
+        if not cursor.fetchone():
+            return {"success": False, "error": f"Invalid Source Station Code: {source_station_code}"}
+        cursor.execute("SELECT station_code FROM Stations WHERE station_code = %s", (destination_station_code,))
+        if not cursor.fetchone():
+            return {"success": False, "error": f"Invalid Destination Station Code: {destination_station_code}"}
+        cursor.execute("INSERT INTO Reservations (pnr, train_id, journey_date, source_station_code, destination_station_code, booking_time, status) VALUES (%s, %s, %s, %s, %s, NOW(), %s)",
+                       (pnr, train_id, journey_date, source_station_code, destination_station_code, "Confirmed"))
+        cursor.executemany("INSERT INTO Passengers (pnr, name, age, category) VALUES (%s, %s, %s, %s)",
+                           [(pnr, p.get('name'), p.get('age'), categorize_age(p['age'])) for p in passengers])
+        connection.commit()
+        cursor.execute("SELECT r.pnr, r.train_id, t.train_name, r.journey_date, r.source_station_code, s_src.station_name, r.destination_station_code, s_dest.station_name, r.booking_time, r.status FROM Reservations r JOIN Trains t ON r.train_id = t.train_id JOIN Stations s_src ON r.source_station_code = s_src.station_code JOIN Stations s_dest ON r.destination_station_code = s_dest.station_code WHERE r.pnr = %s", (pnr,))
+        details = cursor.fetchone()
+        cursor.execute("SELECT name, age, category FROM Passengers WHERE pnr = %s", (pnr,))
+        cursor.fetchall()
+        return {"success": True, "booking_details": {"pnr": details[0], "journey_date": details[3].strftime('%Y-%m-%d')}}
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def run(label, book, connection, bookings, passengers):
+    latencies = []
+    connection.round_trips = 0
+    for i in range(bookings):
+        start = time.perf_counter()
+        result = book("TRN101", "2026-12-01", "S001", f"S{2 + i % 40:03d}", passengers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result["success"], result
+    latencies.sort()
+    return {
+        "label": label,
+        "round_trips": connection.round_trips / bookings,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--passengers", type=int, default=3)
+    parser.add_argument("--rtt", type=float, default=1.0, help="simulated network round trip in ms")
+    parser.add_argument("--connect-rtts", type=int, default=3, help="round trips charged per new connection")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    raw = connect()
+    seed(raw, seats_per_coach=args.bookings * args.passengers)
+    connection = RoundTripConnection(raw, args.rtt / 1000)
+    passengers = [{"name": f"Passenger {i}", "age": 20 + i} for i in range(args.passengers)]
+
+    def legacy_connect():
+        connection.round_trip(args.connect_rtts)
+        return connection
+
+    # The pooled path reuses a warm connection, so it pays no handshake.
+    database.create_db_connection = lambda: connection
+    database.route_cache.preload()
+
+    results = [
+        run("before (connect + 7 statements)", lambda *a: legacy_create_reservation(legacy_connect, *a), connection, args.bookings, passengers),
+        run("after (pooled, batched, seats)", database.create_reservation, connection, args.bookings, passengers),
+    ]
+    print(f"{args.bookings} bookings, {args.passengers} passengers each, simulated RTT {args.rtt} ms")
+    print(f"{'path':34} {'round trips':>12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for r in results:
+        print(f"{r['label']:34} {r['round_trips']:>12.1f} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cost of the ETA service's compile step, its per-minute pass and per-PNR lookups.
+
+Builds the timetable of a synthetic network (see synthetic.py), invents a DelayPattern row
+per (train, stop, day of operation) with a few month-specific overrides, and reports:
+
+  compile          DelayTable: patterns resolved into one int16 table per run
+  pass             EtaSnapshot over a live status for every train on each of the last 3 days
+  lookup           EtaSnapshot.eta for the destination of random journeys
+
+    python benchmarks/eta.py --scale default
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.timetable_store import fetch_rows  # noqa: E402
+from eta import DelayTable, EtaSnapshot  # noqa: E402
+from timetable_store import WEEKDAYS, NO_WEEKDAY  # noqa: E402
+from train_search import Timetable  # noqa: E402
+
+DAY_NAMES = {weekday: name for name, weekday in WEEKDAYS.items()}
+
+
+def delay_patterns(timetable, rng):
+    store = timetable.store
+    rows = []
+    for n in range(len(store)):
+        weekday = store.run_weekday[n]
+        if weekday == NO_WEEKDAY:
+            continue
+        train_id = store.train_ids[store.run_train[n]]
+        for k, code in enumerate(timetable.route_stations[store.route_ids[store.run_route[n]]]):
+            rows.append((train_id, code, 2 * k + rng.randint(0, 5), DAY_NAMES[weekday], None, 2025))
+            if rng.random() < 0.1:
+                rows.append((train_id, code, 3 * k, DAY_NAMES[weekday], rng.randint(1, 12), 2026))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="smoke")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    size = synthetic.SCALES[args.scale]
+    path = synthetic.ensure_network(args.data_dir, size["stations"], size["trains"], size["reservations"])
+    timetable = Timetable(*fetch_rows(path))
+    rng = random.Random(args.seed)
+    rows = delay_patterns(timetable, rng)
+
+    start = time.perf_counter()
+    table = DelayTable(timetable.store, rows)
+    compile_seconds = time.perf_counter() - start
+
+    today = date.today()
+    live = [(train_id, today - timedelta(days=back), None, rng.randint(0, 90))
+            for train_id in timetable.store.train_ids for back in range(3)]
+    start = time.perf_counter()
+    snapshot = EtaSnapshot(timetable, table, live, datetime.now())
+    pass_seconds = time.perf_counter() - start
+
+    running = list(snapshot.trains)
+    queries = []
+    for _ in range(args.lookups):
+        key = rng.choice(running)
+        queries.append((key[0], key[1], rng.choice(snapshot.trains[key]['stops'])))
+    start = time.perf_counter()
+    for train_id, journey_date, code in queries:
+        snapshot.eta(train_id, journey_date, code)
+    lookup_seconds = time.perf_counter() - start
+
+    print(f"{len(rows)} delay patterns, {len(table)} run tables, {len(live)} live statuses, {len(snapshot)} running journeys")
+    print(f"compile  {compile_seconds * 1000:10.1f} ms")
+    print(f"pass     {pass_seconds * 1000:10.1f} ms")
+    print(f"lookup   {lookup_seconds / len(queries) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""JourneyPlanner against direct search: every direct train Timetable.search lists must be plannable.
+
+For random station pairs and dates on a synthetic network (see synthetic.py), each direct
+train from Timetable.search is planned again with JourneyPlanner.plan(max_changes=0) from its
+departure time; the planner must return a direct itinerary arriving no later. A hand-built
+regression case runs first: a Sunday-night train whose later hops leave after midnight, which
+a Monday search must still find. Prints the mismatches and the time per plan, and exits 1 if
+any were found.
+
+    python benchmarks/journey_planner.py --scale smoke --pairs 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.timetable_store import fetch_rows  # noqa: E402
+from journey_planner import JourneyPlanner, MINUTES_PER_DAY  # noqa: E402
+from train_search import Timetable  # noqa: E402
+
+
+def _minutes(day, clock, start_date):
+    hours, minutes = (int(part) for part in clock.split(":"))
+    return ((datetime.strptime(day, "%Y-%m-%d").date() - start_date).days * MINUTES_PER_DAY + hours * 60 + minutes)
+
+
+def mismatches(timetable, planner, from_code, to_code, journey_date):
+    """Direct trains from `from_code` to `to_code` on `journey_date` that the planner misses or beats badly."""
+    found = []
+    for train in timetable.search(from_code, to_code, journey_date):
+        if train["departure"] is None or train["arrival"] is None:
+            continue
+        departure = _minutes(train["date"], train["departure"], journey_date)
+        hours, minutes = (int(part[:-1]) for part in train["duration"].split())
+        arrival = departure + hours * 60 + minutes
+        plans = planner.plan(from_code, to_code, journey_date, earliest=train["departure"], max_changes=0, limit=1)
+        if not plans or _minutes(plans[0]["arrival_date"], plans[0]["arrival"], journey_date) > arrival:
+            found.append((from_code, to_code, journey_date, train["id"], train["departure"], plans[:1]))
+    return found
+
+
+def sunday_night_case():
+    """A Sunday run A 22:00 -> B (dep 00:10) -> C 02:00: B to C must be found on Monday."""
+    timetable = Timetable({"T1": "Night Mail"}, [(1, "T1", "R1", "Sunday")],
+                          [("R1", "A", 1, 0), ("R1", "B", 2, 50), ("R1", "C", 3, 120)],
+                          [(1, "A", None, "22:00"), (1, "B", "00:05", "00:10"), (1, "C", "02:00", None)])
+    planner = JourneyPlanner(timetable)
+    monday = datetime(2026, 10, 19).date()
+    return mismatches(timetable, planner, "B", "C", monday) + mismatches(timetable, planner, "A", "C", monday - timedelta(days=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="smoke")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    found = sunday_night_case()
+    print(f"sunday night case  {'FAIL' if found else 'ok'}")
+
+    size = synthetic.SCALES[args.scale]
+    path = synthetic.ensure_network(args.data_dir, size["stations"], size["trains"], size["reservations"])
+    timetable = Timetable(*fetch_rows(path))
+    planner = JourneyPlanner(timetable)
+    rng = random.Random(args.seed)
+    routes = list(timetable.route_stations.values())
+    checked = 0
+    start = time.perf_counter()
+    for _ in range(args.pairs):
+        stations = rng.choice(routes)
+        src = rng.randrange(len(stations) - 1)
+        dst = rng.randrange(src + 1, len(stations))
+        journey_date = synthetic.START_DATE + timedelta(days=rng.randrange(7))
+        checked += len(timetable.search(stations[src], stations[dst], journey_date))
+        found += mismatches(timetable, planner, stations[src], stations[dst], journey_date)
+    elapsed = time.perf_counter() - start
+
+    for mismatch in found[:20]:
+        print("MISMATCH", *mismatch)
+    print(f"{checked} direct trains on {args.pairs} station pairs, {len(found)} mismatches, "
+          f"{elapsed / max(checked, 1) * 1000:.2f} ms per direct train")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
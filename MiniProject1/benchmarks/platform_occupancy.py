@@ -0,0 +1,110 @@
+"""Cost of the platform occupancy index: bulk validation, conflict checks and free-platform queries.
+
+Builds the timetable of a synthetic network (see synthetic.py), invents platforms for every
+station (enough for its busiest day, some with capabilities) and a platform for every stop,
+then reports:
+
+  build            PlatformOccupancy.from_timetable over a week starting on the network's first day
+  validate         every overlapping pair on one platform in that week, by sort and sweep
+  check            add() of a journey to a random platform, i.e. an overlap query on one station-day
+  free             free_platforms() for a random stop and capability
+
+    python benchmarks/platform_occupancy.py --scale default
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.timetable_store import fetch_rows  # noqa: E402
+from platform_occupancy import PlatformOccupancy  # noqa: E402
+from train_search import Timetable  # noqa: E402
+
+CAPABILITIES = ("electric", "long_train", "covered")
+WEEK = 7
+
+
+def platforms_and_assignments(timetable, rng):
+    store = timetable.store
+    visits = {}
+    for n in range(len(store)):
+        for code in timetable.route_stations[store.route_ids[store.run_route[n]]]:
+            visits.setdefault(code, []).append(n)
+    platforms = []
+    by_station = {}
+    for code, runs in visits.items():
+        # Roughly one platform per two dozen daily calls, so busy stations see some contention.
+        for number in range(1, len(runs) // (WEEK * 24) + 3):
+            capabilities = ",".join(name for name in CAPABILITIES if rng.random() < 0.5)
+            platforms.append((len(platforms) + 1, code, number, "passenger", capabilities))
+            by_station.setdefault(code, []).append(len(platforms))
+    assignments = []
+    for n in range(len(store)):
+        schedule_id = store.run_schedule[n]
+        for code in timetable.route_stations[store.route_ids[store.run_route[n]]]:
+            assignments.append((schedule_id, code, rng.choice(by_station[code]), 5))
+    return platforms, assignments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="smoke")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    size = synthetic.SCALES[args.scale]
+    path = synthetic.ensure_network(args.data_dir, size["stations"], size["trains"], size["reservations"])
+    timetable = Timetable(*fetch_rows(path))
+    store = timetable.store
+    rng = random.Random(args.seed)
+    platforms, assignments = platforms_and_assignments(timetable, rng)
+    first = synthetic.START_DATE
+
+    start = time.perf_counter()
+    index = PlatformOccupancy.from_timetable(store, assignments, platforms, first, WEEK, rng=rng)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    conflicts = index.validate()
+    validate_seconds = time.perf_counter() - start
+
+    placed = list(index.placements.items())
+    queries = []
+    for _ in range(args.queries):
+        (train_id, origin, code), (begin, end, _) = rng.choice(placed)
+        queries.append((code, train_id, origin, begin, end, rng.choice(index.station_platforms[code])))
+    # Building each station-day's tree happens once, on its first query; time it separately.
+    start = time.perf_counter()
+    for code, _, origin, begin, end, _ in queries:
+        index.occupants(code, origin, begin, end)
+    first_touch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for code, train_id, origin, begin, end, platform_id in queries:
+        index.add(code, train_id, origin, begin, end, platform_id)
+    check_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for code, train_id, origin, begin, end, _ in queries:
+        index.free_platforms(code, origin, begin, end, needs=(rng.choice(CAPABILITIES),), train_id=train_id)
+    free_seconds = time.perf_counter() - start
+
+    print(f"{len(platforms)} platforms, {len(assignments)} platform assignments, "
+          f"{len(index)} journey stops in {WEEK} days, {len(conflicts)} conflicts")
+    print(f"build     {build_seconds * 1000:10.1f} ms")
+    print(f"validate  {validate_seconds * 1000:10.1f} ms")
+    print(f"trees     {first_touch_seconds * 1000:10.1f} ms  (first touch of {len(index.trees)} station-days)")
+    print(f"check     {check_seconds / len(queries) * 1e6:10.1f} us")
+    print(f"free      {free_seconds / len(queries) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Prompt size per model call as a conversation grows: full history vs context_window.build_messages.
+
+Generates a scripted conversation (no model or database needed) in which every turn has the
+model call a tool: a train's route, availability on a date or a station search, with
+realistic result sizes, followed by the assistant's reply. For each conversation length it
+prints the estimated tokens of the prompt sent after the last tool result, once with the
+whole history (as before) and once windowed, summarized and budgeted.
+
+    python benchmarks/prompt_size.py --turns 1,5,10,25,50,100
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage  # noqa: E402
+import context_window  # noqa: E402
+from config import AppConfig  # noqa: E402
+
+
+def station(rng):
+    code = "".join(rng.choice("ABCDEFGHIJKLMNOPRSTUVW") for _ in range(rng.randint(3, 5)))
+    return code, f"{code.capitalize()}pur {rng.choice(('Junction', 'Central', 'Cantt', 'Road'))}"
+
+
+def scripted_turn(n, rng):
+    """The messages of the n-th turn: the user's question, a tool call, its result and the reply."""
+    train_id = str(rng.randint(10000, 19999))
+    kind = n % 3
+    if kind == 0:
+        question = f"Which stations does train {train_id} stop at?"
+        call = {"name": "get_train_route", "args": {"train_id": train_id}, "id": f"call_{n}"}
+        stops = [(*station(rng), i + 1) for i in range(rng.randint(15, 40))]
+        result = str(stops)
+        reply = f"Train {train_id} stops at: " + ", ".join(f"{name} ({code})" for code, name, _ in stops) + ". Where will you board?"
+    elif kind == 1:
+        day = f"2026-11-{rng.randint(1, 28):02d}"
+        question = f"Are there seats on {train_id} on {day}?"
+        call = {"name": "get_next_available_appointment", "args": {"train_id": train_id, "date": day}, "id": f"call_{n}"}
+        result = f"Train {train_id} on {day}: " + ", ".join(f"{coach} {rng.randint(0, 72)} available" for coach in ("sleeper", "ac3", "ac2", "ac1"))
+        reply = f"{result}. Would you like to book one of these classes?"
+    else:
+        query = station(rng)[1].split()[0]
+        question = f"Find stations called {query}"
+        call = {"name": "search_stations", "args": {"query": query}, "id": f"call_{n}"}
+        result = str([station(rng) for _ in range(rng.randint(1, 12))])
+        reply = f"I found these stations: {result}. Which one do you mean?"
+    return [HumanMessage(content=question), AIMessage(content="", tool_calls=[call]),
+            ToolMessage(content=result, name=call["name"], tool_call_id=call["id"])], AIMessage(content=reply), call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", default="1,2,5,10,25,50,100")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    lengths = sorted(int(n) for n in args.turns.split(","))
+    system_prompt = AppConfig().CALLER_PA_PROMPT.format(current_time="2026-11-01 09:00:00")
+    rng = random.Random(args.seed)
+    history = []
+    booking = {}
+    print(f"budget {context_window.CONTEXT_TOKEN_BUDGET} tokens, window {context_window.CONTEXT_WINDOW_TURNS} turns")
+    print(f"{'turns':>6}{'full history':>15}{'windowed':>11}")
+    for n in range(1, lengths[-1] + 1):
+        messages, reply, call = scripted_turn(n, rng)
+        history += messages
+        context_window.remember_slots(booking, call)
+        if n in lengths:
+            full = context_window.prompt_tokens([SystemMessage(content=system_prompt)] + history)
+            windowed = context_window.prompt_tokens(context_window.build_messages(system_prompt, history, booking))
+            print(f"{n:>6}{full:>15}{windowed:>11}")
+        history.append(reply)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Races parallel bookings for one train/date and checks the seat inventory is never oversold.
+
+Each worker thread books through database.create_reservation on its own connection to a
+WAL-mode SQLite file (see benchmarks/_standin.py). SQLite has no FOR UPDATE, so this
+exercises the conditional-update and retry path of seat_allocation. Afterwards the
+script checks the invariants and exits non-zero if any is violated:
+
+  * confirmed passengers never exceed the seats on sale and available_seats never goes negative
+  * available_seats + confirmed passengers == total_seats for every coach
+  * RAC never exceeds RAC_LIMIT_PER_COACH, waitlist positions are unique and gap-free
+
+    python benchmarks/stress_seat_allocation.py --workers 32 --bookings 400 --seats 50
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import seat_allocation  # noqa: E402
+from benchmarks._standin import RoundTripConnection, connect, seed  # noqa: E402
+
+JOURNEY_DATE = "2026-12-01"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--bookings", type=int, default=400)
+    parser.add_argument("--coaches", type=int, default=2)
+    parser.add_argument("--seats", type=int, default=50, help="seats per coach")
+    parser.add_argument("--max-party", type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    raw = connect(path)
+    seed(raw, coaches=args.coaches, seats_per_coach=args.seats, journey_date=JOURNEY_DATE)
+    raw.close()
+
+    local = threading.local()
+
+    def thread_connection():
+        if not hasattr(local, "connection"):
+            local.connection = RoundTripConnection(connect(path))
+        return local.connection
+
+    database.create_db_connection = thread_connection
+    database.route_cache.preload()
+
+    rng = random.Random(7)
+    parties = [rng.randint(1, args.max_party) for _ in range(args.bookings)]
+
+    def book(i):
+        passengers = [{"name": f"P{i}-{j}", "age": 30} for j in range(parties[i])]
+        return parties[i], database.create_reservation("TRN101", JOURNEY_DATE, "S001", "S010", passengers)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(book, range(args.bookings)))
+
+    statuses = Counter()
+    seated = Counter()
+    positions = []
+    for party, result in results:
+        if not result["success"]:
+            statuses["refused"] += 1
+            continue
+        details = result["booking_details"]
+        statuses[details["status"]] += 1
+        seated[details["status"]] += party
+        if details["waitlist_position"] is not None:
+            positions.extend(range(details["waitlist_position"], details["waitlist_position"] + party))
+
+    check = connect(path)
+    inventory = check.execute("SELECT coach_id, total_seats, available_seats, rac_count, waitlist_count FROM SeatInventory").fetchall()
+    booked = dict(check.execute("SELECT status, COUNT(*) FROM Reservations GROUP BY status").fetchall())
+
+    failures = []
+    total = sum(row[1] for row in inventory)
+    if seated[seat_allocation.CONFIRMED] > total:
+        failures.append(f"oversold: {seated[seat_allocation.CONFIRMED]} confirmed passengers for {total} seats")
+    if total - sum(row[2] for row in inventory) != seated[seat_allocation.CONFIRMED]:
+        failures.append("available_seats does not match confirmed passengers")
+    for coach_id, _, available, rac, _ in inventory:
+        if available < 0:
+            failures.append(f"{coach_id} has negative availability ({available})")
+        if rac > seat_allocation.RAC_LIMIT_PER_COACH:
+            failures.append(f"{coach_id} exceeds the RAC limit ({rac})")
+    if sorted(positions) != list(range(1, len(positions) + 1)):
+        failures.append("waitlist positions are duplicated or have gaps")
+    if sum(booked.values()) != sum(n for status, n in statuses.items() if status != "refused"):
+        failures.append("reservation rows do not match successful bookings")
+
+    print(f"{args.bookings} bookings from {args.workers} workers for {total} seats in {args.coaches} coaches")
+    print(f"bookings by status: {dict(statuses)}")
+    print(f"passengers by status: {dict(seated)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: no overselling")
+
+
+if __name__ == "__main__":
+    main()
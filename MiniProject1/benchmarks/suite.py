@@ -0,0 +1,401 @@
+"""Latency and throughput benchmarks for the data-access hot paths.
+
+Seeds (once, cached under --data-dir) a synthetic network from benchmarks/synthetic.py and
+runs each target in its own process against SQLite (DB_BACKEND=sqlite), so caches and
+imports never leak between targets. Every target reports p50/p95/p99 latency and
+single-threaded throughput. Logging is switched off while measuring.
+
+  search_stations       database.search_stations through the in-memory catalog
+  search_stations_sql   the LIKE query the catalog replaces
+  search_stations_typo  database.search_stations on misspelled names (fuzzy suggestions)
+  get_train_route       database.get_train_route with the route cache preloaded
+  get_train_route_cold  the same call with the cache dropped before every call
+  create_reservation    database.create_reservation on random segments and dates
+  plan_journey          journeys.plan_journey between random stations, up to two changes
+  nearby_stations       station_geo.find_nearby_stations around random coordinates
+  agent_tools           the agent's read-only tool calls through database.tool_results (reports hit_rate)
+  agent_tools_uncached  the same calls straight to database.py
+  flask_reservations    GET /api/reservations on the Flask backend (needs Flask deps)
+  fastapi_trains        GET /trains/ on the FastAPI app (needs FastAPI + httpx)
+
+The HTTP targets get their own, smaller databases (--http-reservations) because the
+listings return every row.
+
+    python benchmarks/suite.py --scale smoke
+    python benchmarks/suite.py --save-baseline benchmarks/baselines/main.json
+    python benchmarks/suite.py --baseline benchmarks/baselines/main.json --threshold 0.15
+
+With --baseline the run exits 1 if any target's p95 regressed by more than --threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic  # noqa: E402
+
+TARGETS = ("search_stations", "search_stations_sql", "search_stations_typo", "get_train_route", "get_train_route_cold",
+           "create_reservation", "plan_journey", "nearby_stations", "agent_tools", "agent_tools_uncached",
+           "flask_reservations", "fastapi_trains")
+HTTP_TARGETS = ("flask_reservations", "fastapi_trains")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 4) if seconds is not None else None  # noqa: E731
+    return {
+        "iterations": len(latencies),
+        "errors": errors,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "throughput_ops": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+def measure(call, inputs, warmup=20):
+    """Runs `call(item)` for every input and returns the summary; a falsy result counts as an error."""
+    for item in inputs[:warmup]:
+        call(item)
+    latencies = []
+    errors = 0
+    clock = time.perf_counter
+    start = clock()
+    for item in inputs:
+        t0 = clock()
+        ok = call(item)
+        latencies.append(clock() - t0)
+        if not ok:
+            errors += 1
+    return summarize(latencies, clock() - start, errors)
+
+
+# --- workers (run in a child process) ---------------------------------------------------
+
+def _station_queries(network, rng, n):
+    stations = network["stations"]
+    queries = []
+    for _ in range(n):
+        code, name = rng.choice(stations)
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(code)
+        elif kind < 0.8:
+            start = rng.randrange(max(1, len(name) - 3))
+            queries.append(name[start:start + rng.randint(3, 6)])
+        else:
+            queries.append(name.split()[0])
+    return queries
+
+
+def _misspelled_names(network, rng, n):
+    """Station names with one dropped, doubled or swapped letter, the way users mistype them."""
+    names = [name for _, name in network["stations"] if len(name) > 3]
+    queries = []
+    for _ in range(n):
+        name = list(rng.choice(names))
+        i = rng.randrange(1, len(name) - 1)
+        kind = rng.random()
+        if kind < 0.4:
+            del name[i]
+        elif kind < 0.7:
+            name.insert(i, name[i])
+        else:
+            name[i], name[i + 1] = name[i + 1], name[i]
+        queries.append("".join(name))
+    return queries
+
+
+def _booking_requests(network, rng, n):
+    routes = network["routes"]
+    train_ids = list(routes)
+    requests = []
+    for _ in range(n):
+        train_id = rng.choice(train_ids)
+        route = routes[train_id]
+        src = rng.randrange(len(route) - 1)
+        dst = rng.randrange(src + 1, len(route))
+        passengers = [{"name": f"Bench {i}", "age": rng.randint(5, 80)} for i in range(rng.choice((1, 1, 2, 3)))]
+        requests.append((train_id, rng.choice(network["journey_dates"]).strftime('%Y-%m-%d'), route[src][0], route[dst][0], passengers))
+    return requests
+
+
+def _agent_tool_calls(network, rng, n):
+    """(tool, args) the way conversations ask them: most about a few popular trains and stations."""
+    train_ids = list(network["routes"])
+    stations = network["stations"]
+    popular = lambda items: items[min(len(items) - 1, int(rng.paretovariate(1.2)) - 1)]  # noqa: E731
+    calls = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.05:
+            calls.append(("get_all_trains", ()))
+        elif kind < 0.45:
+            code, name = popular(stations)
+            calls.append(("search_stations", (code if rng.random() < 0.5 else name.split()[0],)))
+        elif kind < 0.55:
+            calls.append(("search_trains", (popular(train_ids),)))
+        else:
+            calls.append(("get_train_route", (popular(train_ids),)))
+    return calls
+
+
+def run_data_target(target, db_path, iterations, seed):
+    import database  # DB_BACKEND and SQLITE_PATH come from run_target's environment
+
+    network = synthetic.load_network(db_path)
+    rng = random.Random(seed)
+    if target == "search_stations":
+        return measure(lambda q: database.search_stations(q) is not None, _station_queries(network, rng, iterations))
+    if target == "search_stations_typo":
+        database.station_catalog.suggest("warmup")
+        return measure(lambda q: database.search_stations(q) is not None, _misspelled_names(network, rng, iterations))
+    if target == "search_stations_sql":
+        return measure(lambda q: database._search_stations_sql(q) is not None, _station_queries(network, rng, iterations))
+    train_ids = [rng.choice(list(network["routes"])) for _ in range(iterations)]
+    if target == "get_train_route":
+        database.preload_train_routes()
+        return measure(database.get_train_route, train_ids)
+    if target == "get_train_route_cold":
+        def cold(train_id):
+            database.route_cache.invalidate(train_id)
+            return database.get_train_route(train_id)
+        return measure(cold, train_ids)
+    if target == "create_reservation":
+        database.preload_train_routes()
+        return measure(lambda args: database.create_reservation(*args)["success"], _booking_requests(network, rng, iterations))
+    if target == "plan_journey":
+        import journeys
+        journeys.get_journey_planner()
+        codes = [code for code, _ in network["stations"]]
+        trips = [(*rng.sample(codes, 2), rng.choice(network["journey_dates"]).strftime('%Y-%m-%d')) for _ in range(iterations)]
+        return measure(lambda trip: journeys.plan_journey(*trip, earliest_time="06:00")["success"], trips, warmup=2)
+    if target == "nearby_stations":
+        import station_geo
+        station_geo.get_station_geo_index()
+        points = [f"{rng.uniform(*synthetic.LATITUDES):.4f},{rng.uniform(*synthetic.LONGITUDES):.4f}" for _ in range(iterations)]
+        return measure(lambda point: station_geo.find_nearby_stations(point, radius_km=25, limit=5)["success"], points)
+    if target in ("agent_tools", "agent_tools_uncached"):
+        tools = {name: getattr(database, name) for name in ("get_all_trains", "search_stations", "search_trains", "get_train_route")}
+        if target == "agent_tools":
+            # Wrapped the same way agent.py wraps its CACHED_TOOLS.
+            tools = {name: database.tool_results.wrap(name, function) for name, function in tools.items()}
+        database.preload_train_routes()
+        result = measure(lambda call: tools[call[0]](*call[1]) is not None, _agent_tool_calls(network, rng, iterations))
+        if target == "agent_tools":
+            result["hit_rate"] = round(database.tool_results.stats()["hit_rate"], 4)
+        return result
+    raise ValueError(f"unknown target {target}")
+
+
+def _seed_http_rows(network, reservations, rng):
+    stations = network["stations"]
+    routes = network["routes"]
+    trains = [(train_id, f"Express {train_id}") for train_id in routes]
+    rows = []
+    for i in range(reservations):
+        train_id = rng.choice(trains)[0]
+        route = routes[train_id]
+        src = rng.randrange(len(route) - 1)
+        dst = rng.randrange(src + 1, len(route))
+        rows.append((f"{i:08X}", train_id, rng.choice(network["journey_dates"]), route[src][0], route[dst][0], round(rng.uniform(150, 4000), 2)))
+    return stations, trains, rows
+
+
+def run_flask_reservations(db_path, data_dir, iterations, http_reservations, seed):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(data_dir, f"flask-{http_reservations}-{seed}.db")
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    from app import app, db  # backend/app.py, not the FastAPI package
+    from models import Station, Train, Reservation, BookingStatus, Frequency, TrainType
+
+    with app.app_context():
+        db.create_all()
+        if not db.session.query(Reservation.pnr).first():
+            stations, trains, rows = _seed_http_rows(synthetic.load_network(db_path), http_reservations, random.Random(seed))
+            db.session.execute(Station.__table__.insert(), [{"station_code": code, "station_name": name, "total_platforms": 4} for code, name in stations])
+            db.session.execute(Train.__table__.insert(), [{"train_id": train_id, "train_name": name, "train_type": TrainType.EXPRESS,
+                                                           "total_capacity": 256, "frequency": Frequency.DAILY} for train_id, name in trains])
+            db.session.execute(Reservation.__table__.insert(), [
+                {"pnr": pnr, "train_id": train_id, "journey_date": day, "source_station": src, "destination_station": dst,
+                 "booking_status": BookingStatus.CONFIRMED, "total_fare": fare} for pnr, train_id, day, src, dst, fare in rows])
+            db.session.commit()
+    client = app.test_client()
+    return measure(lambda _: client.get("/api/reservations").status_code == 200, [None] * iterations, warmup=2)
+
+
+def run_fastapi_trains(db_path, data_dir, iterations, seed):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(data_dir, f"fastapi-{seed}.db")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import Base, engine
+    from app.models import models as orm
+
+    Base.metadata.create_all(bind=engine, tables=[orm.Train.__table__])
+    with engine.begin() as connection:
+        if not connection.execute(orm.Train.__table__.select().limit(1)).first():
+            connection.execute(orm.Train.__table__.insert(), [
+                {"train_id": train_id, "train_name": f"Express {train_id}", "train_type": "express", "total_capacity": 256,
+                 "frequency": "daily"} for train_id in synthetic.load_network(db_path)["routes"]])
+    client = TestClient(app, raise_server_exceptions=False)
+    return measure(lambda _: client.get("/trains/").status_code == 200, [None] * iterations, warmup=5)
+
+
+def worker(args):
+    logging.disable(logging.CRITICAL)
+    try:
+        if args.worker == "flask_reservations":
+            result = run_flask_reservations(args.db, args.data_dir, args.http_iterations, args.http_reservations, args.seed)
+        elif args.worker == "fastapi_trains":
+            result = run_fastapi_trains(args.db, args.data_dir, args.http_iterations, args.seed)
+        else:
+            result = run_data_target(args.worker, args.db, args.iterations, args.seed)
+    except Exception as e:  # report and keep the rest of the suite running
+        result = {"error": f"{type(e).__name__}: {e}"}
+    with open(args.result_file, "w") as f:
+        json.dump(result, f)
+
+
+# --- driver -------------------------------------------------------------------------------
+
+def run_target(target, db_path, args):
+    fd, result_file = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    command = [sys.executable, os.path.abspath(__file__), "--worker", target, "--db", db_path, "--result-file", result_file,
+               "--data-dir", args.data_dir, "--iterations", str(args.iterations), "--http-iterations", str(args.http_iterations),
+               "--http-reservations", str(args.http_reservations), "--seed", str(args.seed)]
+    # sqlite_backend reads its settings at import, so they must be in place before the child starts.
+    env = dict(os.environ, DB_BACKEND="sqlite", SQLITE_PATH=db_path)
+    completed = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        with open(result_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"error": (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]}
+    finally:
+        os.remove(result_file)
+
+
+def print_table(results, baseline=None):
+    print(f"{'target':<22}{'iters':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>11}{'errors':>8}" + ("   p95 vs baseline" if baseline else ""))
+    for target, result in results.items():
+        if "error" in result:
+            print(f"{target:<22}  ERROR: {result['error']}")
+            continue
+        line = (f"{target:<22}{result['iterations']:>7}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+                f"{result['p99_ms']:>10.3f}{result['throughput_ops']:>11.1f}{result['errors']:>8}")
+        before = (baseline or {}).get(target, {})
+        if before.get("p95_ms"):
+            line += f"   {(result['p95_ms'] / before['p95_ms'] - 1) * 100:+7.1f}%"
+        print(line)
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for target, result in results.items():
+        before = baseline.get(target, {})
+        if "error" in result or not before.get("p95_ms"):
+            continue
+        change = result["p95_ms"] / before["p95_ms"] - 1
+        if change > threshold:
+            found.append((target, change))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="default")
+    parser.add_argument("--stations", type=int, help="override the scale's station count")
+    parser.add_argument("--trains", type=int, help="override the scale's train count")
+    parser.add_argument("--reservations", type=int, help="override the scale's reservation count")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated subset of: " + ", ".join(TARGETS))
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--http-iterations", type=int, default=30)
+    parser.add_argument("--http-reservations", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="write this run's results as the baseline JSON")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed p95 regression (0.15 = 15%%)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    scale = dict(synthetic.SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    db_path = synthetic.ensure_network(args.data_dir, scale["stations"], scale["trains"], scale["reservations"], seed=args.seed)
+    results = {}
+    for target in targets:
+        path = db_path
+        if target == "create_reservation":
+            # Bookings change the inventory; run them on a copy so the cached network stays pristine.
+            path = os.path.join(args.data_dir, "bookings.db")
+            with sqlite3.connect(db_path) as source, sqlite3.connect(path) as copy:
+                source.backup(copy)
+        print(f"running {target} ...", flush=True)
+        results[target] = run_target(target, path, args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print()
+    print_table(results, baseline)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "iterations": args.iterations,
+        "http_iterations": args.http_iterations,
+        "http_reservations": args.http_reservations,
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {path}")
+
+    if baseline:
+        found = regressions(results, baseline, args.threshold)
+        for target, change in found:
+            print(f"REGRESSION: {target} p95 {change * 100:+.1f}% (threshold {args.threshold * 100:.0f}%)")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
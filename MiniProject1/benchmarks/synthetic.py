@@ -0,0 +1,193 @@
+"""Seeded synthetic railway network for the benchmark suite.
+
+Stations are spread over a handful of corridors; every train runs a contiguous stretch of
+one corridor in either direction, so trains share stations and corridors cross each other
+the way real lines do. Each train runs on a few weekdays with StationSchedules times
+derived from its distances. Reservations and passengers are spread over the trains' segments
+and a window of journey dates. The same parameters always produce the same network.
+"""
+import os
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+import sqlite_backend
+
+SYLLABLES = ("ra", "ma", "pur", "na", "ga", "bad", "ko", "ta", "li", "chen", "war", "dha", "ban", "ja",
+             "se", "lam", "vi", "ja", "ya", "hal", "di", "mu", "kal", "an", "tir", "u", "pa", "sa", "ri", "ka")
+SUFFIXES = ("", "", "", " Junction", " Central", " Road", " Cantt", " City")
+COACH_TYPES = (("sleeper", 72), ("sleeper", 72), ("AC3", 64), ("AC2", 48))
+STATUSES = ("Confirmed",) * 8 + ("RAC", "Waitlisted")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+START_DATE = date(2026, 12, 1)
+# Stations are scattered over roughly the Indian mainland.
+LATITUDES = (8.0, 34.0)
+LONGITUDES = (68.0, 97.0)
+# Bump when the generated schema or data changes so cached networks are rebuilt.
+NETWORK_VERSION = 3
+
+SCALES = {
+    "smoke": {"stations": 300, "trains": 200, "reservations": 20_000},
+    "default": {"stations": 4_000, "trains": 3_000, "reservations": 2_000_000},
+    "large": {"stations": 8_000, "trains": 10_000, "reservations": 10_000_000},
+}
+
+
+def _base26(n, width):
+    letters = []
+    for _ in range(width):
+        n, r = divmod(n, 26)
+        letters.append(chr(65 + r))
+    return "".join(reversed(letters))
+
+
+def _clock(minutes):
+    return None if minutes is None else f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}:00"
+
+
+def station_rows(count, rng):
+    """Returns [(station_code, station_name)] with unique codes and pronounceable names."""
+    rows = []
+    for i in range(count):
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize() + rng.choice(SUFFIXES)
+        rows.append((name[:2].upper() + _base26(i, 3), name))
+    return rows
+
+
+def station_coordinates(count, seed):
+    """Returns [(latitude, longitude)] for `count` stations, from a generator of its own so the
+    rest of the network does not depend on it."""
+    rng = random.Random(seed)
+    return [(round(rng.uniform(*LATITUDES), 6), round(rng.uniform(*LONGITUDES), 6)) for _ in range(count)]
+
+
+def route_rows(stations, trains, rng, corridor_length=80, stops=(8, 40)):
+    """Returns {train_id: [(station_code, sequence_number, distance_from_source)]}."""
+    codes = [code for code, _ in stations]
+    corridors = [rng.sample(codes, min(corridor_length, len(codes))) for _ in range(max(1, len(codes) * 3 // corridor_length))]
+    routes = {}
+    for t in range(trains):
+        corridor = rng.choice(corridors)
+        length = min(rng.randint(*stops), len(corridor))
+        start = rng.randint(0, len(corridor) - length)
+        window = corridor[start:start + length]
+        if rng.random() < 0.5:
+            window.reverse()
+        distance = 0.0
+        route = []
+        for sequence, code in enumerate(window, start=1):
+            route.append((code, sequence, round(distance, 1)))
+            distance += rng.uniform(5, 45)
+        routes[f"{10000 + t}"] = route
+    return routes
+
+
+def seed_network(raw, stations=300, trains=200, reservations=20_000, days=30, seed=42, chunk=50_000):
+    """Creates the agent schema in `raw` and fills it with a synthetic network."""
+    rng = random.Random(seed)
+    raw.executescript(sqlite_backend.SCHEMA)
+    station_list = station_rows(stations, rng)
+    routes = route_rows(station_list, trains, rng)
+    train_ids = list(routes)
+    raw.executemany("INSERT INTO Stations (station_code, station_name, latitude, longitude) VALUES (?, ?, ?, ?)",
+                    [(code, name, lat, lon) for (code, name), (lat, lon) in zip(station_list, station_coordinates(stations, seed + 1))])
+    raw.executemany("INSERT INTO Trains VALUES (?, ?)",
+                    [(train_id, f"{station_list[t % stations][1].split()[0]} Express {train_id}") for t, train_id in enumerate(train_ids)])
+    # Each train runs its route on a few days of the week, leaving its origin at a random time.
+    schedules, station_times = [], []
+    for route_id, train_id in enumerate(train_ids, start=1):
+        origin_departure = rng.randrange(24 * 60)
+        for day in sorted(rng.sample(WEEKDAYS, rng.choice((3, 5, 7))), key=WEEKDAYS.index):
+            schedule_id = len(schedules) + 1
+            schedules.append((schedule_id, train_id, route_id, day))
+            route = routes[train_id]
+            minute = origin_departure
+            for i, (code, _, distance) in enumerate(route):
+                arrival = minute if i else None
+                if i:
+                    minute += 2  # halt
+                departure = minute if i < len(route) - 1 else None
+                station_times.append((schedule_id, code, _clock(arrival), _clock(departure)))
+                if departure is not None:
+                    # About 65 km/h between stops plus a few minutes for acceleration and braking.
+                    minute += 5 + int((route[i + 1][2] - distance) * 0.9)
+    raw.executemany("INSERT INTO TrainSchedules (schedule_id, train_id, route_id, day_of_operation) VALUES (?, ?, ?, ?)", schedules)
+    raw.executemany("INSERT INTO StationSchedules (schedule_id, station_code, arrival_time, departure_time) VALUES (?, ?, ?, ?)", station_times)
+    raw.executemany("INSERT INTO RouteStations VALUES (?, ?, ?, ?)",
+                    [(route_id, code, sequence, distance)
+                     for route_id, train_id in enumerate(train_ids, start=1) for code, sequence, distance in routes[train_id]])
+    coaches = [(f"{train_id}-{c + 1}", train_id, coach_type, capacity)
+               for train_id in train_ids for c, (coach_type, capacity) in enumerate(COACH_TYPES)]
+    raw.executemany("INSERT INTO Coaches VALUES (?, ?, ?, ?)", coaches)
+    journey_dates = [START_DATE + timedelta(days=d) for d in range(days)]
+    raw.executemany("INSERT INTO SeatInventory (train_id, coach_id, journey_date, total_seats, available_seats) VALUES (?, ?, ?, ?, ?)",
+                    [(train_id, coach_id, day, capacity, capacity) for coach_id, train_id, _, capacity in coaches for day in journey_dates])
+
+    booked_at = datetime(2026, 10, 1, 9, 0)
+    passenger_sizes = (1, 1, 1, 1, 1, 1, 2, 2, 2, 3)
+    for offset in range(0, reservations, chunk):
+        reservation_batch, passenger_batch = [], []
+        for i in range(offset, min(offset + chunk, reservations)):
+            train_id = rng.choice(train_ids)
+            route = routes[train_id]
+            src = rng.randrange(len(route) - 1)
+            dst = rng.randrange(src + 1, len(route))
+            pnr = f"{i:08X}"
+            reservation_batch.append((pnr, train_id, rng.choice(journey_dates), route[src][0], route[dst][0],
+                                      booked_at + timedelta(seconds=i), rng.choice(STATUSES)))
+            for p in range(rng.choice(passenger_sizes)):
+                age = rng.randint(2, 85)
+                passenger_batch.append((pnr, f"Passenger {i}-{p}", age, "Child" if age < 12 else "Senior" if age >= 60 else "Adult"))
+        raw.executemany("INSERT INTO Reservations VALUES (?, ?, ?, ?, ?, ?, ?)", reservation_batch)
+        raw.executemany("INSERT INTO Passengers (pnr, name, age, category) VALUES (?, ?, ?, ?)", passenger_batch)
+    raw.execute("CREATE TABLE BenchmarkMeta (key TEXT PRIMARY KEY, value TEXT)")
+    raw.executemany("INSERT INTO BenchmarkMeta VALUES (?, ?)",
+                    [("stations", stations), ("trains", trains), ("reservations", reservations), ("days", days), ("seed", seed)])
+    raw.commit()
+    return {"stations": station_list, "routes": routes, "journey_dates": journey_dates}
+
+
+def network_path(data_dir, stations, trains, reservations, days=30, seed=42):
+    return os.path.join(data_dir, f"network-v{NETWORK_VERSION}-{stations}-{trains}-{reservations}-{days}-{seed}.db")
+
+
+def ensure_network(data_dir, stations, trains, reservations, days=30, seed=42, log=print):
+    """Returns the path of a seeded database for these parameters, building it if missing."""
+    path = network_path(data_dir, stations, trains, reservations, days, seed)
+    if os.path.exists(path):
+        try:
+            with sqlite3.connect(path) as raw:
+                if raw.execute("SELECT COUNT(*) FROM BenchmarkMeta").fetchone()[0]:
+                    return path
+        except sqlite3.Error:
+            pass
+        os.remove(path)
+    os.makedirs(data_dir, exist_ok=True)
+    log(f"seeding {stations} stations, {trains} trains, {reservations} reservations into {path} ...")
+    start = time.perf_counter()
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    raw = sqlite3.connect(tmp)
+    raw.execute("PRAGMA journal_mode=OFF")
+    raw.execute("PRAGMA synchronous=OFF")
+    seed_network(raw, stations, trains, reservations, days, seed)
+    raw.close()
+    os.replace(tmp, path)
+    log(f"seeded in {time.perf_counter() - start:.1f}s ({os.path.getsize(path) / 2**20:.0f} MiB)")
+    return path
+
+
+def load_network(path):
+    """Reads back what the workload generators need: stations, routes and journey dates."""
+    with sqlite3.connect(path) as raw:
+        stations = raw.execute("SELECT station_code, station_name FROM Stations ORDER BY rowid").fetchall()
+        routes = {}
+        for train_id, code, sequence, distance in raw.execute(
+                "SELECT ts.train_id, rs.station_code, rs.sequence_number, rs.distance_from_source "
+                "FROM (SELECT DISTINCT train_id, route_id FROM TrainSchedules) ts JOIN RouteStations rs ON rs.route_id = ts.route_id "
+                "ORDER BY ts.train_id, rs.sequence_number"):
+            routes.setdefault(train_id, []).append((code, sequence, distance))
+        days = int(raw.execute("SELECT value FROM BenchmarkMeta WHERE key = 'days'").fetchone()[0])
+    return {"stations": stations, "routes": routes, "journey_dates": [START_DATE + timedelta(days=d) for d in range(days)]}
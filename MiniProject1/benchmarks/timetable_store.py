@@ -0,0 +1,91 @@
+"""Memory footprint and load time of the array-backed timetable store.
+
+Reads the timetable tables of a synthetic network (see synthetic.py) and reports:
+
+  rows              the fetched row tuples, as every schedule query used to hold them
+  store             TimetableStore.from_rows: interned ints and flat array columns
+  snapshot          TimetableStore.load: the same columns mapped from a snapshot file
+  search index      Timetable.from_store on top of either
+
+    python benchmarks/timetable_store.py --scale default
+"""
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from benchmarks import synthetic  # noqa: E402
+from timetable_store import TimetableStore  # noqa: E402
+from train_search import Timetable  # noqa: E402
+
+
+def fetch_rows(path):
+    with sqlite3.connect(path) as raw:
+        trains = dict(raw.execute("SELECT train_id, train_name FROM Trains"))
+        schedules = raw.execute("SELECT schedule_id, train_id, route_id, day_of_operation FROM TrainSchedules").fetchall()
+        route_stations = raw.execute("SELECT route_id, station_code, sequence_number, distance_from_source FROM RouteStations").fetchall()
+        station_times = raw.execute("SELECT schedule_id, station_code, arrival_time, departure_time FROM StationSchedules").fetchall()
+    return trains, schedules, route_stations, station_times
+
+
+def traced(build):
+    """Returns (result, seconds, bytes still allocated by it); timed and traced in separate runs
+    because tracemalloc slows allocation-heavy code several times over."""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="smoke")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "benchmarks", ".data"))
+    args = parser.parse_args()
+
+    size = synthetic.SCALES[args.scale]
+    path = synthetic.ensure_network(args.data_dir, size["stations"], size["trains"], size["reservations"])
+    rows, fetch_seconds, rows_bytes = traced(lambda: fetch_rows(path))
+    store, build_seconds, store_bytes = traced(lambda: TimetableStore.from_rows(*rows))
+    _, index_seconds, index_bytes = traced(lambda: Timetable.from_store(store))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "timetable.snap")
+        start = time.perf_counter()
+        store.save(snapshot)
+        save_seconds = time.perf_counter() - start
+        snapshot_size = os.path.getsize(snapshot)
+        mapped, load_seconds, mapped_bytes = traced(lambda: TimetableStore.load(snapshot))
+        _, mapped_index_seconds, _ = traced(lambda: Timetable.from_store(mapped))
+        assert bytes(mapped.time_departures) == bytes(store.time_departures)
+        del mapped
+        gc.collect()
+
+    stats = store.stats()
+    print(f"{stats['stations']} stations, {stats['routes']} routes, {stats['runs']} runs, {stats['stop_times']} stop times")
+    print(f"{'representation':28} {'time ms':>10} {'memory MiB':>11}")
+    print(f"{'fetched rows':28} {fetch_seconds * 1000:>10.1f} {rows_bytes / 2**20:>11.1f}")
+    print(f"{'store from rows':28} {build_seconds * 1000:>10.1f} {store_bytes / 2**20:>11.1f}")
+    print(f"{'  of which columns':28} {'':>10} {stats['column_bytes'] / 2**20:>11.1f}")
+    print(f"{'search index on store':28} {index_seconds * 1000:>10.1f} {index_bytes / 2**20:>11.1f}")
+    print(f"{'snapshot save':28} {save_seconds * 1000:>10.1f} {snapshot_size / 2**20:>11.1f} on disk")
+    print(f"{'snapshot load (mmap)':28} {load_seconds * 1000:>10.1f} {mapped_bytes / 2**20:>11.1f} heap")
+    print(f"{'search index on snapshot':28} {mapped_index_seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes free before the checkout timeout expires."""
+
+
+class PooledConnection:
+    """Proxy around a leased connection that hands it back to the pool on close()."""
+
+    def __init__(self, pool: "ConnectionPool", raw: Any):
+        self._pool = pool
+        self._raw = raw
+
+    @property
+    def raw(self):
+        """The underlying driver connection."""
+        if self._raw is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._raw
+
+    def is_connected(self) -> bool:
+        # The connection was health checked on checkout, so this does not ping the server again.
+        return self._raw is not None
+
+    def close(self):
+        """Returns the connection to the pool instead of closing it."""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """A fixed-size, thread-safe pool of database connections.
+
+    Connections are opened lazily up to `size`. A connection that has been idle for
+    longer than `health_check_interval` seconds is checked with `health_check` before
+    it is handed out, and replaced with a fresh one if the check fails.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5, checkout_timeout: float = 10.0,
+                 health_check: Optional[Callable[[Any], bool]] = None, health_check_interval: float = 5.0,
+                 name: str = "db"):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.name = name
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect
+        self._health_check = health_check or (lambda raw: raw.is_connected())
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw connection, time it was returned)
+        self._open_count = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "exhausted": 0,
+            "connections_opened": 0,
+            "connections_discarded": 0,
+            "health_checks": 0,
+            "checkout_time_total": 0.0,
+            "checkout_time_max": 0.0,
+        }
+
+    def _open(self):
+        raw = self._connect()
+        if raw is None:
+            raise ConnectionError(f"Pool '{self.name}' could not open a new connection")
+        with self._cond:
+            self._stats["connections_opened"] += 1
+        logger.info(f"Pool '{self.name}' opened connection ({self._open_count}/{self.size})")
+        return raw
+
+    def _discard(self, raw):
+        # The condition's lock is reentrant, so this is also safe from callers already holding it.
+        with self._cond:
+            self._stats["connections_discarded"] += 1
+        try:
+            raw.close()
+        except Exception as e:
+            logger.debug(f"Ignoring error while closing discarded connection: {e}")
+
+    def _is_healthy(self, raw, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        with self._cond:
+            self._stats["health_checks"] += 1
+        try:
+            return bool(self._health_check(raw))
+        except Exception as e:
+            logger.warning(f"Pool '{self.name}' health check failed: {e}")
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Checks out a connection, waiting up to `timeout` seconds for one to become free."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        raw = None
+        idle_since = None
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Pool '{self.name}' is closed")
+                if self._idle:
+                    # LIFO keeps the most recently used (warmest) connections in rotation.
+                    raw, idle_since = self._idle.pop()
+                    break
+                if self._open_count < self.size:
+                    self._open_count += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["exhausted"] += 1
+                    logger.error(f"Pool '{self.name}' exhausted: no connection free after {timeout:.1f}s")
+                    raise PoolExhaustedError(f"No connection available in pool '{self.name}' after {timeout:.1f}s")
+                if not waited:
+                    waited = True
+                    self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        try:
+            if raw is not None and not self._is_healthy(raw, idle_since):
+                logger.warning(f"Pool '{self.name}' replacing unhealthy connection")
+                self._discard(raw)
+                raw = None
+            if raw is None:
+                raw = self._open()
+        except Exception:
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_time_total"] += elapsed
+            self._stats["checkout_time_max"] = max(self._stats["checkout_time_max"], elapsed)
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        try:
+            if getattr(raw, "in_transaction", False):
+                raw.rollback()
+        except Exception as e:
+            logger.warning(f"Pool '{self.name}' dropping connection that failed to roll back: {e}")
+            self._discard(raw)
+            raw = None
+        with self._cond:
+            if raw is None or self._closed:
+                self._open_count -= 1
+                if raw is not None:
+                    self._discard(raw)
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager that checks out a connection and always returns it to the pool."""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the pool counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["size"] = self.size
+            snapshot["open"] = self._open_count
+            snapshot["idle"] = len(self._idle)
+            snapshot["in_use"] = self._open_count - len(self._idle)
+        checkouts = snapshot["checkouts"]
+        snapshot["checkout_time_avg"] = snapshot["checkout_time_total"] / checkouts if checkouts else 0.0
+        return snapshot
+
+    def close(self):
+        """Closes idle connections; connections still leased are closed when they are returned."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._open_count -= 1
+                self._discard(raw)
+            self._cond.notify_all()
+        logger.info(f"Pool '{self.name}' closed")
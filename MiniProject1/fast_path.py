@@ -0,0 +1,94 @@
+"""Chat turns answered without the model.
+
+A train button in the Streamlit app sends a bare train ID, and users often type just a station
+code or a YYYY-MM-DD date. Those inputs are unambiguous, so `handle()` fills the booking slots
+(train, source, destination, date) and calls the matching tool directly. It returns None for
+anything else, including cancellations, and the turn goes to the model as before.
+"""
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from logger import setup_logger
+from database import station_catalog, train_catalog, is_valid_segment
+from running_days import next_running_dates
+
+logger = setup_logger(__name__)
+
+DATE_PATTERN = re.compile(r"^\s*(\d{4}-\d{2}-\d{2})\s*\.?\s*$")
+TOKEN_PATTERN = re.compile(r"^\s*([A-Za-z0-9-]{2,20})\s*\.?\s*$")
+
+def _ask_for_next(booking: Dict[str, Any]) -> str:
+    if not booking.get("source"):
+        return "Which station will you board at? Give its name or code."
+    if not booking.get("destination"):
+        return "Which station are you travelling to? Give its name or code."
+    if not booking.get("journey_date"):
+        return "On which date do you want to travel (YYYY-MM-DD)?"
+    return "Please tell me the full name and age of each passenger."
+
+def _select_train(train_id: str, train_name: str, booking: Dict[str, Any], tools: Dict[str, Callable]) -> str:
+    booking.clear()
+    booking["train_id"] = train_id
+    route = tools["get_train_route"](train_id=train_id)
+    reply = f"Selected {train_name} ({train_id})."
+    if route:
+        reply += f" It runs from {route[0][1]} ({route[0][0]}) to {route[-1][1]} ({route[-1][0]}) with {len(route)} stops."
+    return f"{reply} {_ask_for_next(booking)}"
+
+def _select_station(station_code: str, station_name: str, booking: Dict[str, Any], tools: Dict[str, Callable]) -> str:
+    train_id = booking["train_id"]
+    route = tools["get_train_route"](train_id=train_id)
+    if route and station_code not in {stop[0] for stop in route}:
+        stops = ", ".join(f"{name} ({code})" for code, name, _ in route)
+        return f"{station_name} ({station_code}) is not a stop of train {train_id}. Its stops are: {stops}."
+    if not booking.get("source"):
+        booking["source"] = station_code
+        return f"Boarding at {station_name} ({station_code}). {_ask_for_next(booking)}"
+    if not is_valid_segment(train_id, booking["source"], station_code):
+        return (f"Train {train_id} does not reach {station_name} ({station_code}) after {booking['source']}. "
+                "Please choose a later stop on its route.")
+    booking["destination"] = station_code
+    return f"Travelling to {station_name} ({station_code}). {_ask_for_next(booking)}"
+
+def _select_date(text: str, booking: Dict[str, Any], tools: Dict[str, Callable], today) -> str:
+    try:
+        journey_date = datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        return f"{text} is not a valid date. Please use YYYY-MM-DD."
+    if journey_date < today:
+        return f"{text} is in the past. Which date do you want to travel on (YYYY-MM-DD)?"
+    availability = tools["get_next_available_appointment"](train_id=booking["train_id"], date=text)
+    running = next_running_dates(booking["train_id"], journey_date, 1)
+    if running is not None and (not running or running[0] != journey_date):
+        # The availability message already names the dates it does run.
+        return availability
+    booking["journey_date"] = text
+    return f"{availability} {_ask_for_next(booking)}"
+
+def handle(message: str, booking: Dict[str, Any], tools: Dict[str, Callable], today) -> Optional[str]:
+    """The reply to `message` if it is a structured input, updating `booking` in place; None otherwise.
+
+    `tools` maps tool names to callables (the agent's available_functions).
+    """
+    date_match = DATE_PATTERN.match(message)
+    if date_match:
+        if not booking.get("train_id") or not booking.get("destination"):
+            return None
+        logger.info(f"Fast path: journey date {date_match.group(1)}")
+        return _select_date(date_match.group(1), booking, tools, today)
+
+    token = TOKEN_PATTERN.match(message)
+    if not token:
+        return None
+    text = token.group(1)
+    # A station code only counts while a booking is waiting for one; otherwise "MAS" is just a word.
+    if booking.get("train_id") and not booking.get("destination"):
+        station = station_catalog.get(text)
+        if station:
+            logger.info(f"Fast path: station {station[0]}")
+            return _select_station(station[0], station[1], booking, tools)
+    train = train_catalog.get(text)
+    if train:
+        logger.info(f"Fast path: train {train[0]}")
+        return _select_train(train[0], train[1], booking, tools)
+    return None
@@ -0,0 +1,91 @@
+"""Running-day lookups for the agent.
+
+Loads every train's weekly schedule (TrainSchedules) and its special and cancelled date ranges
+(TrainRunExceptions) through database.py into the bitmask calendar shared with the Flask
+backend (backend/running_calendar.py). The calendar is rebuilt after RUNNING_CALENDAR_TTL
+seconds, at the first lookup of a new day, or after `invalidate_running_calendar()`.
+"""
+import os
+import threading
+import time
+from datetime import date
+from logger import setup_logger
+from database import create_db_connection, on_data_change, DB_ERRORS, RELOAD_RETRY_SECONDS
+
+logger = setup_logger(__name__)
+
+RUNNING_CALENDAR_TTL = float(os.getenv("RUNNING_CALENDAR_TTL", "3600"))
+
+_calendar = None
+_built_at = 0.0
+_built_on = None
+_calendar_lock = threading.Lock()
+
+def _load_running_rows():
+    """Reads (train_id, day_of_operation) schedule rows and (train_id, start, end, type) exception rows."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            return None
+        cursor = connection.cursor()
+        cursor.execute("SELECT train_id, day_of_operation FROM TrainSchedules")
+        schedules = cursor.fetchall()
+        try:
+            cursor.execute("SELECT train_id, start_date, end_date, exception_type FROM TrainRunExceptions")
+            exceptions = cursor.fetchall()
+        except DB_ERRORS as e:
+            # Databases created before the table existed simply have no exceptions.
+            logger.warning(f"Train run exceptions unavailable, using weekly schedules only: {e}")
+            exceptions = []
+        return schedules, exceptions
+    except DB_ERRORS as e:
+        logger.error(f"Error loading running days: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+def get_running_calendar():
+    """Returns the current RunningCalendar, rebuilding it when stale; None if it was never loaded."""
+    global _calendar, _built_at, _built_on
+    if _calendar is not None and time.monotonic() - _built_at < RUNNING_CALENDAR_TTL and _built_on == date.today():
+        return _calendar
+    with _calendar_lock:
+        if _calendar is None or time.monotonic() - _built_at >= RUNNING_CALENDAR_TTL or _built_on != date.today():
+            # Imported here so the agent still starts in a checkout without the backend package.
+            from backend.running_calendar import RunningCalendar
+            start = time.perf_counter()
+            rows = _load_running_rows()
+            if rows is None:
+                if _calendar is not None:
+                    logger.warning(f"Running-day reload failed, keeping the previous calendar for {RELOAD_RETRY_SECONDS:.0f} s")
+                    _built_at = time.monotonic() - RUNNING_CALENDAR_TTL + min(RELOAD_RETRY_SECONDS, RUNNING_CALENDAR_TTL)
+                    _built_on = date.today()
+                return _calendar
+            _calendar = RunningCalendar(*rows)
+            _built_at = time.monotonic()
+            _built_on = date.today()
+            logger.info(f"Running calendar built for {len(_calendar)} trains in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return _calendar
+
+def invalidate_running_calendar():
+    """Call after schedules or run exceptions change so the next lookup rebuilds the calendar."""
+    global _built_at
+    _built_at = 0.0
+
+on_data_change("routes", invalidate_running_calendar)
+
+def next_running_dates(train_id: str, after: date, count: int = 5):
+    """The next `count` dates on or after `after` that the train leaves its origin, or None if unknown."""
+    try:
+        calendar = get_running_calendar()
+    except ImportError as e:
+        logger.error(f"Running calendar unavailable: {e}")
+        return None
+    if calendar is None:
+        return None
+    return calendar.next_running_dates(str(train_id), after, count)
@@ -0,0 +1,194 @@
+import os
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# RAC berths per coach and waitlist length per train/date; beyond these a booking is refused.
+RAC_LIMIT_PER_COACH = int(os.getenv("RAC_LIMIT_PER_COACH", "10"))
+WAITLIST_LIMIT = int(os.getenv("WAITLIST_LIMIT", "100"))
+MAX_ALLOCATION_ATTEMPTS = 5
+
+CONFIRMED = "Confirmed"
+RAC = "RAC"
+WAITLISTED = "Waitlisted"
+
+# FOR UPDATE locks the train/date inventory rows until the booking transaction commits, so
+# concurrent bookings for the same train and date are applied one after another.
+INVENTORY_QUERY = (
+    "SELECT si.inventory_id, si.coach_id, si.available_seats, si.rac_count, si.waitlist_count "
+    "FROM SeatInventory si {coach_join}"
+    "WHERE si.train_id = %s AND si.journey_date = %s "
+    "ORDER BY si.inventory_id FOR UPDATE"
+)
+COACH_TYPE_JOIN = "JOIN Coaches c ON c.coach_id = si.coach_id AND c.coach_type = %s "
+
+# Each update re-checks the limit it enforces, so inventory can never go negative or past
+# its RAC/waitlist limits even if the row changed after it was read. NULL RAC/waitlist
+# counts are read as 0, as plan_party does.
+CONFIRM_UPDATE = "UPDATE SeatInventory SET available_seats = available_seats - %s WHERE inventory_id = %s AND available_seats >= %s"
+RAC_UPDATE = ("UPDATE SeatInventory SET rac_count = COALESCE(rac_count, 0) + %s "
+              "WHERE inventory_id = %s AND COALESCE(rac_count, 0) + %s <= %s")
+WAITLIST_UPDATE = ("UPDATE SeatInventory SET waitlist_count = COALESCE(waitlist_count, 0) + %s "
+                   "WHERE inventory_id = %s AND COALESCE(waitlist_count, 0) + %s <= %s")
+# Batch bookings write each touched inventory row once, as a compare-and-set against the values read.
+# NULL RAC/waitlist counts were read as 0, so they are compared the same way.
+BATCH_UPDATE = (
+    "UPDATE SeatInventory SET available_seats = %s, rac_count = %s, waitlist_count = %s "
+    "WHERE inventory_id = %s AND available_seats = %s AND COALESCE(rac_count, 0) = %s AND COALESCE(waitlist_count, 0) = %s"
+)
+
+
+class SeatAllocationError(Exception):
+    """Raised when a booking cannot be confirmed, put on RAC or waitlisted."""
+
+
+class SeatAllocationConflict(Exception):
+    """Raised when inventory changed under a batch allocation; roll back and retry the batch."""
+
+
+def plan_party(rows, seats):
+    """The seat policy: (status, row) for a party of `seats` on inventory rows, or (None, None).
+
+    Rows are (inventory_id, coach_id, available_seats, rac_count, waitlist_count) in inventory
+    order; NULL counts are read as 0. The Flask backend's booking routes use it as well.
+    """
+    # Confirmed: the coach with the most free seats that fits the whole party.
+    fits = [row for row in rows if row[2] >= seats]
+    if fits:
+        return CONFIRMED, max(fits, key=lambda r: r[2])
+    # RAC: the coach with the fewest RAC passengers that still has room for the party.
+    rac = [row for row in rows if (row[3] or 0) + seats <= RAC_LIMIT_PER_COACH]
+    if rac:
+        return RAC, min(rac, key=lambda r: r[3] or 0)
+    # Waitlist: one queue per train/date, kept on its first inventory row.
+    if rows and (rows[0][4] or 0) + seats <= WAITLIST_LIMIT:
+        return WAITLISTED, rows[0]
+    return None, None
+
+
+def _plan(rows, seats):
+    """Picks (status, row, update, params) for the party from the locked inventory rows."""
+    status, row = plan_party(rows, seats)
+    if status == CONFIRMED:
+        return status, row, CONFIRM_UPDATE, (seats, row[0], seats)
+    if status == RAC:
+        return status, row, RAC_UPDATE, (seats, row[0], seats, RAC_LIMIT_PER_COACH)
+    if status == WAITLISTED:
+        return status, row, WAITLIST_UPDATE, (seats, row[0], seats, WAITLIST_LIMIT)
+    return None, None, None, None
+
+
+def _inventory_query(train_id, journey_date, coach_type):
+    if coach_type:
+        return INVENTORY_QUERY.format(coach_join=COACH_TYPE_JOIN), (coach_type, train_id, journey_date)
+    return INVENTORY_QUERY.format(coach_join=""), (train_id, journey_date)
+
+
+def _allocation_steps(train_id, journey_date, seats, coach_type):
+    """The allocation as a generator, so sync and async cursors run the same logic.
+
+    Yields (sql, params, fetch) for each statement, with fetch "all", "one" or None, and is
+    sent (rowcount, fetched rows) once it has run. Returns the allocation dict.
+    """
+    if seats < 1:
+        raise SeatAllocationError("At least one passenger is required")
+    query, params = _inventory_query(train_id, journey_date, coach_type)
+
+    for attempt in range(MAX_ALLOCATION_ATTEMPTS):
+        _, rows = yield query, params, "all"
+        if not rows:
+            raise SeatAllocationError(f"Booking is not open for train {train_id} on {journey_date}")
+        status, row, update, update_params = _plan(rows, seats)
+        if status is None:
+            raise SeatAllocationError(f"No seats, RAC or waitlist places left on train {train_id} for {journey_date}")
+        rowcount, _ = yield update, update_params, None
+        if rowcount == 1:
+            allocation = {"status": status, "coach_id": row[1], "waitlist_position": None}
+            if status == WAITLISTED:
+                # Our update holds the row lock, so re-reading the counter gives this party's exact position.
+                _, counts = yield "SELECT waitlist_count FROM SeatInventory WHERE inventory_id = %s", (row[0],), "one"
+                allocation["waitlist_position"] = counts[0] - seats + 1
+            logger.info(f"Allocated {seats} seat(s) on train {train_id} for {journey_date}: {status} in coach {row[1]}")
+            return allocation
+        # Without a row lock (e.g. SQLite) another booking can win the row between our read and update.
+        logger.debug(f"Seat allocation attempt {attempt + 1} lost a race on inventory {row[0]}, retrying")
+    raise SeatAllocationError(f"Could not allocate seats on train {train_id} for {journey_date}, please retry")
+
+
+def allocate_seats(cursor, train_id, journey_date, seats, coach_type=None):
+    """Reserves `seats` berths for one party inside the caller's open transaction.
+
+    Returns a dict with the booking status ("Confirmed", "RAC" or "Waitlisted"), the
+    coach_id and, for waitlisted parties, their waitlist position. The caller commits or
+    rolls back together with the reservation rows.
+    """
+    steps = _allocation_steps(train_id, journey_date, seats, coach_type)
+    result = None
+    try:
+        while True:
+            sql, params, fetch = steps.send(result)
+            cursor.execute(sql, params)
+            fetched = cursor.fetchall() if fetch == "all" else cursor.fetchone() if fetch == "one" else None
+            result = cursor.rowcount, fetched
+    except StopIteration as done:
+        return done.value
+
+
+async def allocate_seats_async(cursor, train_id, journey_date, seats, coach_type=None):
+    """`allocate_seats` for async DB-API cursors (aiomysql) whose execute/fetch are awaitable."""
+    steps = _allocation_steps(train_id, journey_date, seats, coach_type)
+    result = None
+    try:
+        while True:
+            sql, params, fetch = steps.send(result)
+            await cursor.execute(sql, params)
+            fetched = await cursor.fetchall() if fetch == "all" else await cursor.fetchone() if fetch == "one" else None
+            result = cursor.rowcount, fetched
+    except StopIteration as done:
+        return done.value
+
+
+def allocate_batch(cursor, train_id, journey_date, party_sizes, coach_type=None):
+    """Allocates seats for several parties on one train/date inside the caller's open transaction.
+
+    Parties are served in order with the same policy as `allocate_seats`. Returns one entry
+    per party: an allocation dict, or a SeatAllocationError for parties that could not be
+    placed. Raises SeatAllocationConflict if another booking changed the inventory rows
+    between our read and our compare-and-set update; the caller should roll back and retry.
+    """
+    cursor.execute(*_inventory_query(train_id, journey_date, coach_type))
+    rows = cursor.fetchall()
+    if not rows:
+        return [SeatAllocationError(f"Booking is not open for train {train_id} on {journey_date}") for _ in party_sizes]
+
+    original = {row[0]: (row[2], row[3] or 0, row[4] or 0) for row in rows}
+    state = {inventory_id: list(counts) for inventory_id, counts in original.items()}
+    coaches = [(row[0], row[1]) for row in rows]
+    results = []
+    for seats in party_sizes:
+        if seats < 1:
+            results.append(SeatAllocationError("At least one passenger is required"))
+            continue
+        current = [(inventory_id, coach_id, *state[inventory_id]) for inventory_id, coach_id in coaches]
+        status, row = plan_party(current, seats)
+        if status is None:
+            results.append(SeatAllocationError(f"No seats, RAC or waitlist places left on train {train_id} for {journey_date}"))
+            continue
+        counts = state[row[0]]
+        allocation = {"status": status, "coach_id": row[1], "waitlist_position": None}
+        if status == CONFIRMED:
+            counts[0] -= seats
+        elif status == RAC:
+            counts[1] += seats
+        else:
+            allocation["waitlist_position"] = counts[2] + 1
+            counts[2] += seats
+        results.append(allocation)
+
+    updates = [tuple(state[inventory_id]) + (inventory_id,) + original[inventory_id]
+               for inventory_id in state if tuple(state[inventory_id]) != original[inventory_id]]
+    if updates:
+        cursor.executemany(BATCH_UPDATE, updates)
+        if cursor.rowcount != len(updates):
+            raise SeatAllocationConflict(f"Seat inventory for train {train_id} on {journey_date} changed during allocation")
+    return results
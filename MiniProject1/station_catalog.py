@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+from fuzzy_match import FuzzyIndex
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Substrings up to this length are indexed directly; longer queries intersect their n-grams.
+GRAM_SIZE = 3
+
+
+def _grams(text: str):
+    """Yields every distinct substring of `text` with length 1..GRAM_SIZE."""
+    seen = set()
+    for n in range(1, GRAM_SIZE + 1):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram not in seen:
+                seen.add(gram)
+                yield gram
+
+
+class _StationIndex:
+    """Immutable snapshot of the station table plus its n-gram postings."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str]]):
+        self.rows = [(code, name) for code, name in rows]
+        self.codes = [(code or "").lower() for code, _ in self.rows]
+        self.names = [(name or "").lower() for _, name in self.rows]
+        self.by_code = {code: i for i, code in enumerate(self.codes)}
+        postings = {}
+        for i in range(len(self.rows)):
+            for text in (self.codes[i], self.names[i]):
+                for gram in _grams(text):
+                    postings.setdefault(gram, set()).add(i)
+        # Frozen sets are cheaper to intersect and make the snapshot safe to share across threads.
+        self.postings = {gram: frozenset(ids) for gram, ids in postings.items()}
+        self._fuzzy = None
+
+    @property
+    def fuzzy(self) -> FuzzyIndex:
+        """Trigram index for typo-tolerant suggestions, built on the first miss of this snapshot."""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyIndex((code, name, (code, name)) for code, name in self.rows)
+        return self._fuzzy
+
+    def candidates(self, q: str):
+        if len(q) <= GRAM_SIZE:
+            return self.postings.get(q, frozenset())
+        grams = sorted({q[i:i + GRAM_SIZE] for i in range(len(q) - GRAM_SIZE + 1)},
+                       key=lambda g: len(self.postings.get(g, ())))
+        result = self.postings.get(grams[0], frozenset())
+        for gram in grams[1:]:
+            if not result:
+                break
+            result = result & self.postings.get(gram, frozenset())
+        # Every n-gram matching does not guarantee a contiguous match, so verify.
+        return [i for i in result if q in self.codes[i] or q in self.names[i]]
+
+    def rank(self, i: int, q: str):
+        code, name = self.codes[i], self.names[i]
+        if code == q:
+            tier = 0
+        elif name == q:
+            tier = 1
+        elif code.startswith(q):
+            tier = 2
+        elif name.startswith(q):
+            tier = 3
+        else:
+            tier = 4
+        return (tier, name, code)
+
+
+class StationCatalog:
+    """Process-local copy of the Stations table with a substring index.
+
+    `search()` answers the same questions as `station_name LIKE '%q%' OR station_code LIKE '%q%'`
+    (case-insensitive) without a database round trip; `suggest()` ranks near misses such as
+    misspelled names. The catalog reloads itself through `loader` once `ttl` seconds have
+    passed or after `invalidate()` is called. Any (code, name) table works, e.g. trains. After
+    a failed reload the previous snapshot is kept for `retry` seconds before the next attempt.
+    """
+
+    def __init__(self, loader: Callable[[], Optional[List[Tuple[str, str]]]], ttl: float = 300.0, kind: str = "station",
+                 retry: float = 30.0):
+        self._loader = loader
+        self.ttl = ttl
+        self.kind = kind
+        self.retry = retry
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Forces a reload on the next lookup, e.g. after stations were added or renamed."""
+        self._loaded_at = 0.0
+
+    def needs_reload(self) -> bool:
+        return self._index is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def load(self, rows: Iterable[Tuple[str, str]]):
+        """Replaces the snapshot with `rows`; lets async callers fetch the rows themselves."""
+        start = time.perf_counter()
+        index = _StationIndex(rows)
+        self._index = index
+        self._loaded_at = time.monotonic()
+        logger.info(f"{self.kind.capitalize()} catalog loaded {len(index.rows)} {self.kind}s in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def reload_failed(self):
+        """Records a failed reload so lookups keep the previous snapshot for `retry` seconds instead of retrying each time."""
+        if self._index is not None:
+            logger.warning(f"{self.kind.capitalize()} catalog reload failed, serving previous snapshot for {self.retry:.0f} s")
+            self._loaded_at = time.monotonic() - self.ttl + min(self.retry, self.ttl)
+
+    def _current(self, reload: bool = True) -> Optional[_StationIndex]:
+        if not reload or not self.needs_reload():
+            return self._index
+        with self._lock:
+            if not self.needs_reload():
+                return self._index
+            rows = self._loader()
+            if rows is None:
+                self.reload_failed()
+                return self._index
+            self.load(rows)
+            return self._index
+
+    def is_loaded(self) -> bool:
+        return self._current() is not None
+
+    def search(self, query, reload: bool = True) -> Optional[List[Tuple[str, str]]]:
+        """Returns matching (station_code, station_name) tuples, exact code matches first.
+
+        Returns None if the catalog could not be loaded so callers can fall back to SQL.
+        With reload=False the current snapshot is searched as is, without calling the loader.
+        """
+        index = self._current(reload)
+        if index is None:
+            return None
+        q = str(query).lower()
+        if not q:
+            return list(index.rows)
+        matches = sorted(index.candidates(q), key=lambda i: index.rank(i, q))
+        return [index.rows[i] for i in matches]
+
+    def get(self, station_code: str) -> Optional[Tuple[str, str]]:
+        """Returns the (station_code, station_name) tuple for an exact code, or None."""
+        index = self._current()
+        if index is None or station_code is None:
+            return None
+        i = index.by_code.get(str(station_code).lower())
+        return index.rows[i] if i is not None else None
+
+    def suggest(self, query, limit: int = 5, min_score: float = 0.5, reload: bool = True) -> Optional[List[Tuple[str, str, float]]]:
+        """Returns up to `limit` (code, name, score) tuples for a possibly misspelled query, best first.
+
+        Scores run from 0 to 1 (1.0 is an exact word match). Returns None if the catalog
+        could not be loaded.
+        """
+        index = self._current(reload)
+        if index is None:
+            return None
+        return index.fuzzy.search(query, limit=limit, min_score=min_score)
@@ -1,7 +1,7 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agent import receive_message_from_caller
+from agent import stream_message_from_caller
 from langchain_core.messages import HumanMessage, AIMessage
 from datetime import datetime
 import utils
@@ -28,6 +28,10 @@ if 'conversation' not in st.session_state:
 if 'appointments' not in st.session_state:
     st.session_state.appointments = []
 
+# Train, stations and date picked so far, filled by the agent's fast path
+if 'booking' not in st.session_state:
+    st.session_state.booking = {}
+
 # Add a new session state variable to store the button click
 if 'button_input' not in st.session_state:
     st.session_state.button_input = None
@@ -50,7 +54,8 @@ with col1:
         if isinstance(message, HumanMessage):
             with st.chat_message("user"):
                 st.write(message.content)
-        elif isinstance(message, AIMessage):
+        elif isinstance(message, AIMessage) and message.content:
+            # Messages that only carry tool calls have no text to show.
             with st.chat_message("assistant"):
                 # Check if the message contains a list of train options
                 train_options_match = re.search(r"I found a train matching your search:.*?\n(.*?)Please select a train by its Train ID or number", message.content, re.DOTALL)
@@ -110,27 +115,51 @@ with col1:
         st.session_state.button_input = None # Clear the button input after using it
     
     if user_input:
+        with st.chat_message("user"):
+            st.write(user_input)
         try:
-            # Add user message to conversation
-            st.session_state.conversation.append(HumanMessage(content=user_input))
-            
-            # Get AI response
+            # Show the reply as it is generated; the agent adds the user message to the conversation it returns
             current_time = get_current_time()
-            response = receive_message_from_caller(user_input, st.session_state.conversation, current_time)
+            response = {}
+            with st.chat_message("assistant"):
+                tool_status = st.empty()
+                reply_area = st.empty()
+                reply = ""
+                new_paragraph = False
+                for event in stream_message_from_caller(user_input, st.session_state.conversation, current_time,
+                                                        st.session_state.booking):
+                    if event["type"] in ("token", "message"):
+                        # Text after a tool call or a whole message is a new reply, not a continuation.
+                        if reply and (new_paragraph or event["type"] == "message"):
+                            reply += "\n\n"
+                        new_paragraph = event["type"] == "message"
+                        reply += event["text"]
+                        reply_area.markdown(reply + "▌")
+                    elif event["type"] == "tool":
+                        new_paragraph = True
+                        if event["status"] == "running":
+                            tool_status.caption(f"Running {event['name']}...")
+                        else:
+                            tool_status.empty()
+                    elif event["type"] == "done":
+                        response = event
             
             if 'messages' in response:
                 st.session_state.conversation = response['messages']
+                st.session_state.booking = response.get('booking', st.session_state.booking)
             else:
                 logger.error("Agent did not return 'messages' key in output")
-                st.session_state.conversation.append(
+                st.session_state.conversation += [
+                    HumanMessage(content=user_input),
                     AIMessage(content="I'm sorry, I encountered an error. Please try again.")
-                )
+                ]
         except Exception as e:
             logger.exception(f"Error processing chat message: {str(e)}")
             st.error(f"Error: {str(e)}")
-            st.session_state.conversation.append(
+            st.session_state.conversation += [
+                HumanMessage(content=user_input),
                 AIMessage(content="I'm sorry, I encountered an error. Please try again.")
-            )
+            ]
         
         # Rerun to update the chat
         st.rerun()
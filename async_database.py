@@ -0,0 +1,214 @@
+"""Async variant of the database.py data-access functions for the FastAPI app and async agents.
+
+Connections come from an aiomysql pool, so many concurrent chat sessions share a few
+connections without holding a thread each. The station and train catalogs, route cache and
+availability cache are the same process-local objects database.py uses; they are
+refreshed here with awaited queries instead of blocking ones. With DB_BACKEND=sqlite the
+calls run the database.py functions in a worker thread instead.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+import aiomysql
+from dotenv import load_dotenv
+from logger import setup_logger
+import database
+from database import (
+    DB_BACKEND, ROUTE_QUERY, VALIDATE_BOOKING_QUERY, RESERVATION_INSERT, PASSENGER_INSERT,
+    station_catalog, train_catalog, route_cache, availability_cache,
+    suggest_matches, _passenger_records, _booking_summary,
+)
+from route_cache import TrainRoute, group_route_rows
+from seat_allocation import allocate_seats_async, SeatAllocationError
+
+logger = setup_logger(__name__)
+
+load_dotenv()
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool():
+    """Returns the shared aiomysql pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                host, _, port = os.getenv("MYSQL_HOST", "localhost").partition(":")
+                _pool = await aiomysql.create_pool(
+                    host=host,
+                    port=int(port or 3306),
+                    db=os.getenv("MYSQL_DATABASE"),
+                    user=os.getenv("MYSQL_USER"),
+                    password=os.getenv("MYSQL_PASSWORD"),
+                    minsize=1,
+                    maxsize=int(os.getenv("MYSQL_POOL_SIZE", "5")),
+                    pool_recycle=int(os.getenv("MYSQL_POOL_RECYCLE", "3600")),
+                    autocommit=False
+                )
+                logger.info(f"Async MySQL pool created with maxsize {_pool.maxsize}")
+    return _pool
+
+
+async def close_async_pool():
+    """Closes the pool; call from the application's shutdown hook."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+        logger.info("Async MySQL pool closed")
+
+
+def async_pool_stats():
+    """Returns the pool's size and free connections, or None before first use."""
+    if _pool is None:
+        return None
+    return {"size": _pool.size, "free": _pool.freesize, "maxsize": _pool.maxsize}
+
+
+async def _fetchall(query, params=()):
+    pool = await get_async_pool()
+    async with pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+        # Release without an open read transaction so the next lease starts clean.
+        await connection.rollback()
+        return rows
+
+
+async def get_all_trains():
+    """Retrieves all train IDs and names from the database."""
+    if DB_BACKEND == "sqlite":
+        return await asyncio.to_thread(database.get_all_trains)
+    try:
+        trains = await _fetchall("SELECT train_id, train_name FROM Trains")
+        logger.info(f"Retrieved {len(trains)} trains")
+        return list(trains)
+    except aiomysql.Error as e:
+        logger.error(f"Error retrieving trains: {e}")
+        return []
+
+
+async def search_stations(query):
+    """Searches for stations based on name or code."""
+    if DB_BACKEND == "sqlite":
+        return await asyncio.to_thread(database.search_stations, query)
+    if station_catalog.needs_reload():
+        try:
+            station_catalog.load(await _fetchall("SELECT station_code, station_name FROM Stations"))
+        except aiomysql.Error as e:
+            logger.error(f"Error loading station catalog: {e}")
+            station_catalog.reload_failed()
+    # reload=False: after a failed load the catalog must not retry with a blocking query on the event loop.
+    stations = station_catalog.search(query, reload=False)
+    if stations is None:
+        return await asyncio.to_thread(database._search_stations_sql, query)
+    if not stations:
+        stations = suggest_matches(station_catalog, query, reload=False)
+    logger.info(f"Found {len(stations)} matching stations for query: {query}")
+    return stations
+
+
+async def search_trains(query):
+    """Searches for trains by name or ID, falling back to close spellings."""
+    if DB_BACKEND == "sqlite":
+        return await asyncio.to_thread(database.search_trains, query)
+    if train_catalog.needs_reload():
+        try:
+            train_catalog.load(await _fetchall("SELECT train_id, train_name FROM Trains"))
+        except aiomysql.Error as e:
+            logger.error(f"Error loading train catalog: {e}")
+            train_catalog.reload_failed()
+    trains = train_catalog.search(query, reload=False)
+    if trains is None:
+        return []
+    if not trains:
+        trains = suggest_matches(train_catalog, query, reload=False)
+    logger.info(f"Found {len(trains)} matching trains for query: {query}")
+    return trains
+
+
+async def _get_route(train_id):
+    route = route_cache.peek(train_id)
+    if route is not None:
+        return route
+    if DB_BACKEND == "sqlite":
+        route = await asyncio.to_thread(database._load_train_route, train_id)
+    else:
+        try:
+            rows = await _fetchall(ROUTE_QUERY.format(where="WHERE train_id = %s"), (train_id,))
+        except aiomysql.Error as e:
+            logger.error(f"Error retrieving train route: {e}")
+            return None
+        route = group_route_rows(rows).get(train_id) or TrainRoute(train_id, None, [])
+    if route is not None:
+        route_cache.put(train_id, route)
+    return route
+
+
+async def get_train_route(train_id):
+    """Retrieves the route for a specific train, including all stops."""
+    route = await _get_route(train_id)
+    if not route:
+        logger.warning(f"No route found for train_id: {train_id}")
+        return []
+    return route.stops()
+
+
+async def create_reservation(train_id: str, journey_date: str, source_station_code: str, destination_station_code: str, passengers: list, coach_type: str = None):
+    """Creates a new reservation and returns the same result dict as database.create_reservation."""
+    if DB_BACKEND == "sqlite":
+        return await asyncio.to_thread(database.create_reservation, train_id, journey_date, source_station_code,
+                                       destination_station_code, passengers, coach_type)
+    try:
+        journey = datetime.strptime(str(journey_date), '%Y-%m-%d').date()
+    except ValueError:
+        return {"success": False, "error": f"Invalid journey date: {journey_date}. Use YYYY-MM-DD."}
+    route = await _get_route(train_id)
+    if route and not route.is_valid_segment(source_station_code, destination_station_code):
+        return {"success": False, "error": f"{source_station_code} to {destination_station_code} is not a valid segment of train {train_id}'s route"}
+
+    pool = await get_async_pool()
+    async with pool.acquire() as connection:
+        try:
+            async with connection.cursor() as cursor:
+                pnr = str(uuid.uuid4())[:8].upper()
+                await cursor.execute(VALIDATE_BOOKING_QUERY, (train_id, source_station_code, destination_station_code))
+                train_name, source_station_name, destination_station_name = await cursor.fetchone()
+                if train_name is None:
+                    error = f"Invalid Train ID: {train_id}"
+                elif source_station_name is None:
+                    error = f"Invalid Source Station Code: {source_station_code}"
+                elif destination_station_name is None:
+                    error = f"Invalid Destination Station Code: {destination_station_code}"
+                else:
+                    error = None
+                if error:
+                    await connection.rollback()
+                    return {"success": False, "error": error}
+
+                try:
+                    allocation = await allocate_seats_async(cursor, train_id, journey, len(passengers), coach_type)
+                except SeatAllocationError as e:
+                    await connection.rollback()
+                    return {"success": False, "error": str(e)}
+                booking_time = datetime.now().replace(microsecond=0)
+                await cursor.execute(RESERVATION_INSERT, (pnr, train_id, journey, source_station_code, destination_station_code, booking_time, allocation["status"]))
+                passenger_records = _passenger_records(pnr, passengers)
+                if passenger_records:
+                    await cursor.executemany(PASSENGER_INSERT, passenger_records)
+            await connection.commit()
+        except aiomysql.Error as e:
+            await connection.rollback()
+            logger.error(f"Error creating reservation: {e}")
+            return {"success": False, "error": str(e)}
+
+    availability_cache.invalidate(train_id)
+    logger.info(f"Reservation created successfully with PNR: {pnr}")
+    booking_summary = _booking_summary(pnr, train_id, train_name, journey, source_station_code, source_station_name,
+                                       destination_station_code, destination_station_name, booking_time, allocation, passenger_records)
+    return {"success": True, "booking_details": booking_summary}
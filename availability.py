@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def build_availability(rows, start_date: date, end_date: date) -> Dict[str, Dict[str, Any]]:
+    """Turns AVAILABILITY_QUERY rows into {journey_date: {"classes": {...}, "quotas": {...}}}.
+
+    Every date in the range gets an entry, so a missing date means no inventory was opened.
+    """
+    result = {}
+    day = start_date
+    while day <= end_date:
+        result[day.strftime('%Y-%m-%d')] = {"classes": {}, "quotas": {}}
+        day += timedelta(days=1)
+    for kind, journey_date, name, total, available, rac, waitlist in rows:
+        key = journey_date.strftime('%Y-%m-%d') if hasattr(journey_date, "strftime") else str(journey_date)
+        entry = result.setdefault(key, {"classes": {}, "quotas": {}})
+        if kind == "class":
+            entry["classes"][name] = {
+                "total": int(total or 0),
+                "available": int(available or 0),
+                "rac": int(rac or 0),
+                "waitlist": int(waitlist or 0),
+            }
+        else:
+            entry["quotas"][name] = int(total or 0)
+    return result
+
+
+class AvailabilityCache:
+    """Short-lived cache of availability results keyed by (train_id, start_date, end_date).
+
+    Entries live for `ttl` seconds and at most `max_trains` trains are kept (least recently
+    used first out). The booking path calls `invalidate(train_id)` after every change to a
+    train's inventory so the agent never shows seats that were just sold. Loads run outside
+    the lock, so a load that an invalidation overtook is returned to its caller but not stored.
+    """
+
+    def __init__(self, loader: Callable[[str, date, date], Optional[Dict[str, Any]]], ttl: float = 30.0, max_trains: int = 1024):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_trains = max_trains
+        self._trains = OrderedDict()  # train_id -> {(start, end): (result, expires_at)}
+        self._generations = {}  # train_id -> number of invalidate(train_id) calls
+        self._epoch = 0  # number of invalidate() calls for every train
+        self._lock = threading.Lock()
+
+    def _generation(self, train_id):
+        return self._epoch, self._generations.get(train_id, 0)
+
+    def get(self, train_id, start_date: date, end_date: date) -> Optional[Dict[str, Any]]:
+        key = (start_date, end_date)
+        now = time.monotonic()
+        with self._lock:
+            ranges = self._trains.get(train_id)
+            if ranges is not None:
+                self._trains.move_to_end(train_id)
+                entry = ranges.get(key)
+                if entry is not None and entry[1] > now:
+                    return entry[0]
+            generation = self._generation(train_id)
+        result = self._loader(train_id, start_date, end_date)
+        if result is None:
+            return None
+        with self._lock:
+            if self._generation(train_id) != generation:
+                # The inventory changed while loading; the rows read may predate the change.
+                return result
+            self._trains.setdefault(train_id, {})[key] = (result, now + self.ttl)
+            self._trains.move_to_end(train_id)
+            while len(self._trains) > self.max_trains:
+                self._trains.popitem(last=False)
+        return result
+
+    def invalidate(self, train_id=None):
+        """Drops cached availability for one train, or for every train when `train_id` is None."""
+        with self._lock:
+            if train_id is None:
+                self._trains.clear()
+                self._generations.clear()
+                self._epoch += 1
+            else:
+                self._trains.pop(train_id, None)
+                self._generations[train_id] = self._generations.get(train_id, 0) + 1
@@ -0,0 +1,133 @@
+"""Bounded prompts for the booking agent.
+
+The model sees the system prompt, a structured summary of the booking slots gathered so far,
+and only the most recent CONTEXT_WINDOW_TURNS turns of the conversation (a turn is a user
+message with everything the agent did to answer it). Tool results are clipped to
+CONTEXT_TOOL_RESULT_TOKENS, and older turns are dropped until the prompt fits
+CONTEXT_TOKEN_BUDGET, so a long conversation costs about as much per call as a short one.
+The full history is still kept (and shown) by the caller; only what is sent is bounded.
+"""
+import json
+import os
+from typing import Any, Dict, List
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CONTEXT_WINDOW_TURNS = int(os.getenv("CONTEXT_WINDOW_TURNS", "6"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+CONTEXT_TOOL_RESULT_TOKENS = int(os.getenv("CONTEXT_TOOL_RESULT_TOKENS", "600"))
+# Roughly four characters per token for English text and codes; only used for budgeting.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+EARLIER_REQUESTS = 3
+EARLIER_REQUEST_CHARS = 160
+
+# Tool arguments that fill a booking slot, by tool.
+SLOT_ARGUMENTS = {
+    "get_train_route": {"train_id": "train_id"},
+    "get_next_available_appointment": {"train_id": "train_id", "date": "journey_date"},
+    "book_appointment": {"train_id": "train_id", "source": "source", "destination": "destination",
+                         "journey_date": "journey_date", "passengers": "passengers", "coach_type": "coach_type"},
+}
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def message_tokens(message) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(call["name"] + json.dumps(call.get("args") or {}, default=str))
+    return tokens
+
+def prompt_tokens(messages: List[Any]) -> int:
+    """Estimated tokens of a list of messages as sent to the model (tool schemas not included)."""
+    return sum(message_tokens(message) for message in messages)
+
+def remember_slots(booking: Dict[str, Any], call: Dict[str, Any]):
+    """Records the booking slots a tool call's arguments reveal, e.g. the train the model looked up."""
+    arguments = call.get("args") or {}
+    slots = {slot: arguments[name] for name, slot in SLOT_ARGUMENTS.get(call["name"], {}).items() if arguments.get(name)}
+    if slots.get("train_id") and slots["train_id"] != booking.get("train_id"):
+        # A different train starts over, the same way the fast path does.
+        booking.clear()
+    booking.update(slots)
+
+def split_turns(messages: List[Any]) -> List[List[Any]]:
+    """Groups messages into turns, each starting at a HumanMessage, so tool calls stay with their results."""
+    turns = []
+    for message in messages:
+        if not isinstance(message, (HumanMessage, AIMessage, ToolMessage)):
+            logger.warning(f"Unexpected message type in history: {type(message)}")
+            continue
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def _clip(message, max_tokens: int):
+    if not isinstance(message, ToolMessage) or estimate_tokens(message.content) <= max_tokens:
+        return message
+    keep = max_tokens * CHARS_PER_TOKEN
+    content = f"{message.content[:keep]}\n... ({len(message.content) - keep} more characters not shown)"
+    return message.model_copy(update={"content": content})
+
+def _describe_passengers(passengers) -> str:
+    if not isinstance(passengers, list):
+        return str(passengers)
+    return ", ".join(f"{p.get('name', '?')} ({p.get('age', '?')})" if isinstance(p, dict) else str(p) for p in passengers)
+
+def summarize(booking: Dict[str, Any], dropped: List[List[Any]]) -> str:
+    """The structured stand-in for turns that no longer fit: booking slots and the user's last requests."""
+    lines = ["Earlier conversation (older turns are not shown):"]
+    slots = [f"train_id={booking['train_id']}" if booking.get("train_id") else None,
+             f"source={booking['source']}" if booking.get("source") else None,
+             f"destination={booking['destination']}" if booking.get("destination") else None,
+             f"journey_date={booking['journey_date']}" if booking.get("journey_date") else None,
+             f"coach_type={booking['coach_type']}" if booking.get("coach_type") else None,
+             f"passengers={_describe_passengers(booking['passengers'])}" if booking.get("passengers") else None]
+    slots = [slot for slot in slots if slot]
+    lines.append(f"- Booking so far: {', '.join(slots)}" if slots else "- Booking so far: nothing confirmed yet")
+    requests = [turn[0].content for turn in dropped if isinstance(turn[0], HumanMessage)][-EARLIER_REQUESTS:]
+    for request in requests:
+        request = " ".join(str(request).split())
+        if len(request) > EARLIER_REQUEST_CHARS:
+            request = request[:EARLIER_REQUEST_CHARS] + "..."
+        lines.append(f"- The user said: {request}")
+    return "\n".join(lines)
+
+def build_messages(system_prompt: str, messages: List[Any], booking: Dict[str, Any],
+                   window: int = None, budget: int = None, tool_result_tokens: int = None) -> List[Any]:
+    """The messages to send for one model call: system prompt (plus summary) and the newest turns within budget.
+
+    The newest turn is always sent. If it alone does not fit, its tool results are clipped
+    further so they share what the budget leaves.
+    """
+    window = CONTEXT_WINDOW_TURNS if window is None else window
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    tool_result_tokens = CONTEXT_TOOL_RESULT_TOKENS if tool_result_tokens is None else tool_result_tokens
+
+    turns = [[_clip(message, tool_result_tokens) for message in turn] for turn in split_turns(messages)]
+    kept = turns[-max(1, window):]
+    dropped = turns[:len(turns) - len(kept)]
+
+    def assemble():
+        prompt = system_prompt
+        if dropped or booking:
+            prompt += "\n\n" + summarize(booking, dropped)
+        return [SystemMessage(content=prompt)] + [message for turn in kept for message in turn]
+
+    formatted = assemble()
+    while len(kept) > 1 and prompt_tokens(formatted) > budget:
+        dropped.append(kept.pop(0))
+        formatted = assemble()
+    excess = prompt_tokens(formatted) - budget
+    tool_results = [message for message in formatted if isinstance(message, ToolMessage)]
+    if excess > 0 and tool_results:
+        share = max(tool_result_tokens // 10, (sum(estimate_tokens(m.content) for m in tool_results) - excess) // len(tool_results))
+        formatted = [_clip(message, share) for message in formatted]
+    logger.info(f"Prompt ~{prompt_tokens(formatted)} tokens: {len(kept)} of {len(turns)} turns, "
+                f"{len(dropped)} summarized")
+    return formatted
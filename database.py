@@ -1,29 +1,194 @@
 import os
+import threading
+import time
+import uuid
+from datetime import datetime
+import sqlite3
 import mysql.connector
 from dotenv import load_dotenv
 from logger import setup_logger
+from db_pool import ConnectionPool, PoolExhaustedError
+import sqlite_backend
+from station_catalog import StationCatalog
+from route_cache import RouteCache, TrainRoute, group_route_rows
+from tool_cache import ToolResultCache
+from seat_allocation import allocate_seats, allocate_batch, SeatAllocationError, SeatAllocationConflict, MAX_ALLOCATION_ATTEMPTS
+from availability import AvailabilityCache, build_availability
 
 logger = setup_logger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
+# "mysql" (default) or "sqlite" for local benchmarking and single-node deployments.
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").strip().lower()
+if DB_BACKEND not in ("mysql", "sqlite"):
+    raise ValueError(f"Unsupported DB_BACKEND: {DB_BACKEND}")
+
+# Driver errors the data-access functions handle, whichever backend is active.
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _open_mysql_connection():
+    """Opens a new raw MySQL connection from the environment settings."""
+    return mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST"),
+        database=os.getenv("MYSQL_DATABASE"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD")
+    )
+
+def get_pool():
+    """Returns the shared connection pool for DB_BACKEND, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if DB_BACKEND == "sqlite":
+                    _pool = ConnectionPool(
+                        sqlite_backend.connect,
+                        size=int(os.getenv("SQLITE_POOL_SIZE", "5")),
+                        checkout_timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", "10")),
+                        name="sqlite"
+                    )
+                    logger.info(f"SQLite connection pool created with size {_pool.size} for {sqlite_backend.SQLITE_PATH}")
+                else:
+                    _pool = ConnectionPool(
+                        _open_mysql_connection,
+                        size=int(os.getenv("MYSQL_POOL_SIZE", "5")),
+                        checkout_timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", "10")),
+                        health_check_interval=float(os.getenv("MYSQL_POOL_PING_INTERVAL", "5")),
+                        name="mysql"
+                    )
+                    logger.info(f"MySQL connection pool created with size {_pool.size}")
+    return _pool
+
+def db_connection(timeout=None):
+    """Context manager that leases a pooled connection: `with db_connection() as connection: ...`"""
+    return get_pool().lease(timeout)
+
+def pool_stats():
+    """Returns the connection pool statistics (waits, checkout latency, exhaustion count, ...)."""
+    return get_pool().stats()
+
 def create_db_connection():
-    """Creates and returns a database connection."""
+    """Checks out a pooled database connection; calling close() on it returns it to the pool."""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv("MYSQL_HOST"),
-            database=os.getenv("MYSQL_DATABASE"),
-            user=os.getenv("MYSQL_USER"),
-            password=os.getenv("MYSQL_PASSWORD")
-        )
-        if connection.is_connected():
-            logger.info("Successfully connected to MySQL database")
-            return connection
-    except mysql.connector.Error as e:
-        logger.error(f"Error connecting to MySQL database: {e}")
+        return get_pool().acquire()
+    except DB_ERRORS + (ConnectionError, PoolExhaustedError) as e:
+        logger.error(f"Error connecting to {DB_BACKEND} database: {e}")
         return None
 
+# Results of the agent's read-only tools, shared by every conversation; agent.py wraps them.
+# The invalidate_* hooks below drop the tools whose data they cover.
+tool_results = ToolResultCache(max_entries=int(os.getenv("TOOL_CACHE_SIZE", "4096")),
+                               ttl=float(os.getenv("TOOL_CACHE_TTL", "300")))
+
+# How long a cache keeps serving its previous snapshot after a failed reload before trying again.
+RELOAD_RETRY_SECONDS = float(os.getenv("RELOAD_RETRY_SECONDS", "30"))
+
+# Cached data comes in three groups, each dropped by one invalidate_* hook below. A hook also
+# adds one to the group's row of DataVersions, and check_data_versions() in every other process
+# running the agent notices the new version and runs the same hook there.
+DATA_GROUPS = ("stations", "trains", "routes")  # "routes" also covers schedules and run exceptions
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+DATA_VERSIONS_TABLE = "CREATE TABLE IF NOT EXISTS DataVersions (name VARCHAR(32) PRIMARY KEY, version BIGINT NOT NULL)"
+_data_listeners = {group: [] for group in DATA_GROUPS}
+_data_versions = None  # group -> version this process has caught up with; None before the first check
+_data_versions_checked = 0.0
+_data_versions_lock = threading.Lock()
+
+def on_data_change(group, listener):
+    """Registers `listener()` to run whenever the invalidate_* hook of `group` runs, for caches outside this module."""
+    _data_listeners[group].append(listener)
+
+def _read_data_versions():
+    """Returns {group: version} from DataVersions, or None when the database can't be read."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            return None
+        cursor = connection.cursor()
+        cursor.execute(DATA_VERSIONS_TABLE)
+        cursor.execute("SELECT name, version FROM DataVersions")
+        return dict(cursor.fetchall())
+    except DB_ERRORS as e:
+        logger.error(f"Error reading data versions: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+def _bump_data_version(group):
+    """Adds one to `group`'s version so the other processes drop their caches of it."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            return
+        cursor = connection.cursor()
+        cursor.execute(DATA_VERSIONS_TABLE)
+        cursor.execute("UPDATE DataVersions SET version = version + 1 WHERE name = %s", (group,))
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO DataVersions (name, version) VALUES (%s, 1)", (group,))
+        cursor.execute("SELECT version FROM DataVersions WHERE name = %s", (group,))
+        version, = cursor.fetchone()
+        connection.commit()
+    except DB_ERRORS as e:
+        # The other processes still catch up when their caches expire.
+        logger.warning(f"Could not record the {group} change in DataVersions: {e}")
+        if connection:
+            connection.rollback()
+        return
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+    with _data_versions_lock:
+        # Our own change needs no second invalidation here, unless another process's came in between.
+        if _data_versions is not None and _data_versions.get(group, 0) == version - 1:
+            _data_versions[group] = version
+
+def _data_changed(group, broadcast):
+    for listener in _data_listeners[group]:
+        listener()
+    if broadcast:
+        _bump_data_version(group)
+
+def check_data_versions():
+    """Runs the invalidate_* hook of every group another process changed since the last check.
+
+    The agent calls this at the start of each turn; the database is read at most once every
+    DATA_VERSION_CHECK_SECONDS. The first check only records the versions.
+    """
+    global _data_versions, _data_versions_checked
+    with _data_versions_lock:
+        now = time.monotonic()
+        if now - _data_versions_checked < DATA_VERSION_CHECK_SECONDS:
+            return
+        _data_versions_checked = now
+        versions = _read_data_versions()
+        if versions is None:
+            return
+        changed = [] if _data_versions is None else [
+            group for group in DATA_GROUPS if versions.get(group, 0) != _data_versions.get(group, 0)]
+        _data_versions = versions
+    for group in changed:
+        logger.info(f"{group} changed in another process, dropping cached {group}")
+        DATA_CHANGE_HOOKS[group](broadcast=False)
+
+def data_changed(group):
+    """Runs the invalidate_* hook of `group` ("stations", "trains" or "routes") after a write elsewhere, e.g. the Flask API."""
+    DATA_CHANGE_HOOKS[group]()
+
 def get_all_trains():
     """Retrieves all train IDs and names from the database."""
     connection = None
@@ -42,7 +207,7 @@ def get_all_trains():
             logger.info(f"Retrieved {len(trains)} trains")
             return trains # Returns a list of tuples: [(train_id, train_name), ...]
             
-    except mysql.connector.Error as e:
+    except DB_ERRORS as e:
         logger.error(f"Error retrieving trains: {e}")
         return []
         
@@ -52,10 +217,102 @@ def get_all_trains():
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
-            logger.info("MySQL connection closed")
+            logger.debug("Database connection returned to pool")
 
-def search_stations(query):
-    """Searches for stations based on name or code."""
+def _load_station_rows():
+    """Loads every (station_code, station_name) row for the station catalog."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT station_code, station_name FROM Stations")
+            return cursor.fetchall()
+    except DB_ERRORS as e:
+        logger.error(f"Error loading station catalog: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+station_catalog = StationCatalog(_load_station_rows, ttl=float(os.getenv("STATION_CATALOG_TTL", "300")), retry=RELOAD_RETRY_SECONDS)
+
+def invalidate_station_catalog(broadcast=True):
+    """Call after inserting, renaming or deleting stations so the next search reloads them.
+
+    With broadcast=False only this process's caches are dropped (used by check_data_versions).
+    """
+    station_catalog.invalidate()
+    tool_results.invalidate("search_stations")
+    _data_changed("stations", broadcast)
+
+def _load_train_rows():
+    """Loads every (train_id, train_name) row for the train catalog."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT train_id, train_name FROM Trains")
+            return cursor.fetchall()
+    except DB_ERRORS as e:
+        logger.error(f"Error loading train catalog: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+train_catalog = StationCatalog(_load_train_rows, ttl=float(os.getenv("TRAIN_CATALOG_TTL", "300")), kind="train",
+                               retry=RELOAD_RETRY_SECONDS)
+
+def invalidate_train_catalog(broadcast=True):
+    """Call after adding or renaming trains so the next search reloads them."""
+    train_catalog.invalidate()
+    tool_results.invalidate("search_trains")
+    tool_results.invalidate("get_all_trains")
+    _data_changed("trains", broadcast)
+
+# Near misses returned when a station or train lookup has no substring match.
+FUZZY_SUGGESTIONS = 5
+
+def suggest_matches(catalog, query, reload=True):
+    """Closest (code, name) tuples for a query with no substring match, e.g. a misspelled name."""
+    if not str(query or "").strip():
+        return []
+    suggestions = catalog.suggest(query, limit=FUZZY_SUGGESTIONS, reload=reload) or []
+    if suggestions:
+        scored = ", ".join(f"{code} {score:.2f}" for code, _, score in suggestions)
+        logger.info(f"No {catalog.kind} contains '{query}', suggesting close matches: {scored}")
+    return [(code, name) for code, name, _ in suggestions]
+
+def search_stations(query: str):
+    """Searches for stations based on name or code, falling back to close spellings."""
+    stations = station_catalog.search(query)
+    if stations is None:
+        return _search_stations_sql(query)
+    if not stations:
+        stations = suggest_matches(station_catalog, query)
+    logger.info(f"Found {len(stations)} matching stations for query: {query}")
+    return stations # Returns a list of tuples: [(station_code, station_name), ...]
+
+def search_trains(query: str):
+    """Searches for trains by name or ID, falling back to close spellings."""
+    trains = train_catalog.search(query)
+    if trains is None:
+        return []
+    if not trains:
+        trains = suggest_matches(train_catalog, query)
+    logger.info(f"Found {len(trains)} matching trains for query: {query}")
+    return trains # Returns a list of tuples: [(train_id, train_name), ...]
+
+def _search_stations_sql(query):
+    """Searches for stations with a LIKE scan; used when the station catalog is unavailable."""
     connection = None
     cursor = None
     try:
@@ -72,7 +329,7 @@ def search_stations(query):
             logger.info(f"Found {len(stations)} matching stations for query: {query}")
             return stations # Returns a list of tuples: [(station_code, station_name), ...]
             
-    except mysql.connector.Error as e:
+    except DB_ERRORS as e:
         logger.error(f"Error searching stations: {e}")
         return []
         
@@ -82,48 +339,139 @@ def search_stations(query):
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
-            logger.info("MySQL connection closed")
+            logger.debug("Database connection returned to pool")
 
-def get_train_route(train_id):
-    """Retrieves the route for a specific train, including all stops."""
+# One joined query per train; MIN(route_id) picks the same route for a train every time.
+ROUTE_QUERY = (
+    "SELECT ts.train_id, rs.route_id, s.station_code, s.station_name, rs.sequence_number, rs.distance_from_source "
+    "FROM (SELECT train_id, MIN(route_id) AS route_id FROM TrainSchedules {where} GROUP BY train_id) ts "
+    "JOIN RouteStations rs ON rs.route_id = ts.route_id "
+    "JOIN Stations s ON rs.station_code = s.station_code "
+    "ORDER BY ts.train_id, rs.sequence_number"
+)
+
+def _load_route_rows(train_id=None):
+    """Runs ROUTE_QUERY for one train (or all trains) and returns the rows, or None on error."""
     connection = None
     cursor = None
     try:
         connection = create_db_connection()
         if connection:
             cursor = connection.cursor()
-            # Get the route_id for the given train_id
-            route_query = "SELECT route_id FROM TrainSchedules WHERE train_id = %s LIMIT 1"
-            logger.debug(f"Executing query: {route_query} with train_id: {train_id}")
-            cursor.execute(route_query, (train_id,))
-            route_result = cursor.fetchone()
-            
-            if not route_result:
-                logger.warning(f"No route found for train_id: {train_id}")
-                return []
-                
-            route_id = route_result[0]
-            
-            # Get all stations on this route in sequence order
-            stations_query = "SELECT s.station_code, s.station_name, rs.sequence_number FROM RouteStations rs JOIN Stations s ON rs.station_code = s.station_code WHERE rs.route_id = %s ORDER BY rs.sequence_number"
-            logger.debug(f"Executing query: {stations_query} with route_id: {route_id}")
-            cursor.execute(stations_query, (route_id,))
-            
-            route_stations = cursor.fetchall()
-            logger.info(f"Retrieved {len(route_stations)} stations for route_id: {route_id}")
-            return route_stations # Returns a list of tuples: [(station_code, station_name, sequence_number), ...]
-            
-    except mysql.connector.Error as e:
+            if train_id is None:
+                cursor.execute(ROUTE_QUERY.format(where=""))
+            else:
+                cursor.execute(ROUTE_QUERY.format(where="WHERE train_id = %s"), (train_id,))
+            return cursor.fetchall()
+    except DB_ERRORS as e:
         logger.error(f"Error retrieving train route: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+def _load_train_route(train_id):
+    rows = _load_route_rows(train_id)
+    if rows is None:
+        return None
+    routes = group_route_rows(rows)
+    return routes.get(train_id) or TrainRoute(train_id, None, [])
+
+def _load_all_train_routes():
+    rows = _load_route_rows()
+    return group_route_rows(rows) if rows is not None else None
+
+route_cache = RouteCache(_load_train_route, _load_all_train_routes, ttl=float(os.getenv("ROUTE_CACHE_TTL", "600")))
+
+def preload_train_routes():
+    """Loads every train's route into the route cache with a single query (call at startup)."""
+    return route_cache.preload()
+
+def invalidate_train_routes(train_id=None, route_id=None, broadcast=True):
+    """Call after TrainSchedules or RouteStations change; with no arguments every route is dropped.
+
+    Other processes drop every route, since DataVersions doesn't record which one changed.
+    """
+    if route_id is not None:
+        route_cache.invalidate_route(route_id)
+        # Cached stop lists don't record their route, so every train's is dropped.
+        tool_results.invalidate("get_train_route")
+    if train_id is not None or route_id is None:
+        route_cache.invalidate(train_id)
+        if train_id is None:
+            tool_results.invalidate("get_train_route")
+        else:
+            tool_results.invalidate("get_train_route", train_id=train_id)
+    _data_changed("routes", broadcast)
+
+DATA_CHANGE_HOOKS = {
+    "stations": invalidate_station_catalog,
+    "trains": invalidate_train_catalog,
+    "routes": invalidate_train_routes,
+}
+
+def is_valid_segment(train_id, source_station_code, destination_station_code):
+    """True if both stations are on the train's route and the destination comes after the source."""
+    return route_cache.is_valid_segment(train_id, source_station_code, destination_station_code)
+
+def get_train_route(train_id: str):
+    """Retrieves the route for a specific train, including all stops."""
+    route = route_cache.get(train_id)
+    if not route:
+        logger.warning(f"No route found for train_id: {train_id}")
         return []
-        
+    logger.info(f"Retrieved {len(route)} stations for train_id: {train_id}")
+    return route.stops() # Returns a list of tuples: [(station_code, station_name, sequence_number), ...]
+
+# Per-class seat counts and quota allocations for a train over a date range, in one statement.
+AVAILABILITY_QUERY = (
+    "SELECT 'class', si.journey_date, c.coach_type, SUM(si.total_seats), SUM(si.available_seats), SUM(si.rac_count), SUM(si.waitlist_count) "
+    "FROM SeatInventory si JOIN Coaches c ON c.coach_id = si.coach_id "
+    "WHERE si.train_id = %s AND si.journey_date BETWEEN %s AND %s "
+    "GROUP BY si.journey_date, c.coach_type "
+    "UNION ALL "
+    "SELECT 'quota', qa.journey_date, q.quota_name, qa.seats_allocated, NULL, NULL, NULL "
+    "FROM QuotaAllocations qa JOIN Quotas q ON q.quota_id = qa.quota_id "
+    "WHERE qa.train_id = %s AND qa.journey_date BETWEEN %s AND %s"
+)
+
+def _load_availability(train_id, start_date, end_date):
+    """Runs AVAILABILITY_QUERY and shapes the rows; returns None on error."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if connection:
+            cursor = connection.cursor()
+            cursor.execute(AVAILABILITY_QUERY, (train_id, start_date, end_date, train_id, start_date, end_date))
+            return build_availability(cursor.fetchall(), start_date, end_date)
+    except DB_ERRORS as e:
+        logger.error(f"Error retrieving seat availability: {e}")
+        return None
     finally:
-        # Close cursor and connection
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
+        if connection:
             connection.close()
-            logger.info("MySQL connection closed")
+
+availability_cache = AvailabilityCache(_load_availability, ttl=float(os.getenv("AVAILABILITY_CACHE_TTL", "30")))
+
+def get_seat_availability(train_id, start_date, end_date=None):
+    """Returns per-class availability and quota allocations for each date in the range.
+
+    Dates may be date objects or YYYY-MM-DD strings; the result is keyed by YYYY-MM-DD and
+    maps to {"classes": {coach_type: {"total", "available", "rac", "waitlist"}}, "quotas": {quota_name: seats}}.
+    Returns None if the database could not be reached.
+    """
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    if end_date is None:
+        end_date = start_date
+    elif isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return availability_cache.get(train_id, start_date, end_date)
 
 def categorize_age(age: int) -> str:
     """Categorizes passenger age."""
@@ -134,8 +482,69 @@ def categorize_age(age: int) -> str:
     else:
         return "Adult"
 
-def create_reservation(train_id: str, journey_date: str, source_station_code: str, destination_station_code: str, passengers: list):
-    """Creates a new reservation in the database and returns booking details, including PNR."""
+# Validates the train and both stations in a single round trip; a NULL column means "not found".
+VALIDATE_BOOKING_QUERY = (
+    "SELECT (SELECT train_name FROM Trains WHERE train_id = %s), "
+    "(SELECT station_name FROM Stations WHERE station_code = %s), "
+    "(SELECT station_name FROM Stations WHERE station_code = %s)"
+)
+RESERVATION_INSERT = "INSERT INTO Reservations (pnr, train_id, journey_date, source_station_code, destination_station_code, booking_time, status) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+PASSENGER_INSERT = "INSERT INTO Passengers (pnr, name, age, category) VALUES (%s, %s, %s, %s)"
+
+def _check_booking(train_id, journey_date, source_station_code, destination_station_code):
+    """Parses the journey date and checks the segment against the cached route.
+
+    Returns (journey_date as a date, None) or (None, error message). Costs no round trip
+    when the route is cached.
+    """
+    try:
+        journey = datetime.strptime(str(journey_date), '%Y-%m-%d').date()
+    except ValueError:
+        return None, f"Invalid journey date: {journey_date}. Use YYYY-MM-DD."
+    route = route_cache.get(train_id)
+    if route and not route.is_valid_segment(source_station_code, destination_station_code):
+        return None, f"{source_station_code} to {destination_station_code} is not a valid segment of train {train_id}'s route"
+    return journey, None
+
+def _passenger_records(pnr, passengers):
+    records = []
+    for passenger in passengers:
+        age = passenger.get('age')
+        category = categorize_age(age) if age is not None else "Unknown"
+        records.append((pnr, passenger.get('name'), age, category))
+    return records
+
+def _booking_summary(pnr, train_id, train_name, journey, source_station_code, source_station_name,
+                     destination_station_code, destination_station_name, booking_time, allocation, passenger_records):
+    """Builds the booking details returned to callers (and printed on the ticket) without reading them back."""
+    return {
+        "pnr": pnr,
+        "train_id": train_id,
+        "train_name": train_name,
+        "journey_date": journey.strftime('%Y-%m-%d'),
+        "source_station_code": source_station_code,
+        "source_station_name": source_station_name,
+        "destination_station_code": destination_station_code,
+        "destination_station_name": destination_station_name,
+        "booking_time": booking_time.strftime('%Y-%m-%d %H:%M:%S'),
+        "status": allocation["status"],
+        "coach_id": allocation["coach_id"],
+        "waitlist_position": allocation["waitlist_position"],
+        "passengers": [{"name": p[1], "age": p[2], "category": p[3]} for p in passenger_records]
+    }
+
+def create_reservation(train_id: str, journey_date: str, source_station_code: str, destination_station_code: str, passengers: list, coach_type: str = None):
+    """Creates a new reservation in the database and returns booking details, including PNR.
+
+    A booking costs six round trips: the batched validation SELECT, locking and updating the
+    seat inventory, the reservation INSERT, one multi-row passenger INSERT and the COMMIT.
+    The booking summary is built from the inputs and the validated names rather than read
+    back from the database.
+    """
+    journey, error = _check_booking(train_id, journey_date, source_station_code, destination_station_code)
+    if error:
+        return {"success": False, "error": error}
+
     connection = None
     cursor = None
     try:
@@ -144,80 +553,39 @@ def create_reservation(train_id: str, journey_date: str, source_station_code: st
             cursor = connection.cursor()
             
             # Generate a simple dummy PNR (replace with a more robust method in a real app)
-            import uuid
             pnr = str(uuid.uuid4())[:8].upper()
             
-            # Check if train, source, and destination exist and are valid for the route (basic check)
-            # In a real application, you would perform more thorough validation here,
-            # including checking if source and destination are on the route and in correct order.
-            
-            # Example: Check if train_id exists (simplified)
-            cursor.execute("SELECT train_id FROM Trains WHERE train_id = %s", (train_id,))
-            if not cursor.fetchone():
+            cursor.execute(VALIDATE_BOOKING_QUERY, (train_id, source_station_code, destination_station_code))
+            train_name, source_station_name, destination_station_name = cursor.fetchone()
+            if train_name is None:
                 return {"success": False, "error": f"Invalid Train ID: {train_id}"}
-                
-            # Example: Check if source_station_code exists (simplified)
-            cursor.execute("SELECT station_code FROM Stations WHERE station_code = %s", (source_station_code,))
-            if not cursor.fetchone():
+            if source_station_name is None:
                 return {"success": False, "error": f"Invalid Source Station Code: {source_station_code}"}
-                
-            # Example: Check if destination_station_code exists (simplified)
-            cursor.execute("SELECT station_code FROM Stations WHERE station_code = %s", (destination_station_code,))
-            if not cursor.fetchone():
-                 return {"success": False, "error": f"Invalid Destination Station Code: {destination_station_code}"}
+            if destination_station_name is None:
+                return {"success": False, "error": f"Invalid Destination Station Code: {destination_station_code}"}
             
-            # TODO: Add more robust validation: Check if source and destination are on the route and in order using get_train_route.
-            # TODO: Implement seat availability check and selection.
+            try:
+                allocation = allocate_seats(cursor, train_id, journey, len(passengers), coach_type)
+            except SeatAllocationError as e:
+                connection.rollback()
+                return {"success": False, "error": str(e)}
+            booking_time = datetime.now().replace(microsecond=0)
+            cursor.execute(RESERVATION_INSERT, (pnr, train_id, journey, source_station_code, destination_station_code, booking_time, allocation["status"]))
             
-            # Insert into Reservations table
-            reservation_query = "INSERT INTO Reservations (pnr, train_id, journey_date, source_station_code, destination_station_code, booking_time, status) VALUES (%s, %s, %s, %s, %s, NOW(), %s)"
-            reservation_values = (pnr, train_id, journey_date, source_station_code, destination_station_code, "Confirmed") # Assuming Confirmed status on booking
-            cursor.execute(reservation_query, reservation_values)
+            # mysql-connector rewrites an INSERT executemany into one multi-row statement.
+            passenger_records = _passenger_records(pnr, passengers)
+            if passenger_records:
+                cursor.executemany(PASSENGER_INSERT, passenger_records)
             
-            # Insert into Passengers table
-            passenger_query = "INSERT INTO Passengers (pnr, name, age, category) VALUES (%s, %s, %s, %s)"
-            passenger_records = []
-            for passenger in passengers:
-                age = passenger.get('age')
-                category = categorize_age(age) if age is not None else "Unknown"
-                passenger_records.append((pnr, passenger.get('name'), age, category))
-                
-            cursor.executemany(passenger_query, passenger_records)
-            
-            # Commit the transaction
             connection.commit()
+            availability_cache.invalidate(train_id)
             logger.info(f"Reservation created successfully with PNR: {pnr}")
             
-            # Retrieve the saved booking details for the ticket
-            # This is a simplified retrieval; a real app might join tables to get full details
-            booking_details_query = "SELECT r.pnr, r.train_id, t.train_name, r.journey_date, r.source_station_code, s_src.station_name AS source_station_name, r.destination_station_code, s_dest.station_name AS destination_station_name, r.booking_time, r.status FROM Reservations r JOIN Trains t ON r.train_id = t.train_id JOIN Stations s_src ON r.source_station_code = s_src.station_code JOIN Stations s_dest ON r.destination_station_code = s_dest.station_code WHERE r.pnr = %s"
-            cursor.execute(booking_details_query, (pnr,))
-            reservation_details = cursor.fetchone()
-            
-            passenger_details_query = "SELECT name, age, category FROM Passengers WHERE pnr = %s"
-            cursor.execute(passenger_details_query, (pnr,))
-            passenger_details = cursor.fetchall()
-            
-            booking_summary = {
-                "pnr": reservation_details[0],
-                "train_id": reservation_details[1],
-                "train_name": reservation_details[2],
-                "journey_date": reservation_details[3].strftime('%Y-%m-%d'), # Format date
-                "source_station_code": reservation_details[4],
-                "source_station_name": reservation_details[5],
-                "destination_station_code": reservation_details[6],
-                "destination_station_name": reservation_details[7],
-                "booking_time": reservation_details[8].strftime('%Y-%m-%d %H:%M:%S'), # Format datetime
-                "status": reservation_details[9],
-                "passengers": []
-            }
-            
-            for p in passenger_details:
-                booking_summary["passengers"].append({"name": p[0], "age": p[1], "category": p[2]})
-
+            booking_summary = _booking_summary(pnr, train_id, train_name, journey, source_station_code, source_station_name,
+                                               destination_station_code, destination_station_name, booking_time, allocation, passenger_records)
             return {"success": True, "booking_details": booking_summary}
             
-    except mysql.connector.Error as e:
+    except DB_ERRORS as e:
         if connection:
             connection.rollback()
         logger.error(f"Error creating reservation: {e}")
@@ -229,7 +597,134 @@ def create_reservation(train_id: str, journey_date: str, source_station_code: st
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
-            logger.info("MySQL connection closed")
+            logger.debug("Database connection returned to pool")
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+def _batch_item_error(item):
+    """What is wrong with one create_reservations_batch item, or None if it can be booked."""
+    if not isinstance(item, dict):
+        return "Each reservation must be a dict"
+    missing = [key for key in ("train_id", "journey_date", "source_station_code", "destination_station_code", "passengers") if not item.get(key)]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    if not isinstance(item["passengers"], list) or not all(isinstance(passenger, dict) for passenger in item["passengers"]):
+        return "passengers must be a list of dicts with each passenger's name and age"
+    return None
+
+def _book_group(connection, cursor, train_id, journey, coach_type, members, names, results):
+    """Allocates and writes one train/date group of a batch in its own transaction."""
+    for attempt in range(MAX_ALLOCATION_ATTEMPTS):
+        try:
+            allocations = allocate_batch(cursor, train_id, journey, [len(item["passengers"]) for _, item in members], coach_type)
+            booking_time = datetime.now().replace(microsecond=0)
+            reservation_rows = []
+            passenger_rows = []
+            booked = []
+            for (index, item), allocation in zip(members, allocations):
+                if isinstance(allocation, SeatAllocationError):
+                    results[index] = {"success": False, "error": str(allocation)}
+                    continue
+                pnr = str(uuid.uuid4())[:8].upper()
+                src, dst = item["source_station_code"], item["destination_station_code"]
+                reservation_rows.append((pnr, train_id, journey, src, dst, booking_time, allocation["status"]))
+                records = _passenger_records(pnr, item["passengers"])
+                passenger_rows.extend(records)
+                booked.append((index, _booking_summary(pnr, train_id, names[("train", train_id)], journey, src, names[("station", src)],
+                                                       dst, names[("station", dst)], booking_time, allocation, records)))
+            if reservation_rows:
+                cursor.executemany(RESERVATION_INSERT, reservation_rows)
+            if passenger_rows:
+                cursor.executemany(PASSENGER_INSERT, passenger_rows)
+            connection.commit()
+            availability_cache.invalidate(train_id)
+            for index, summary in booked:
+                results[index] = {"success": True, "booking_details": summary}
+            logger.info(f"Batch booked {len(booked)} of {len(members)} reservations on train {train_id} for {journey}")
+            return
+        except SeatAllocationConflict as e:
+            connection.rollback()
+            logger.debug(f"Batch allocation attempt {attempt + 1} conflicted: {e}")
+        except DB_ERRORS as e:
+            connection.rollback()
+            logger.error(f"Error creating batch reservations for train {train_id} on {journey}: {e}")
+            for index, _ in members:
+                results[index] = {"success": False, "error": str(e)}
+            return
+    for index, _ in members:
+        results[index] = {"success": False, "error": f"Seat inventory for train {train_id} on {journey} is busy, please retry"}
+
+def create_reservations_batch(reservations: list):
+    """Creates many reservations at once and returns one result per item, in order.
+
+    Each item is a dict with the create_reservation arguments (train_id, journey_date,
+    source_station_code, destination_station_code, passengers and an optional coach_type);
+    each result has the same shape as create_reservation's. Every train and station in the
+    batch is validated with one query. Items are then grouped by train, date and class and
+    each group is allocated and written in its own transaction: one inventory read, one
+    write per touched coach and multi-row INSERTs, whatever the group size.
+    """
+    results = [None] * len(reservations)
+    pending = []
+    for index, item in enumerate(reservations):
+        error = _batch_item_error(item)
+        if error:
+            results[index] = {"success": False, "error": error}
+            continue
+        journey, error = _check_booking(item["train_id"], item["journey_date"], item["source_station_code"], item["destination_station_code"])
+        if error:
+            results[index] = {"success": False, "error": error}
+            continue
+        pending.append((index, item, journey))
+    if not pending:
+        return results
+
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            for index, _, _ in pending:
+                results[index] = {"success": False, "error": "The reservation database is unavailable"}
+            return results
+        cursor = connection.cursor()
+
+        train_ids = sorted({item["train_id"] for _, item, _ in pending})
+        station_codes = sorted({code for _, item, _ in pending for code in (item["source_station_code"], item["destination_station_code"])})
+        cursor.execute(
+            f"SELECT 'train', train_id, train_name FROM Trains WHERE train_id IN ({_placeholders(train_ids)}) "
+            f"UNION ALL SELECT 'station', station_code, station_name FROM Stations WHERE station_code IN ({_placeholders(station_codes)})",
+            tuple(train_ids) + tuple(station_codes))
+        names = {(kind, key): name for kind, key, name in cursor.fetchall()}
+
+        groups = {}
+        for index, item, journey in pending:
+            if ("train", item["train_id"]) not in names:
+                results[index] = {"success": False, "error": f"Invalid Train ID: {item['train_id']}"}
+            elif ("station", item["source_station_code"]) not in names:
+                results[index] = {"success": False, "error": f"Invalid Source Station Code: {item['source_station_code']}"}
+            elif ("station", item["destination_station_code"]) not in names:
+                results[index] = {"success": False, "error": f"Invalid Destination Station Code: {item['destination_station_code']}"}
+            else:
+                groups.setdefault((item["train_id"], journey, item.get("coach_type")), []).append((index, item))
+
+        for (train_id, journey, coach_type), members in groups.items():
+            _book_group(connection, cursor, train_id, journey, coach_type, members, names, results)
+        return results
+
+    except DB_ERRORS as e:
+        if connection:
+            connection.rollback()
+        logger.error(f"Error creating batch reservations: {e}")
+        return [result or {"success": False, "error": str(e)} for result in results]
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+            logger.debug("Database connection returned to pool")
 
 # Example usage (for testing purposes, can be removed later)
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import heapq
+import re
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Edits tolerated per query word; a word within this many edits shares all but 3 * MAX_EDITS trigrams.
+MAX_EDITS = 2
+# Query words matching more entries than this only re-rank entries found by rarer words.
+COMMON_WORD_ENTRIES = 64
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text) -> str:
+    """Lowercases and collapses punctuation and whitespace to single spaces."""
+    return _NON_WORD.sub(" ", str(text or "").lower()).strip()
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of each word padded as '  word ', the way pg_trgm pads them."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FuzzyIndex:
+    """Typo-tolerant lookup over (key, label) entries, built once per catalog snapshot.
+
+    Every distinct word of the entries' texts is indexed by its padded trigrams. A query word
+    collects candidate words by counting shared trigrams in C (q-gram filter: a word within
+    MAX_EDITS edits keeps all but 3 * MAX_EDITS of its trigrams) and scores them by trigram
+    Dice similarity, so misspellings such as "secundrabad" still find "Secunderabad
+    Junction". An entry scores the mean of its best word score for each query word.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, Sequence[str]]]):
+        """entries: (key, label, texts) where texts are the strings to match, e.g. code and name."""
+        self.keys = []
+        self.labels = []
+        self.entry_words = []
+        word_ids = {}
+        word_entries = []
+        for key, label, texts in entries:
+            i = len(self.keys)
+            self.keys.append(key)
+            self.labels.append(label)
+            ids = []
+            for word in set(" ".join(normalize(text) for text in texts if text).split()):
+                w = word_ids.setdefault(word, len(word_ids))
+                if w == len(word_entries):
+                    word_entries.append([])
+                word_entries[w].append(i)
+                ids.append(w)
+            self.entry_words.append(tuple(ids))
+        self.words = list(word_ids)
+        self.word_ids = word_ids
+        self.word_entries = [tuple(ids) for ids in word_entries]
+        self.word_grams = []
+        postings = {}
+        for w, word in enumerate(self.words):
+            grams = trigrams(word)
+            self.word_grams.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(w)
+        self.postings = {gram: tuple(ids) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def similar_words(self, word: str, min_score: float, limit: int = 20) -> List[Tuple[int, float]]:
+        """(word id, Dice similarity) for indexed words close to `word`, best first."""
+        w = self.word_ids.get(word)
+        if w is not None:
+            exact = [(w, 1.0)]
+        else:
+            exact = []
+        grams = trigrams(word)
+        needed = max(1, len(grams) - 3 * MAX_EDITS)
+        # Counter counts the concatenated postings in C.
+        counts = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        size, word_grams = len(grams), self.word_grams
+        scored = [(candidate, 2 * shared / (size + word_grams[candidate]))
+                  for candidate, shared in counts.items() if shared >= needed and candidate != w]
+        scored = [item for item in scored if item[1] >= min_score]
+        scored.sort(key=itemgetter(1), reverse=True)
+        return exact + scored[:limit]
+
+    def search(self, query, limit: int = 5, min_score: float = 0.5) -> List[Tuple[str, str, float]]:
+        """Returns up to `limit` (key, label, score) tuples, best first; score 1.0 is an exact match."""
+        words = normalize(query).split()
+        if not words:
+            return []
+        matches = []
+        for word in words:
+            similar = dict(self.similar_words(word, min_score))
+            matches.append((sum(len(self.word_entries[w]) for w in similar), similar))
+        # Rarest words first. A word shared by many entries ("junction", "central") only adds to
+        # entries an earlier word found, unless fewer than `limit` were found, so its long
+        # entry lists are never walked for a query that already has candidates.
+        matches.sort(key=itemgetter(0))
+        totals = {}
+        for reach, similar in matches:
+            if reach > COMMON_WORD_ENTRIES and len(totals) >= limit:
+                for i in totals:
+                    totals[i] += max([similar.get(w, 0.0) for w in self.entry_words[i]], default=0.0)
+                continue
+            best = {}
+            for w, score in similar.items():
+                for i in self.word_entries[w]:
+                    if score > best.get(i, 0.0):
+                        best[i] = score
+            for i, score in best.items():
+                totals[i] = totals.get(i, 0.0) + score
+        # Entries missing a query word still count, with nothing for that word.
+        scale, labels = 1.0 / len(words), self.labels
+        top = heapq.nlargest(limit, totals.items(), key=itemgetter(1))
+        top.sort(key=lambda item: (-item[1], labels[item[0]]))
+        return [(self.keys[i], labels[i], round(total * scale, 3)) for i, total in top if total * scale >= min_score]
+
+    def best(self, query, min_score: float = 0.75) -> Optional[Tuple[str, str, float]]:
+        """The single best match scoring at least `min_score`, or None."""
+        matches = self.search(query, limit=1, min_score=min_score)
+        return matches[0] if matches else None
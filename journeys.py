@@ -0,0 +1,116 @@
+"""Multi-leg journey planning for the agent.
+
+Loads the timetable (TrainSchedules, RouteStations, StationSchedules) through database.py and
+plans with the Connection Scan planner shared with the Flask backend (backend/journey_planner.py).
+The planner is rebuilt after JOURNEY_PLANNER_TTL seconds or `invalidate_journey_planner()`.
+With TIMETABLE_SNAPSHOT set, the first build maps that snapshot file instead of querying the
+database, and every database load rewrites it.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from logger import setup_logger
+from database import create_db_connection, on_data_change, DB_ERRORS, RELOAD_RETRY_SECONDS
+
+logger = setup_logger(__name__)
+
+JOURNEY_PLANNER_TTL = float(os.getenv("JOURNEY_PLANNER_TTL", "600"))
+TRANSFER_MINUTES = int(os.getenv("JOURNEY_TRANSFER_MINUTES", "10"))
+TIMETABLE_SNAPSHOT = os.getenv("TIMETABLE_SNAPSHOT")
+
+_planner = None
+_built_at = 0.0
+_planner_lock = threading.Lock()
+
+def _load_timetable():
+    """Reads the four timetable tables with flat queries and builds a backend Timetable."""
+    # Imported here so the agent still starts in a checkout without the backend package.
+    from backend.train_search import Timetable
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            return None
+        cursor = connection.cursor()
+        cursor.execute("SELECT train_id, train_name FROM Trains")
+        trains = dict(cursor.fetchall())
+        cursor.execute("SELECT schedule_id, train_id, route_id, day_of_operation FROM TrainSchedules")
+        schedules = cursor.fetchall()
+        cursor.execute("SELECT route_id, station_code, sequence_number, distance_from_source FROM RouteStations")
+        route_stations = cursor.fetchall()
+        cursor.execute("SELECT schedule_id, station_code, arrival_time, departure_time FROM StationSchedules")
+        station_times = cursor.fetchall()
+    except DB_ERRORS as e:
+        logger.error(f"Error loading timetable: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+    return Timetable(trains, schedules, route_stations, station_times)
+
+def get_journey_planner():
+    """Returns the current JourneyPlanner, rebuilding it when stale; None if it was never loaded."""
+    global _planner, _built_at
+    if _planner is not None and time.monotonic() - _built_at < JOURNEY_PLANNER_TTL:
+        return _planner
+    with _planner_lock:
+        if _planner is None or time.monotonic() - _built_at >= JOURNEY_PLANNER_TTL:
+            from backend.journey_planner import JourneyPlanner
+            from backend.train_search import Timetable
+            from backend.timetable_store import load_snapshot
+            start = time.perf_counter()
+            store = load_snapshot(TIMETABLE_SNAPSHOT) if _planner is None else None
+            if store is not None:
+                timetable = Timetable.from_store(store)
+            else:
+                timetable = _load_timetable()
+                if timetable is not None and TIMETABLE_SNAPSHOT:
+                    try:
+                        timetable.store.save(TIMETABLE_SNAPSHOT)
+                    except OSError as e:
+                        logger.warning(f"Could not write timetable snapshot {TIMETABLE_SNAPSHOT}: {e}")
+            if timetable is None:
+                if _planner is not None:
+                    logger.warning(f"Timetable reload failed, planning on the previous snapshot for {RELOAD_RETRY_SECONDS:.0f} s")
+                    # Retried after RELOAD_RETRY_SECONDS rather than by every plan.
+                    _built_at = time.monotonic() - JOURNEY_PLANNER_TTL + min(RELOAD_RETRY_SECONDS, JOURNEY_PLANNER_TTL)
+                return _planner
+            _planner = JourneyPlanner(timetable, default_transfer_minutes=TRANSFER_MINUTES)
+            _built_at = time.monotonic()
+            stats = timetable.store.stats()
+            logger.info(f"Journey planner built with {len(_planner)} connections in {(time.perf_counter() - start) * 1000:.0f} ms "
+                        f"(timetable from {stats['source']}: {stats['runs']} runs, {stats['column_bytes'] / 2**20:.1f} MiB, "
+                        f"loaded in {stats['load_ms']:.0f} ms)")
+        return _planner
+
+def invalidate_journey_planner():
+    """Call after schedules or route stations change so the next plan rebuilds the timetable."""
+    global _built_at
+    _built_at = 0.0
+
+# The timetable holds train names as well as routes and schedules.
+on_data_change("routes", invalidate_journey_planner)
+on_data_change("trains", invalidate_journey_planner)
+
+def plan_journey(from_station: str, to_station: str, date: str, earliest_time: str = "00:00", max_changes: int = 2, limit: int = 3):
+    """Plans itineraries with up to `max_changes` changes; returns {"success", "itineraries"} or an error."""
+    try:
+        journey_date = datetime.strptime(str(date), '%Y-%m-%d').date()
+        datetime.strptime(str(earliest_time), '%H:%M')
+    except ValueError:
+        return {"success": False, "error": "Use YYYY-MM-DD for the date and HH:MM for the earliest departure time."}
+    try:
+        planner = get_journey_planner()
+    except ImportError as e:
+        logger.error(f"Journey planner unavailable: {e}")
+        planner = None
+    if planner is None:
+        return {"success": False, "error": "The timetable is unavailable right now."}
+    itineraries = planner.plan(str(from_station).strip().upper(), str(to_station).strip().upper(), journey_date,
+                               earliest=str(earliest_time), max_changes=int(max_changes), limit=int(limit))
+    logger.info(f"Planned {len(itineraries)} itineraries from {from_station} to {to_station} on {date}")
+    return {"success": True, "itineraries": itineraries}
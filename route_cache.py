@@ -0,0 +1,142 @@
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TrainRoute:
+    """Ordered stop list of one train's route, stored column-wise."""
+
+    __slots__ = ("train_id", "route_id", "codes", "names", "sequences", "distances", "positions")
+
+    def __init__(self, train_id, route_id, rows: Iterable[Tuple[str, str, int, Optional[float]]]):
+        rows = list(rows)
+        self.train_id = train_id
+        self.route_id = route_id
+        self.codes = tuple(row[0] for row in rows)
+        self.names = tuple(row[1] for row in rows)
+        self.sequences = array("i", (int(row[2]) for row in rows))
+        self.distances = array("d", (float(row[3]) if row[3] is not None else 0.0 for row in rows))
+        self.positions = {code.upper(): i for i, code in enumerate(self.codes)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def stops(self) -> List[Tuple[str, str, int]]:
+        """Returns [(station_code, station_name, sequence_number), ...] like get_train_route."""
+        return list(zip(self.codes, self.names, self.sequences))
+
+    def position(self, station_code) -> Optional[int]:
+        if station_code is None:
+            return None
+        return self.positions.get(str(station_code).strip().upper())
+
+    def is_valid_segment(self, source_station_code, destination_station_code) -> bool:
+        """True if both stations are stops and the destination comes after the source."""
+        src = self.position(source_station_code)
+        dst = self.position(destination_station_code)
+        return src is not None and dst is not None and src < dst
+
+    def segment_distance(self, source_station_code, destination_station_code) -> Optional[float]:
+        src = self.position(source_station_code)
+        dst = self.position(destination_station_code)
+        if src is None or dst is None:
+            return None
+        return abs(self.distances[dst] - self.distances[src])
+
+
+def group_route_rows(rows) -> Dict[str, TrainRoute]:
+    """Groups (train_id, route_id, code, name, sequence, distance) rows ordered by train and sequence."""
+    routes = {}
+    current = None
+    batch = []
+    for train_id, route_id, code, name, sequence, distance in rows:
+        if current is not None and train_id != current[0]:
+            routes[current[0]] = TrainRoute(current[0], current[1], batch)
+            batch = []
+        current = (train_id, route_id)
+        batch.append((code, name, sequence, distance))
+    if current is not None:
+        routes[current[0]] = TrainRoute(current[0], current[1], batch)
+    return routes
+
+
+class RouteCache:
+    """Caches TrainRoute objects keyed by train_id.
+
+    `loader(train_id)` fetches a single route (None on error, an empty TrainRoute if the
+    train has no schedule); `bulk_loader()` returns a {train_id: TrainRoute} dict for
+    `preload()`. Entries expire after `ttl` seconds and can be dropped explicitly by train
+    or by route when schedules or route stations change.
+    """
+
+    def __init__(self, loader: Callable[[str], Optional[TrainRoute]],
+                 bulk_loader: Optional[Callable[[], Optional[Dict[str, TrainRoute]]]] = None,
+                 ttl: float = 600.0):
+        self._loader = loader
+        self._bulk_loader = bulk_loader
+        self.ttl = ttl
+        self._entries = {}  # train_id -> (TrainRoute, loaded_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, train_id) -> Optional[TrainRoute]:
+        """Returns the cached route for `train_id` without loading it; None on a miss."""
+        entry = self._entries.get(train_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, train_id, route: TrainRoute):
+        with self._lock:
+            self._entries[train_id] = (route, time.monotonic())
+
+    def get(self, train_id) -> Optional[TrainRoute]:
+        """Returns the cached route for `train_id`, loading it on a miss."""
+        route = self.peek(train_id)
+        if route is not None:
+            return route
+        route = self._loader(train_id)
+        if route is not None:
+            self.put(train_id, route)
+        return route
+
+    def preload(self) -> int:
+        """Loads every train's route in one query; returns the number of routes cached."""
+        if self._bulk_loader is None:
+            return 0
+        start = time.perf_counter()
+        routes = self._bulk_loader()
+        if routes is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            for train_id, route in routes.items():
+                self._entries[train_id] = (route, now)
+        logger.info(f"Preloaded {len(routes)} train routes in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return len(routes)
+
+    def invalidate(self, train_id=None):
+        """Drops one train's route, or every route when `train_id` is None."""
+        with self._lock:
+            if train_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(train_id, None)
+
+    def invalidate_route(self, route_id):
+        """Drops every train that runs on `route_id`, e.g. after its RouteStations changed."""
+        with self._lock:
+            stale = [train_id for train_id, (route, _) in self._entries.items() if route.route_id == route_id]
+            for train_id in stale:
+                del self._entries[train_id]
+
+    def is_valid_segment(self, train_id, source_station_code, destination_station_code) -> bool:
+        route = self.get(train_id)
+        return route is not None and route.is_valid_segment(source_station_code, destination_station_code)
@@ -0,0 +1,155 @@
+"""SQLite backend for database.py, selected with DB_BACKEND=sqlite.
+
+Connections run in WAL mode with tuned pragmas and translate the small MySQL dialect
+database.py uses (%s placeholders, NOW(), SELECT ... FOR UPDATE). Translated SQL is
+memoized so sqlite3's per-connection statement cache reuses the prepared statements.
+"""
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "agent.db"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # NORMAL is durable across application crashes in WAL mode and skips an fsync per commit.
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))}",
+    f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024)))}",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+)
+
+# The MySQL tables database.py reads and writes. SQLite table names are case-insensitive, so
+# Trains, Stations, Coaches, Quotas, Reservations and Passengers would clash with the Flask
+# backend's tables of the same names; keep this schema in its own file (instance/agent.db).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Trains (train_id TEXT PRIMARY KEY, train_name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS Stations (station_code TEXT PRIMARY KEY, station_name TEXT NOT NULL, latitude REAL, longitude REAL);
+CREATE TABLE IF NOT EXISTS TrainSchedules (schedule_id INTEGER PRIMARY KEY, train_id TEXT, route_id INTEGER, day_of_operation TEXT);
+CREATE TABLE IF NOT EXISTS TrainRunExceptions (exception_id INTEGER PRIMARY KEY, train_id TEXT, start_date DATE, end_date DATE,
+                                               exception_type TEXT, reason TEXT);
+CREATE TABLE IF NOT EXISTS RouteStations (route_id INTEGER, station_code TEXT, sequence_number INTEGER, distance_from_source REAL,
+                                          PRIMARY KEY (route_id, station_code));
+CREATE TABLE IF NOT EXISTS StationSchedules (schedule_id INTEGER, station_code TEXT, arrival_time TEXT, departure_time TEXT,
+                                             platform_id INTEGER, halt_duration INTEGER DEFAULT 5, PRIMARY KEY (schedule_id, station_code));
+CREATE TABLE IF NOT EXISTS Coaches (coach_id TEXT PRIMARY KEY, train_id TEXT, coach_type TEXT, capacity INTEGER);
+CREATE TABLE IF NOT EXISTS SeatInventory (inventory_id INTEGER PRIMARY KEY, train_id TEXT, coach_id TEXT, journey_date DATE,
+                                          total_seats INTEGER, available_seats INTEGER, waitlist_count INTEGER DEFAULT 0,
+                                          rac_count INTEGER DEFAULT 0, UNIQUE (train_id, coach_id, journey_date));
+CREATE TABLE IF NOT EXISTS Quotas (quota_id INTEGER PRIMARY KEY, quota_name TEXT, quota_description TEXT, priority_level INTEGER);
+CREATE TABLE IF NOT EXISTS QuotaAllocations (allocation_id INTEGER PRIMARY KEY, train_id TEXT, journey_date DATE, quota_id INTEGER,
+                                             seats_allocated INTEGER, UNIQUE (train_id, quota_id, journey_date));
+CREATE TABLE IF NOT EXISTS Reservations (pnr TEXT PRIMARY KEY, train_id TEXT, journey_date DATE, source_station_code TEXT,
+                                         destination_station_code TEXT, booking_time TIMESTAMP, status TEXT);
+CREATE TABLE IF NOT EXISTS Passengers (passenger_id INTEGER PRIMARY KEY, pnr TEXT, name TEXT, age INTEGER, category TEXT);
+CREATE INDEX IF NOT EXISTS idx_train_schedules_train ON TrainSchedules (train_id, route_id);
+CREATE INDEX IF NOT EXISTS idx_train_run_exceptions_train ON TrainRunExceptions (train_id);
+CREATE INDEX IF NOT EXISTS idx_route_stations_sequence ON RouteStations (route_id, sequence_number);
+CREATE INDEX IF NOT EXISTS idx_seat_inventory_train_date ON SeatInventory (train_id, journey_date);
+CREATE INDEX IF NOT EXISTS idx_reservations_train_date ON Reservations (train_id, journey_date);
+CREATE INDEX IF NOT EXISTS idx_passengers_pnr ON Passengers (pnr);
+"""
+
+# Explicit adapters replace sqlite3's deprecated defaults and match what mysql-connector returns.
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Rewrites a MySQL statement from database.py into SQLite syntax."""
+    return sql.replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP").replace(" FOR UPDATE", "")
+
+
+class SQLiteCursor:
+    """DB-API cursor with the parts of the mysql-connector interface database.py uses."""
+
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, sql, params=()):
+        if " FOR UPDATE" in sql and not self._connection.in_transaction:
+            # SQLite has no row locks; taking the write lock up front is the closest
+            # equivalent and avoids a busy error when the transaction later writes.
+            self._connection.raw.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(translate(sql), params)
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate(sql), seq_of_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, raw):
+        self.raw = raw
+        self._closed = False
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def cursor(self):
+        return SQLiteCursor(self, self.raw.cursor())
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def is_connected(self):
+        return not self._closed
+
+    def close(self):
+        self._closed = True
+        self.raw.close()
+
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def connect(path=None, init_schema=True):
+    """Opens a tuned connection to `path` (SQLITE_PATH by default), creating the schema once per file."""
+    path = path or SQLITE_PATH
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                          timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, cached_statements=SQLITE_STATEMENT_CACHE)
+    for pragma in PRAGMAS:
+        raw.execute(pragma)
+    if init_schema:
+        with _schema_lock:
+            if path not in _schema_ready or path == ":memory:":
+                raw.executescript(SCHEMA)
+                _schema_ready.add(path)
+                logger.info(f"SQLite schema ready in {path}")
+    return SQLiteConnection(raw)
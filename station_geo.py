@@ -0,0 +1,125 @@
+"""Nearest-station lookups for the agent.
+
+Loads station coordinates through database.py into the KD-tree shared with the Flask backend
+(backend/geo_index.py). The index is rebuilt after STATION_GEO_TTL seconds or
+`invalidate_station_geo()`.
+"""
+import os
+import threading
+import time
+from logger import setup_logger
+from database import create_db_connection, search_stations, on_data_change, DB_ERRORS, RELOAD_RETRY_SECONDS
+
+logger = setup_logger(__name__)
+
+STATION_GEO_TTL = float(os.getenv("STATION_GEO_TTL", "3600"))
+MAX_RADIUS_KM = 500.0
+MAX_RESULTS = 50
+
+_index = None
+_built_at = 0.0
+_index_lock = threading.Lock()
+
+def _load_station_coordinates():
+    """Reads (station_code, station_name, latitude, longitude) for every station with coordinates."""
+    connection = None
+    cursor = None
+    try:
+        connection = create_db_connection()
+        if not connection:
+            return None
+        cursor = connection.cursor()
+        cursor.execute("SELECT station_code, station_name, latitude, longitude FROM Stations "
+                       "WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+        return cursor.fetchall()
+    except DB_ERRORS as e:
+        logger.error(f"Error loading station coordinates: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+def get_station_geo_index():
+    """Returns the current StationGeoIndex, rebuilding it when stale; None if it was never loaded."""
+    global _index, _built_at
+    if _index is not None and time.monotonic() - _built_at < STATION_GEO_TTL:
+        return _index
+    with _index_lock:
+        if _index is None or time.monotonic() - _built_at >= STATION_GEO_TTL:
+            # Imported here so the agent still starts in a checkout without the backend package.
+            from backend.geo_index import StationGeoIndex
+            start = time.perf_counter()
+            rows = _load_station_coordinates()
+            if rows is None:
+                if _index is not None:
+                    logger.warning(f"Station coordinate reload failed, keeping the previous index for {RELOAD_RETRY_SECONDS:.0f} s")
+                    _built_at = time.monotonic() - STATION_GEO_TTL + min(RELOAD_RETRY_SECONDS, STATION_GEO_TTL)
+                return _index
+            _index = StationGeoIndex(rows)
+            _built_at = time.monotonic()
+            logger.info(f"Station geo index built with {len(_index)} stations in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return _index
+
+def invalidate_station_geo():
+    """Call after stations are added or moved so the next lookup rebuilds the index."""
+    global _built_at
+    _built_at = 0.0
+
+on_data_change("stations", invalidate_station_geo)
+
+def _parse_coordinates(location):
+    """Returns (lat, lon) for a 'lat,lon' string, or None."""
+    parts = str(location).replace(" ", "").split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return lat, lon
+    return None
+
+def find_nearby_stations(location: str, radius_km: float = 25, limit: int = 5):
+    """Finds stations near a 'lat,lon' pair or a station name/code.
+
+    Returns {"success", "origin", "within_radius", "stations"} with stations nearest first and
+    their distance in km (the nearest ones regardless of distance when none are within
+    `radius_km`), or {"success": False, "error"}.
+    """
+    try:
+        radius_km = min(float(radius_km), MAX_RADIUS_KM)
+        limit = max(1, min(int(limit), MAX_RESULTS))
+    except (TypeError, ValueError):
+        return {"success": False, "error": "radius_km and limit must be numbers."}
+    try:
+        index = get_station_geo_index()
+    except ImportError as e:
+        logger.error(f"Station geo index unavailable: {e}")
+        index = None
+    if index is None:
+        return {"success": False, "error": "Station locations are unavailable right now."}
+
+    point = _parse_coordinates(location)
+    origin = location
+    if point is None:
+        point = index.location(location)
+    if point is None:
+        # A place name: anchor on the first matching station that has coordinates.
+        for code, name in search_stations(str(location).strip()) or []:
+            point = index.location(code)
+            if point is not None:
+                origin = f"{name} ({code})"
+                break
+    if point is None:
+        return {"success": False, "error": f"Could not find a location for '{location}'. Give a station name or 'latitude,longitude'."}
+
+    stations = index.within(point[0], point[1], radius_km, limit=limit)
+    within_radius = bool(stations)
+    if not within_radius:
+        # Nothing inside the radius: the nearest few are still useful boarding points.
+        stations = index.nearest(point[0], point[1], k=limit)
+    logger.info(f"Found {len(stations)} stations near {origin} (within {radius_km} km: {within_radius})")
+    return {"success": True, "origin": origin, "within_radius": within_radius, "stations": stations}
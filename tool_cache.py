@@ -0,0 +1,135 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ToolResultCache:
+    """Results of read-only agent tools keyed by (tool name, arguments), shared by every conversation.
+
+    Least recently used entries are evicted beyond `max_entries`, and each entry expires after
+    its tool's TTL. Writers call `invalidate()` for the tools whose data they changed, either
+    for every call or only for calls with matching arguments (e.g. one train's route). Empty
+    results are not stored, so a lookup that failed against the database is retried next time.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (name, ((arg, value), ...)) -> (result, expires_at)
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, name, args, kwargs):
+        bound = self._signatures[name].bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (name, tuple(bound.arguments.items()))
+        hash(key)
+        return key
+
+    def _register(self, name, function):
+        self._signatures[name] = inspect.signature(function)
+        self.hits.setdefault(name, 0)
+        self.misses.setdefault(name, 0)
+
+    def _lookup(self, name, key, now):
+        """(True, result) for a live entry, else (False, None) counted as a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits[name] += 1
+                return True, _copy(entry[0])
+            self.misses[name] += 1
+        return False, None
+
+    def _store(self, key, result, expires_at):
+        if result:
+            with self._lock:
+                self._entries[key] = (result, expires_at)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return _copy(result)
+
+    def wrap(self, name: str, function: Callable, ttl: Optional[float] = None) -> Callable:
+        """Returns `function` behind the cache; positional and keyword calls share entries."""
+        ttl = self.ttl if ttl is None else ttl
+        self._register(name, function)
+
+        @functools.wraps(function)
+        def cached(*args, **kwargs):
+            try:
+                key = self._key(name, args, kwargs)
+            except TypeError:
+                # Bad arguments or unhashable values: let the tool itself deal with them.
+                return function(*args, **kwargs)
+            now = time.monotonic()
+            found, result = self._lookup(name, key, now)
+            if found:
+                return result
+            return self._store(key, function(*args, **kwargs), now + ttl)
+
+        return cached
+
+    def wrap_async(self, name: str, function: Callable, ttl: Optional[float] = None) -> Callable:
+        """`wrap` for a coroutine function; it shares entries with the sync tool of the same name."""
+        ttl = self.ttl if ttl is None else ttl
+        self._register(name, function)
+
+        @functools.wraps(function)
+        async def cached(*args, **kwargs):
+            try:
+                key = self._key(name, args, kwargs)
+            except TypeError:
+                return await function(*args, **kwargs)
+            now = time.monotonic()
+            found, result = self._lookup(name, key, now)
+            if found:
+                return result
+            return self._store(key, await function(*args, **kwargs), now + ttl)
+
+        return cached
+
+    def invalidate(self, name: Optional[str] = None, **arguments):
+        """Drops cached results of tool `name` (every tool when None), only those called with `arguments` if given."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                return
+            stale = [key for key in self._entries
+                     if key[0] == name and all(dict(key[1]).get(arg) == value for arg, value in arguments.items())]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Dropped {len(stale)} cached {name} results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts per tool, plus the overall hit rate, size and evictions."""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": self.evictions,
+            "tools": {name: {"hits": self.hits[name], "misses": self.misses[name]} for name in self.hits},
+        }
+
+
+def _copy(result):
+    # Lists are handed out as copies so one caller can't change what the next one sees.
+    return list(result) if isinstance(result, list) else result
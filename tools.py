@@ -1,7 +1,12 @@
+from typing import List
 from logger import setup_logger
 from datetime import datetime, timedelta
 # import streamlit as st # Remove streamlit import if not used directly in tools (session state moved to database.py)
-from database import create_reservation # Import the new function
+from database import create_reservation, get_seat_availability # Import the new function
+import async_database
+from journeys import plan_journey
+from station_geo import find_nearby_stations as _find_nearby_stations
+from running_days import next_running_dates
 # Import your Flask models and database session here, e.g.:
 # from app import db, Train, Reservation, Station
 
@@ -32,45 +37,27 @@ logger = setup_logger(__name__)
 #         logger.error(f"Error booking ticket: {e}")
 #         return f"Failed to book ticket: {str(e)}"
 
-def get_next_available_appointment(train_id: str, date: str) -> str:
-    """Finds the next available booking details for a specific train and date."""
-    logger.info(f"Tool: get_next_available_appointment called with train_id={train_id}, date={date}")
-    
-    try:
-        # Simple implementation - returns next day at 9 AM
-        next_day = datetime.now() + timedelta(days=1)
-        return f"Next available slot for train {train_id}: {next_day.strftime('%Y-%m-%d')} at 09:00"
-    except Exception as e:
-        logger.error(f"Error getting availability: {e}")
-        return f"Failed to get availability: {str(e)}"
-
-def cancel_appointment(pnr: str) -> str:
-    """Cancels a train reservation using the PNR."""
-    logger.info(f"Tool: cancel_appointment called with pnr={pnr}")
-    
-    try:
-        # This still uses session state - need to update to database interaction
-        if 'appointments' not in st.session_state:
-            return "No appointments found"
-            
-        # Find and remove the appointment
-        for i, appointment in enumerate(st.session_state.appointments):
-            if appointment.get('pnr') == pnr:
-                st.session_state.appointments.pop(i)
-                return f"Successfully cancelled reservation with PNR: {pnr}"
-                
-        return f"No reservation found with PNR: {pnr}"
-    except Exception as e:
-        logger.error(f"Error cancelling reservation: {e}")
-        return f"Failed to cancel reservation: {str(e)}"
+def find_nearby_stations(location: str, radius_km: float = 25, limit: int = 5) -> str:
+    """Lists the stations nearest to a place (station name or code) or a 'latitude,longitude' pair."""
+    logger.info(f"Tool: find_nearby_stations called with location={location}, radius_km={radius_km}, limit={limit}")
+    result = _find_nearby_stations(location, radius_km, limit)
+    if not result["success"]:
+        return f"Could not look up nearby stations: {result['error']}"
+    if result["within_radius"]:
+        lines = [f"Stations within {radius_km} km of {result['origin']}:"]
+    else:
+        lines = [f"No stations within {radius_km} km of {result['origin']}. The nearest are:"]
+    for number, station in enumerate(result["stations"], start=1):
+        lines.append(f"{number}. {station['station_name']} ({station['station_code']}) - {station['distance_km']:.1f} km")
+    return "\n".join(lines)
 
 # Define the book_appointment function to call the database function
-def book_appointment(train_id: str, journey_date: str, source: str, destination: str, passengers: list) -> dict:
+def book_appointment(train_id: str, journey_date: str, source: str, destination: str, passengers: List[dict], coach_type: str = None) -> dict:
     """Books a train ticket for the user by calling the database function."""
-    logger.info(f"Tool: book_appointment called with train_id={train_id}, journey_date={journey_date}, source={source}, destination={destination}, passengers={passengers}")
+    logger.info(f"Tool: book_appointment called with train_id={train_id}, journey_date={journey_date}, source={source}, destination={destination}, passengers={passengers}, coach_type={coach_type}")
     
     # Call the database function to create the reservation
-    booking_result = create_reservation(train_id, journey_date, source, destination, passengers)
+    booking_result = create_reservation(train_id, journey_date, source, destination, passengers, coach_type)
     
     if booking_result.get("success"):
         # Return the detailed booking information
@@ -79,29 +66,79 @@ def book_appointment(train_id: str, journey_date: str, source: str, destination:
         # Return the error information
         return booking_result
 
+async def book_appointment_async(train_id: str, journey_date: str, source: str, destination: str, passengers: List[dict], coach_type: str = None) -> dict:
+    """book_appointment for the async agent graph, booking through async_database."""
+    logger.info(f"Tool: book_appointment_async called with train_id={train_id}, journey_date={journey_date}, source={source}, destination={destination}, passengers={passengers}, coach_type={coach_type}")
+    return await async_database.create_reservation(train_id, journey_date, source, destination, passengers, coach_type)
+
+# How far ahead to look for the next date with confirmed seats; fetched in the same query.
+AVAILABILITY_LOOKAHEAD_DAYS = 7
+# Running dates suggested when a train does not run on the requested date.
+RUNNING_DATES_SHOWN = 5
+
+def _format_classes(classes: dict) -> str:
+    parts = []
+    for coach_type, counts in sorted(classes.items()):
+        if counts["available"] > 0:
+            parts.append(f"{coach_type}: {counts['available']} available")
+        elif counts["waitlist"] > 0:
+            parts.append(f"{coach_type}: WL {counts['waitlist']}")
+        elif counts["rac"] > 0:
+            parts.append(f"{coach_type}: RAC {counts['rac']}")
+        else:
+            parts.append(f"{coach_type}: 0 available")
+    return ", ".join(parts)
+
 def get_next_available_appointment(train_id: str, date: str) -> str:
-    """Finds the next available booking details for a specific train and date, including seat availability and fare."""
+    """Finds the next available booking details for a specific train and date, including seat availability per class."""
     logger.info(f"Tool: get_next_available_appointment called with train_id={train_id}, date={date}")
-    # TODO: Implement actual logic to query seat availability and fare based on train_id and date.
-    # This should interact with your database to check available seats for AC and Non-AC coaches.
-    
-    # Placeholder implementation:
-    # try:
-    #     train = Train.query.get(train_id)
-    #     if not train:
-    #         return "Train not found."
-    #     # Example: Query for available seats for the given date
-    #     # available_ac = check_available_seats(train_id, date, 'AC')
-    #     # available_nonac = check_available_seats(train_id, date, 'NONAC')
-    #     # fare = train.base_fare # Or calculated based on date/quota
-    #     
-    #     # return f"Available seats for Train {train.name} on {date}: AC: {available_ac}, Non-AC: {available_nonac}. Base Fare: {fare}"
-    # except Exception as e:
-    #     logger.error(f"Error getting availability: {e}")
-    #     return f"Failed to get availability: {e}"
+    try:
+        start = datetime.strptime(str(date), '%Y-%m-%d').date()
+    except ValueError:
+        return f"Invalid date: {date}. Please use YYYY-MM-DD."
+
+    availability = get_seat_availability(train_id, start, start + timedelta(days=AVAILABILITY_LOOKAHEAD_DAYS - 1))
+    if availability is None:
+        return "Failed to get availability: the reservation database is unavailable."
+
+    day = availability.get(start.strftime('%Y-%m-%d'), {"classes": {}, "quotas": {}})
+    if not day["classes"]:
+        running = next_running_dates(train_id, start, RUNNING_DATES_SHOWN)
+        if running is not None and (not running or running[0] != start):
+            # No inventory because the train does not run that day, not because booking is closed.
+            dates = ", ".join(running_date.strftime('%Y-%m-%d') for running_date in running) or "none scheduled"
+            message = f"Train {train_id} does not run on {date}. Next running dates: {dates}."
+        else:
+            message = f"Booking is not open for train {train_id} on {date}."
+    else:
+        message = f"Availability for train {train_id} on {date}: {_format_classes(day['classes'])}."
+        if day["quotas"]:
+            quotas = ", ".join(f"{name}: {seats}" for name, seats in sorted(day["quotas"].items()))
+            message += f" Quota allocations: {quotas}."
+    if not any(c["available"] > 0 for c in day["classes"].values()):
+        for journey_date, entry in sorted(availability.items()):
+            if journey_date > start.strftime('%Y-%m-%d') and any(c["available"] > 0 for c in entry["classes"].values()):
+                message += f" Next date with confirmed seats: {journey_date} ({_format_classes(entry['classes'])})."
+                break
+        else:
+            message += f" No confirmed seats in the next {AVAILABILITY_LOOKAHEAD_DAYS} days."
+    return message
 
-    # Returning dummy availability for now
-    return f"Availability check for Train {train_id} on {date}. This is a placeholder response. AC Available: 50, Non-AC Available: 100. Please implement the actual availability logic in tools.py."
+def find_journeys(from_station: str, to_station: str, date: str, earliest_time: str = "00:00") -> str:
+    """Finds the fastest itineraries between two stations, with up to two changes of train."""
+    logger.info(f"Tool: find_journeys called with from_station={from_station}, to_station={to_station}, date={date}, earliest_time={earliest_time}")
+    result = plan_journey(from_station, to_station, date, earliest_time)
+    if not result["success"]:
+        return f"Could not plan a journey: {result['error']}"
+    if not result["itineraries"]:
+        return f"No journey from {from_station} to {to_station} on {date} with up to two changes."
+    lines = [f"Journeys from {from_station} to {to_station} on {date}:"]
+    for number, itinerary in enumerate(result["itineraries"], start=1):
+        changes = "direct" if not itinerary["changes"] else f"{itinerary['changes']} change(s)"
+        lines.append(f"{number}. Departs {itinerary['departure_date']} {itinerary['departure']}, arrives {itinerary['arrival_date']} {itinerary['arrival']} ({itinerary['duration']}, {changes})")
+        for leg in itinerary["legs"]:
+            lines.append(f"   - {leg['train_name']} ({leg['train_id']}): {leg['from']} {leg['departure']} -> {leg['to']} {leg['arrival']}")
+    return "\n".join(lines)
 
 def cancel_appointment(pnr: str) -> str:
     """Cancels a train reservation using the PNR."""